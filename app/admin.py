@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query
+
+from app import models
+from app.auth import get_current_admin
+from app.config import DRAIN_DEADLINE
+from app.game_rooms.dispatch import slow_handlers
+from app.game_rooms.drain import server_drain
+from app.logger import debug_rooms, disable_room_debug, enable_room_debug
+
+router = APIRouter(tags=["Admin"])
+
+
+# Кімнати з увімкненим DEBUG-логуванням
+@router.get("/logging/rooms")
+def get_debug_rooms(admin: models.User = Depends(get_current_admin)):
+    return {"debug_rooms": debug_rooms()}
+
+
+@router.post("/logging/rooms/{room_id}")
+def enable_debug_for_room(room_id: int, admin: models.User = Depends(get_current_admin)):
+    enable_room_debug(room_id)
+    return {"debug_rooms": debug_rooms()}
+
+
+@router.delete("/logging/rooms/{room_id}")
+def disable_debug_for_room(room_id: int, admin: models.User = Depends(get_current_admin)):
+    disable_room_debug(room_id)
+    return {"debug_rooms": debug_rooms()}
+
+
+# Найповільніші виклики обробників WebSocket з контекстом кімнати та фази
+@router.get("/handlers/slowest")
+def get_slowest_handlers(
+        limit: int = Query(20, ge=1, le=500),
+        admin: models.User = Depends(get_current_admin)
+):
+    return {"handlers": slow_handlers.top(limit)}
+
+
+@router.delete("/handlers/slowest")
+def clear_slowest_handlers(admin: models.User = Depends(get_current_admin)):
+    slow_handlers.clear()
+    return {"handlers": []}
+
+
+# Режим drain перед перезапуском: нові кімнати та підключення відхиляються, ігри дограються до дедлайну
+@router.get("/drain")
+def get_drain_status(admin: models.User = Depends(get_current_admin)):
+    return server_drain.status()
+
+
+@router.post("/drain")
+async def start_drain(
+        deadline: float = Query(DRAIN_DEADLINE, ge=0),
+        admin: models.User = Depends(get_current_admin)
+):
+    return server_drain.start(deadline)
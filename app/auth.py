@@ -8,7 +8,10 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.config import ALGORITHM, SECRET_KEY
 from app import models, schemas
-from app.database import get_db
+from app.database import get_db, session_scope
+from app.logger import get_logger
+
+logger = get_logger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -30,7 +33,7 @@ def authenticate_user(db, username_or_email: str, password: str):
 def get_user_by_email(db: Session, email: str):
     user = db.query(models.User).filter(models.User.email == email).first()
     if user is None:
-        print(f"User with email {email} not found")
+        logger.info("User with token subject not found")
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -42,7 +45,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Користувач завантажується в короткій сесії й повертається від'єднаним: з'єднання не тримається,
+# поки запит чекає на потік для обробника
+def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -56,11 +61,18 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.email == user_email).first()
+    with session_scope() as db:
+        user = db.query(models.User).filter(models.User.email == user_email).first()
+        db.expunge_all()
     if user is None:
         raise credentials_exception
     return user
 
+def get_current_admin(current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
+
 @router.post("/register")
 def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     existing_user = db.query(models.User).filter((models.User.email == user.email) | (models.User.username == user.username)).first()
@@ -0,0 +1,110 @@
+"""
+Пропускна здатність запису повідомлень чату в SQLite.
+
+Кожен запуск створює окрему тимчасову базу й пише --writes повідомлень з --concurrency
+одночасних "кімнат". Порівняння профілю SQLite та способу запису:
+    python -m app.benchmarks.db_writes --profile default --mode session
+    python -m app.benchmarks.db_writes --profile tuned --mode writer
+
+--profile default — налаштування SQLite за замовчуванням (журнал DELETE, synchronous=FULL, без mmap),
+--profile tuned — профіль застосунку (WAL, synchronous=NORMAL, mmap).
+--mode session — кожен запис окремою сесією й комітом у пулі потоків,
+--mode writer — через єдиний потік запису з пакетними транзакціями.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+PROFILES = {
+    "default": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_MMAP_SIZE": "0"},
+    "tuned": {},
+}
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+async def run_writes(writes, concurrency, mode):
+    # Імпорт після налаштування оточення: профіль SQLite читається з конфігурації під час імпорту
+    from fastapi.concurrency import run_in_threadpool
+    from sqlalchemy.exc import OperationalError
+
+    from app.database import Base, engine, session_scope
+    from app.db_writer import db_writer
+    from app.game_rooms.game_rooms import save_message
+    from app.models import Room
+
+    Base.metadata.create_all(bind=engine)
+    with session_scope() as db:
+        rooms = [Room(name=f"bench{i}", min_players_number=4, max_players_number=6) for i in range(concurrency)]
+        db.add_all(rooms)
+        db.flush()
+        room_ids = [room.id for room in rooms]
+
+    def write_in_session(message, room_id):
+        with session_scope() as db:
+            save_message(db, message, None, room_id)
+
+    latencies = []
+    failures = 0
+
+    async def room_traffic(room_id, count):
+        nonlocal failures
+        for i in range(count):
+            started = time.perf_counter()
+            try:
+                if mode == "writer":
+                    await db_writer.run(save_message, f"msg{i}", None, room_id)
+                else:
+                    await run_in_threadpool(write_in_session, f"msg{i}", room_id)
+            except OperationalError:
+                # "database is locked": з журналом DELETE записи з кількох з'єднань взаємно блокуються
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    per_room = writes // concurrency
+    started = time.perf_counter()
+    await asyncio.gather(*(room_traffic(room_id, per_room) for room_id in room_ids))
+    elapsed = time.perf_counter() - started
+    await db_writer.stop()
+
+    total = per_room * concurrency - failures
+    return {
+        "writes": total,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "writes_per_sec": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite chat write throughput benchmark")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="tuned")
+    parser.add_argument("--mode", choices=("session", "writer"), default="writer")
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50, help="rooms writing at the same time")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="mafia-writes-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/writes.db"
+    os.environ.update(PROFILES[args.profile])
+
+    report = asyncio.run(run_writes(args.writes, args.concurrency, args.mode))
+    report["profile"] = args.profile
+    report["mode"] = args.mode
+    report["concurrency"] = args.concurrency
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
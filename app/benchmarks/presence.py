@@ -0,0 +1,71 @@
+"""
+Пам'ять і швидкість реєстру присутності.
+
+Підключає --users онлайн-користувачів з --friends випадковими друзями кожен і рахує, скільки пам'яті
+займає реєстр (tracemalloc) та скільки триває підключення, публікація стану й відключення:
+    python -m app.benchmarks.presence --users 100000 --friends 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+
+from app.game_rooms.presence import PresenceRegistry
+
+
+class NullSink:
+    async def send(self, message):
+        return None
+
+
+async def run(users, friends, seed):
+    rng = random.Random(seed)
+    friend_lists = [rng.sample(range(users), friends) for _ in range(users)]
+    sink = NullSink()
+
+    tracemalloc.start()
+    registry = PresenceRegistry()
+    baseline = tracemalloc.get_traced_memory()[0]
+    # Підписки без розсилки: лише вартість структур реєстру
+    for user_id, friend_ids in enumerate(friend_lists):
+        registry._connections[user_id] = [(None, sink)]
+        registry._subscribe(user_id, friend_ids)
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for user_id in range(0, users, max(1, users // 1000)):
+        await registry.publish(user_id)
+    publish_us = (time.perf_counter() - started) / min(users, 1000) * 1e6
+
+    started = time.perf_counter()
+    for user_id in range(users):
+        await registry.disconnect(user_id, sink)
+    disconnect_us = (time.perf_counter() - started) / users * 1e6
+
+    return {
+        "users": users,
+        "friends_per_user": friends,
+        "registry_mb": round(used / 2 ** 20, 1),
+        "bytes_per_user": round(used / users),
+        "publish_us": round(publish_us, 1),
+        "disconnect_us": round(disconnect_us, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Presence registry memory benchmark")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--friends", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.users, args.friends, args.seed))
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
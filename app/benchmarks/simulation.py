@@ -0,0 +1,274 @@
+"""
+Безголовий прогін повних ігор без справжніх WebSocket-з'єднань.
+
+Запуск:
+    python -m app.benchmarks.simulation --games 2000 --players 8 --policy random
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from app.game_rooms.codecs import CODECS
+from app.game_rooms.event_log import event_log
+from app.game_rooms.game_models import GameRoom, Player
+from app.game_rooms.game_rooms import dispatch, join_room, parse_message
+from app.game_rooms.roles import MAX_PLAYERS, MIN_PLAYERS
+from app.logger import setup_logging
+
+NIGHT_ROLES = ("mafia", "doctor", "detective")
+MAX_ROUNDS = 50
+
+
+# Заглушка WebSocket: приймає вже закодовані кадри і лише рахує їх
+class SinkWebSocket:
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def send_text(self, frame):
+        self.bytes += len(frame)
+        self.messages += 1
+
+    async def send_bytes(self, frame):
+        self.bytes += len(frame)
+        self.messages += 1
+
+
+# Заглушка сесії БД: чат і завершення гри (оновлення Room.is_active) нічого не пишуть
+class NullSession:
+    def query(self, *args, **kwargs):
+        return self
+
+    def filter(self, *args, **kwargs):
+        return self
+
+    def first(self):
+        return None
+
+    def update(self, values):
+        return 0
+
+    def add(self, obj):
+        pass
+
+    def commit(self):
+        pass
+
+
+# Потік запису, який обробники отримують замість db_writer: записи виконуються одразу на заглушці
+class NullWriter:
+    def submit(self, func, *args):
+        func(NullSession(), *args)
+
+    async def run(self, func, *args):
+        return func(NullSession(), *args)
+
+
+null_writer = NullWriter()
+
+
+# Бот, що обирає цілі випадково серед живих гравців
+class RandomBot:
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def night_target(self, room, player):
+        candidates = [p for p in room.players.values() if p.is_alive]
+        if player.role == "mafia":
+            candidates = [p for p in candidates if p.role != "mafia"]
+        return self.random.choice(candidates).id
+
+    def vote_target(self, room, player):
+        candidates = [p for p in room.players.values() if p.is_alive and p.id != player.id]
+        return self.random.choice(candidates).id
+
+
+# Детермінований бот: мафія б'є найменший id, мирні голосують за першого підозрілого
+class ScriptedBot:
+    def night_target(self, room, player):
+        alive = [p for p in room.players.values() if p.is_alive]
+        if player.role == "mafia":
+            return min(p.id for p in alive if p.role != "mafia")
+        if player.role == "doctor":
+            return player.id
+        return max(p.id for p in alive)
+
+    def vote_target(self, room, player):
+        alive = [p for p in room.players.values() if p.is_alive and p.id != player.id]
+        return min(p.id for p in alive)
+
+
+POLICIES = {"random": RandomBot, "scripted": ScriptedBot}
+
+
+class SimulationStats:
+    def __init__(self):
+        self.phases = {"setup": [], "night": [], "day": []}
+        self.winners = {}
+        self.unfinished = 0
+        self.messages = 0
+        self.bytes = 0
+
+    def record(self, phase, seconds):
+        self.phases[phase].append(seconds)
+
+    def report(self, games, elapsed):
+        def summary(samples):
+            if not samples:
+                return {"count": 0}
+            samples = sorted(samples)
+            return {
+                "count": len(samples),
+                "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+                "p50_ms": round(samples[len(samples) // 2] * 1000, 4),
+                "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 4),
+            }
+
+        return {
+            "games": games,
+            "elapsed_s": round(elapsed, 4),
+            "games_per_sec": round(games / elapsed, 2) if elapsed else None,
+            "winners": self.winners,
+            "unfinished": self.unfinished,
+            "messages_sent": self.messages,
+            "bytes_sent": self.bytes,
+            "phases": {name: summary(samples) for name, samples in self.phases.items()},
+        }
+
+
+async def send(room, player, message_type, payload=None):
+    # Той самий шлях, що й у websocket_endpoint: сирий JSON → перевірка → черга кімнати
+    raw = json.dumps({"type": message_type, "payload": payload or {}})
+    message_type, handler, payload = parse_message(raw)
+    await room.actor.call(
+        dispatch,
+        message_type,
+        handler,
+        payload_size=len(raw),
+        websocket=player.websocket,
+        payload=payload,
+        room_id=room.id,
+        db_writer=null_writer,
+        player=player,
+        room=room,
+    )
+
+
+async def play_game(room_id, players_count, policy, stats, codec):
+    """Проганяє одну повну гру: підключення, готовність, старт, ночі та голосування."""
+    started = time.perf_counter()
+    room = GameRoom(id=room_id, name=f"sim{room_id}", owner_id=1,
+                    min_players=players_count, max_players=players_count)
+    for i in range(1, players_count + 1):
+        player = Player(id=i, name=f"bot{i}", websocket=SinkWebSocket(), codec=codec)
+        await room.actor.call(join_room, room, player)
+    for player in list(room.players.values()):
+        await send(room, player, "toggle_ready")
+    await send(room, room.players[room.owner], "start_game")
+    stats.record("setup", time.perf_counter() - started)
+
+    while not room.is_game_over and room.round <= MAX_ROUNDS:
+        phase = room.phase
+        started = time.perf_counter()
+        if phase == "night":
+            actors = [p for p in room.players.values() if p.is_alive and p.role in NIGHT_ROLES]
+            for player in actors:
+                if room.phase != "night":
+                    break
+                await send(room, player, "night_action", {"target_id": policy.night_target(room, player)})
+        elif phase == "day":
+            for player in [p for p in room.players.values() if p.is_alive]:
+                if room.phase != "day":
+                    break
+                await send(room, player, "vote", {"target_id": policy.vote_target(room, player)})
+        else:
+            break
+        stats.record(phase, time.perf_counter() - started)
+
+    winner = None
+    if room.is_game_over:
+        mafia_alive = any(p.is_alive and p.role == "mafia" for p in room.players.values())
+        winner = "mafia" if mafia_alive else "civilians"
+        stats.winners[winner] = stats.winners.get(winner, 0) + 1
+    else:
+        stats.unfinished += 1
+
+    for player in room.players.values():
+        stats.messages += player.websocket.messages
+        stats.bytes += player.websocket.bytes
+    return winner
+
+
+async def run_simulation(games, players_count, policy_name="random", seed=None, concurrency=1,
+                         encoding="mafia.json", event_log_dir=None):
+    if policy_name == "random":
+        policy = RandomBot(seed)
+    else:
+        policy = POLICIES[policy_name]()
+    random.seed(seed)
+    stats = SimulationStats()
+    codec = CODECS[encoding]
+    if event_log_dir:
+        event_log.directory = event_log_dir
+        event_log.start()
+
+    started = time.perf_counter()
+    for first in range(0, games, concurrency):
+        batch = range(first, min(games, first + concurrency))
+        await asyncio.gather(*[play_game(i + 1, players_count, policy, stats, codec) for i in batch])
+    if event_log_dir:
+        await event_log.stop()
+    return stats.report(games, time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Mafia game simulation benchmark")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=6, choices=range(MIN_PLAYERS, MAX_PLAYERS + 1))
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=1, help="games played at the same time")
+    parser.add_argument("--trace-allocations", action="store_true",
+                        help="measure allocations with tracemalloc (slower)")
+    parser.add_argument("--encoding", choices=sorted(CODECS), default="mafia.json",
+                        help="outbound frame encoding for all bots")
+    parser.add_argument("--event-log", metavar="DIR", help="write the game event log to DIR during the run")
+    parser.add_argument("--log-level", default="WARNING", help="game log level during the run")
+    args = parser.parse_args(argv)
+
+    setup_logging(level=args.log_level.upper())
+    if args.trace_allocations:
+        tracemalloc.start()
+
+    report = asyncio.run(run_simulation(
+        args.games, args.players, args.policy, args.seed, args.concurrency, args.encoding, args.event_log
+    ))
+
+    if args.trace_allocations:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        top = snapshot.statistics("lineno")[:10]
+        report["allocations"] = {
+            "current_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "peak_kb_per_game": round(peak / 1024 / max(args.games, 1), 3),
+            "top": [
+                {"where": str(stat.traceback), "kb": round(stat.size / 1024, 1), "blocks": stat.count}
+                for stat in top
+            ],
+        }
+
+    report["players"] = args.players
+    report["policy"] = args.policy
+    report["encoding"] = args.encoding
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Час старту воркера: імпорт app.main та перший запит.
+
+Кожен запуск — окремий процес у порожньому тимчасовому каталозі зі свіжою базою SQLite, як новий воркер:
+    python -m app.benchmarks.startup --runs 10
+
+import_ms — скільки триває "import app.main" (саме це платить кожен воркер і кожен прогін тестів),
+ready_ms — імпорт, старт застосунку (lifespan) і відповідь на GET /.
+side_effects — файли й каталоги, які з'явилися в робочому каталозі після самого імпорту.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBE = """
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+side_effects = sorted(os.listdir("."))
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    client.get("/")
+ready = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "ready_ms": (ready - started) * 1000,
+    "side_effects": side_effects,
+}}))
+"""
+
+
+def probe():
+    workdir = tempfile.mkdtemp(prefix="mafia-startup-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/startup.db", LOG_LEVEL="WARNING")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(root=PACKAGE_ROOT)],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker import and startup time benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    runs = [probe() for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import_ms_p50": round(statistics.median(run["import_ms"] for run in runs), 1),
+        "import_ms_max": round(max(run["import_ms"] for run in runs), 1),
+        "ready_ms_p50": round(statistics.median(run["ready_ms"] for run in runs), 1),
+        "side_effects": runs[-1]["side_effects"],
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Вартість розбору та перевірки вхідних кадрів WebSocket на одне повідомлення.
+
+Запуск:
+    python -m app.benchmarks.validation --iterations 100000
+"""
+import argparse
+import json
+import time
+
+from pydantic import ValidationError
+
+from app.game_rooms.game_rooms import parse_message
+
+FRAMES = {
+    "chat": {"type": "chat", "payload": {"message": "Я думаю, що мафія — це гравець номер три"}},
+    "night_action": {"type": "night_action", "payload": {"target_id": 7}},
+    "vote": {"type": "vote", "payload": {"target_id": "4"}},
+    "toggle_ready": {"type": "toggle_ready", "payload": {}},
+    "invalid_json": "{\"type\": \"vote\", \"payload\": {",
+    "invalid_target": {"type": "vote", "payload": {"target_id": "abc"}},
+    "missing_target": {"type": "night_action", "payload": {}},
+    "not_an_object": ["vote", 4],
+}
+
+
+def measure(raw, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            parse_message(raw)
+        except ValidationError:
+            pass
+    return (time.perf_counter() - started) / iterations
+
+
+def measure_json_loads(raw, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            json.loads(raw)
+        except ValueError:
+            pass
+    return (time.perf_counter() - started) / iterations
+
+
+def run(iterations):
+    results = {}
+    for name, frame in FRAMES.items():
+        raw = frame if isinstance(frame, str) else json.dumps(frame)
+        results[name] = {
+            "bytes": len(raw),
+            "validate_us": round(measure(raw, iterations) * 1e6, 3),
+            "json_loads_us": round(measure_json_loads(raw, iterations) * 1e6, 3),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inbound WebSocket message validation cost")
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args(argv)
+    report = {"iterations": args.iterations, "messages": run(args.iterations)}
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+"""
+Навантажувальний тест WebSocket-ендпоінта /api/ws/room/{room_id} на локальному сервері.
+
+Запуск проти вже запущеного сервера:
+    python -m app.benchmarks.ws_load --players 600 --room-size 6 --duration 30 --server-pid <pid>
+
+Або з власним тимчасовим сервером (uvicorn + окрема SQLite база):
+    python -m app.benchmarks.ws_load --spawn --players 120 --output run.json
+    python -m app.benchmarks.ws_load --spawn --players 120 --compare run.json
+
+Вплив REST-запитів на затримку розсилки (паралельно з грою, запитів за секунду):
+    python -m app.benchmarks.ws_load --spawn --players 120 --rest-rate 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import websockets
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+NIGHT_ROLES = ("mafia", "doctor", "detective")
+CHAT_PREFIX = "lt:"
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+# Споживання CPU та пам'яті процесу сервера (через psutil або /proc)
+class ProcessSampler:
+    def __init__(self, pid):
+        self.pid = pid
+        self.peak_rss = 0
+        self._cpu_start = None
+        self._wall_start = None
+
+    def _read(self):
+        try:
+            import psutil
+        except ImportError:
+            psutil = None
+        if psutil is not None:
+            process = psutil.Process(self.pid)
+            times = process.cpu_times()
+            return times.user + times.system, process.memory_info().rss
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        return cpu, rss
+
+    def start(self):
+        self._cpu_start, rss = self._read()
+        self._wall_start = time.perf_counter()
+        self.peak_rss = rss
+
+    def sample(self):
+        _, rss = self._read()
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def report(self):
+        cpu, rss = self._read()
+        wall = time.perf_counter() - self._wall_start
+        return {
+            "cpu_seconds": round(cpu - self._cpu_start, 3),
+            "cpu_percent": round((cpu - self._cpu_start) / wall * 100, 1) if wall else None,
+            "rss_mb": round(rss / 2 ** 20, 1),
+            "peak_rss_mb": round(max(self.peak_rss, rss) / 2 ** 20, 1),
+        }
+
+
+class LoadStats:
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.received_bytes = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.connect_failures = 0
+        self.connect_times = []
+        self.broadcast_latencies = []
+        self.games_started = 0
+        self.games_finished = 0
+        self.rest_latencies = []
+        self.rest_failures = 0
+
+
+# Один бот-гравець з власним WebSocket-з'єднанням
+class LoadClient:
+    def __init__(self, index, username, token, stats, seed=None, encoding="json"):
+        self.index = index
+        self.encoding = encoding
+        self.username = username
+        self.token = token
+        self.stats = stats
+        self.random = random.Random(None if seed is None else seed + index)
+        self.ws = None
+        self.room_id = None
+        self.is_owner = False
+        self.role = None
+        self.other_mafia = set()
+        self.alive = {}
+        self.phase = "waiting"
+        self.game_over = False
+
+    async def connect(self, ws_url, room_id):
+        self.room_id = room_id
+        started = time.perf_counter()
+        try:
+            subprotocols = ["mafia.msgpack"] if self.encoding == "msgpack" else None
+            self.ws = await websockets.connect(
+                f"{ws_url}/api/ws/room/{room_id}?token={self.token}", max_size=None, subprotocols=subprotocols
+            )
+        except Exception:
+            self.stats.connect_failures += 1
+            return False
+        self.stats.connect_times.append(time.perf_counter() - started)
+        return True
+
+    async def send(self, message_type, payload=None):
+        try:
+            message = {"type": message_type, "payload": payload or {}}
+            if self.encoding == "msgpack":
+                await self.ws.send(msgpack.packb(message, use_bin_type=True))
+            else:
+                await self.ws.send(json.dumps(message))
+            self.stats.sent += 1
+        except websockets.ConnectionClosed:
+            pass
+
+    def my_id(self):
+        return next((pid for name, pid in self.alive.items() if name == self.username), None)
+
+    def alive_targets(self, exclude_self=True, exclude_mafia=False):
+        me = self.my_id()
+        return [
+            pid for name, pid in self.alive.items()
+            if not (exclude_self and pid == me) and not (exclude_mafia and name in self.other_mafia)
+        ]
+
+    async def act(self):
+        if self.game_over or self.my_id() is None:
+            return
+        if self.phase == "night" and self.role in NIGHT_ROLES:
+            targets = self.alive_targets(exclude_self=self.role == "mafia", exclude_mafia=self.role == "mafia")
+            if targets:
+                await self.send("night_action", {"target_id": self.random.choice(targets)})
+        elif self.phase == "day":
+            targets = self.alive_targets()
+            if targets:
+                await self.send("vote", {"target_id": self.random.choice(targets)})
+
+    async def handle(self, data):
+        message_type = data.get("type")
+        if message_type == "ping":
+            await self.send("pong", {"ts": data["ts"]})
+        elif message_type == "chat":
+            text = data.get("message", "")
+            if text.startswith(CHAT_PREFIX):
+                sender, sent_at = text[len(CHAT_PREFIX):].split(":")
+                if int(sender) != self.index:
+                    self.stats.broadcast_latencies.append((time.perf_counter_ns() - int(sent_at)) / 1e9)
+        elif message_type == "role_assigned":
+            self.role = data.get("role")
+            self.other_mafia = {p["name"] for p in data.get("other_mafia", [])}
+        elif message_type == "game_started":
+            self.alive = {p["name"]: p["id"] for p in data.get("players", []) if p.get("is_alive", True)}
+            if self.is_owner:
+                self.stats.games_started += 1
+        elif message_type == "phase_change":
+            self.phase = data.get("phase")
+            await self.act()
+        elif message_type in ("player_killed", "player_killed_vote"):
+            self.alive.pop(data.get("message", "").split(" ", 1)[0], None)
+        elif message_type == "game_over":
+            self.game_over = True
+            if self.is_owner:
+                self.stats.games_finished += 1
+        elif message_type == "error":
+            self.stats.errors += 1
+            if data.get("code") == "rate_limited":
+                self.stats.rate_limited += 1
+
+    async def reader(self):
+        try:
+            async for raw in self.ws:
+                self.stats.received += 1
+                self.stats.received_bytes += len(raw)
+                data = msgpack.unpackb(raw, raw=False) if isinstance(raw, bytes) else json.loads(raw)
+                await self.handle(data)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def chatter(self, rate, stop):
+        while not stop.is_set():
+            await asyncio.sleep(self.random.expovariate(rate))
+            await self.send("chat", {"message": f"{CHAT_PREFIX}{self.index}:{time.perf_counter_ns()}"})
+
+
+async def prepare_users(http, count, prefix, password, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def prepare(i):
+        username = f"{prefix}{i}"
+        async with semaphore:
+            await http.post("/auth/register", json={
+                "username": username, "password": password, "email": f"{username}@load.test"
+            })
+            response = await http.post("/auth/login", data={"username": username, "password": password})
+            response.raise_for_status()
+            return username, response.json()["access_token"]
+
+    return await asyncio.gather(*[prepare(i) for i in range(count)])
+
+
+async def create_room(http, token, name, size):
+    response = await http.post(
+        "/api/rooms",
+        json={"name": name, "min_players_number": size, "max_players_number": size},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+# Фоновий REST-трафік із заданою частотою (відкритий цикл: повільний сервер не зменшує навантаження)
+REST_PATHS = ("/api/rooms", "/api/leaderboard", "/api/rooms/{room_id}", "/api/rooms/{room_id}/messages")
+
+
+async def rest_traffic(base_url, rate, stop, stats, room_ids, max_in_flight=64):
+    semaphore = asyncio.Semaphore(max_in_flight)
+    limits = httpx.Limits(max_connections=max_in_flight)
+    pending = set()
+
+    async def request(http, path):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await http.get(path)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                stats.rest_failures += 1
+                return
+            stats.rest_latencies.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as http:
+        n = 0
+        while not stop.is_set():
+            path = REST_PATHS[n % len(REST_PATHS)].format(room_id=room_ids[n % len(room_ids)])
+            task = asyncio.create_task(request(http, path))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            n += 1
+            await asyncio.sleep(1 / rate)
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def run_load(args, server_pid=None):
+    stats = LoadStats()
+    base_url = args.url.rstrip("/")
+    ws_url = "ws" + base_url[len("http"):]
+    prefix = args.user_prefix or f"load{int(time.time())}_"
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        users = await prepare_users(http, args.players, prefix, "load-pass", args.auth_concurrency)
+        clients = [LoadClient(i, username, token, stats, args.seed, args.encoding) for i, (username, token) in enumerate(users)]
+        rooms = [clients[i:i + args.room_size] for i in range(0, len(clients), args.room_size)]
+        rooms = [room for room in rooms if len(room) == args.room_size]
+        room_ids = await asyncio.gather(*[
+            create_room(http, room[0].token, f"load-{prefix}{n}", args.room_size)
+            for n, room in enumerate(rooms)
+        ])
+
+    sampler = ProcessSampler(server_pid) if server_pid else None
+    if sampler:
+        sampler.start()
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+
+    async def connect(client, room_id):
+        async with semaphore:
+            return await client.connect(ws_url, room_id)
+
+    connected = []
+    for room, room_id in zip(rooms, room_ids):
+        room[0].is_owner = True
+        for client in room:
+            connected.append(connect(client, room_id))
+    await asyncio.gather(*connected)
+    connect_elapsed = time.perf_counter() - started
+
+    live = [c for room in rooms for c in room if c.ws is not None]
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(c.reader()) for c in live]
+
+    # join → ready → start: власник стартує гру, коли всі в кімнаті готові
+    for client in live:
+        await client.send("toggle_ready")
+    await asyncio.sleep(args.settle)
+    for room in rooms:
+        if room[0].ws is not None:
+            await room[0].send("start_game")
+
+    if args.chat_rate > 0:
+        tasks += [asyncio.create_task(c.chatter(args.chat_rate, stop)) for c in live]
+    rest_task = None
+    if args.rest_rate > 0:
+        rest_task = asyncio.create_task(rest_traffic(base_url, args.rest_rate, stop, stats, room_ids))
+
+    run_started = time.perf_counter()
+    sent_before, received_before = stats.sent, stats.received
+    while time.perf_counter() - run_started < args.duration:
+        await asyncio.sleep(min(1.0, args.duration))
+        if sampler:
+            sampler.sample()
+        if not args.chat_rate and stats.games_finished >= len(rooms):
+            break
+    run_elapsed = time.perf_counter() - run_started
+
+    stop.set()
+    if rest_task:
+        await rest_task
+    for client in live:
+        await client.ws.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = stats.broadcast_latencies
+    report = {
+        "commit": git_commit(),
+        "params": {
+            "players": args.players,
+            "room_size": args.room_size,
+            "rooms": len(rooms),
+            "duration_s": args.duration,
+            "chat_rate": args.chat_rate,
+            "rest_rate": args.rest_rate,
+            "encoding": args.encoding,
+        },
+        "connections": {
+            "opened": len(live),
+            "failed": stats.connect_failures,
+            "connect_elapsed_s": round(connect_elapsed, 3),
+            "connect_p50_ms": ms(percentile(stats.connect_times, 0.5)),
+            "connect_p99_ms": ms(percentile(stats.connect_times, 0.99)),
+        },
+        "games": {"started": stats.games_started, "finished": stats.games_finished},
+        "messages": {
+            "sent": stats.sent,
+            "received": stats.received,
+            "errors": stats.errors,
+            "rate_limited": stats.rate_limited,
+            "sent_per_sec": round((stats.sent - sent_before) / run_elapsed, 1),
+            "received_per_sec": round((stats.received - received_before) / run_elapsed, 1),
+            "received_bytes": stats.received_bytes,
+        },
+        "broadcast_latency": {
+            "samples": len(latencies),
+            "p50_ms": ms(percentile(latencies, 0.5)),
+            "p99_ms": ms(percentile(latencies, 0.99)),
+            "max_ms": ms(max(latencies) if latencies else None),
+        },
+    }
+    if args.rest_rate > 0:
+        report["rest"] = {
+            "requests": len(stats.rest_latencies),
+            "failures": stats.rest_failures,
+            "p50_ms": ms(percentile(stats.rest_latencies, 0.5)),
+            "p99_ms": ms(percentile(stats.rest_latencies, 0.99)),
+        }
+    if sampler:
+        report["server"] = sampler.report()
+    return report
+
+
+def ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+# Порівняння ключових метрик з попереднім прогоном (наприклад, з іншого коміту)
+COMPARED = [
+    ("messages", "received_per_sec"),
+    ("broadcast_latency", "p50_ms"),
+    ("broadcast_latency", "p99_ms"),
+    ("connections", "connect_p99_ms"),
+    ("rest", "p99_ms"),
+    ("server", "cpu_percent"),
+    ("server", "peak_rss_mb"),
+]
+
+
+def compare(previous, current):
+    rows = []
+    for section, key in COMPARED:
+        old = previous.get(section, {}).get(key)
+        new = current.get(section, {}).get(key)
+        change = None
+        if old and new is not None:
+            change = round((new - old) / old * 100, 1)
+        rows.append({"metric": f"{section}.{key}", "before": old, "after": new, "change_pct": change})
+    return {"before": previous.get("commit"), "after": current.get("commit"), "metrics": rows}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server():
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="mafia-load-")
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/load.db", PYTHONPATH=project_root)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(url + "/", timeout=0.5)
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WebSocket load generator for /ws/room/{room_id}")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start a temporary local uvicorn server")
+    parser.add_argument("--server-pid", type=int, default=None, help="sample CPU/memory of this process")
+    parser.add_argument("--players", type=int, default=60)
+    parser.add_argument("--room-size", type=int, default=6)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of game/chat traffic")
+    parser.add_argument("--chat-rate", type=float, default=0.5, help="chat messages per second per player")
+    parser.add_argument("--rest-rate", type=float, default=0,
+                        help="background REST requests per second during the run")
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds between ready and start_game")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json",
+                        help="wire format negotiated via WebSocket subprotocol")
+    parser.add_argument("--user-prefix", default=None, help="reuse accounts across runs")
+    parser.add_argument("--auth-concurrency", type=int, default=8)
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--output", default=None, help="write the JSON report to this file")
+    parser.add_argument("--compare", default=None, help="previous JSON report to compare with")
+    args = parser.parse_args(argv)
+
+    process = None
+    server_pid = args.server_pid
+    if args.spawn:
+        process, args.url = spawn_server()
+        server_pid = process.pid
+    try:
+        report = asyncio.run(run_load(args, server_pid))
+    finally:
+        if process:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(json.load(f), report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
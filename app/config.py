@@ -3,14 +3,112 @@ import os
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mafia.db")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+# Застосовувати міграції схеми під час старту застосунку. Для кількох воркерів краще вимкнути
+# і запускати "python -m app.migrations" окремим кроком розгортання
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1").lower() in ("1", "true", "yes")
+
+# Репліка лише для читання (списки кімнат, профілі, рейтинг, історія чату); порожньо — все йде в DATABASE_URL
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+if DATABASE_REPLICA_URL.startswith("postgres://"):
+    DATABASE_REPLICA_URL = DATABASE_REPLICA_URL.replace("postgres://", "postgresql://", 1)
+
+# Пул з'єднань кожного рушія: постійні з'єднання, додаткові понад них, скільки секунд чекати на вільне,
+# через скільки секунд перевідкривати з'єднання, перевірка перед видачею та ліміт часу запиту в Postgres (мс, 0 — без ліміту)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
     
 SECRET_KEY = os.getenv("SECRET_KEY", "super_secret_mafia_game_key_999")
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 
 
+# Каталог завантажень створюється під час старту застосунку (create_app), а не під час імпорту
 UPLOAD_FOLDER = "static/products/"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 MAX_CONTENT_LENGTH = 2 * 1024 * 1024
 ALLOWED_EXTENTIONS = {"png", "jpg", "jpeg", "gif"}
 
-ALGORITHM = "HS256"
\ No newline at end of file
+ALGORITHM = "HS256"
+
+# Набір ролей за замовчуванням: classic, simple або extended (див. app/game_rooms/roles.py).
+# Назву перевіряє roles.py під час імпорту, тож помилка зупиняє запуск, а не першу гру
+ROLE_PRESET = os.getenv("ROLE_PRESET", "classic")
+
+# Логування: рівень, формат (json або text), частка DEBUG-записів, що пишуться,
+# та кімнати з увімкненим DEBUG (через кому)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+LOG_DEBUG_ROOMS = [int(room_id) for room_id in os.getenv("LOG_DEBUG_ROOMS", "").split(",") if room_id.strip()]
+
+# Профілювання обробників WebSocket: частка викликів під cProfile, поріг "повільного"
+# виклику в мілісекундах і розмір журналу найповільніших викликів
+HANDLER_PROFILE_SAMPLE_RATE = float(os.getenv("HANDLER_PROFILE_SAMPLE_RATE", "0.01"))
+SLOW_HANDLER_MS = float(os.getenv("SLOW_HANDLER_MS", "100"))
+SLOW_HANDLER_LOG_SIZE = int(os.getenv("SLOW_HANDLER_LOG_SIZE", "50"))
+
+# Обмеження вхідних повідомлень WebSocket: "тип=швидкість:запас" через кому,
+# швидкість — токенів за секунду на гравця; "*" — спільне відро для всіх кадрів з'єднання
+RATE_LIMITS = {
+    key.strip(): tuple(float(part) for part in value.split(":"))
+    for key, value in (
+        item.split("=") for item in os.getenv(
+            "RATE_LIMITS",
+            "*=10:20,chat=1:5,toggle_ready=1:3,start_game=0.5:2,vote=2:4,night_action=2:4",
+        ).split(",") if item.strip()
+    )
+}
+# Максимальний розмір вхідного кадру та кількість порушень за вікно (секунд), після якої з'єднання закривається
+MAX_FRAME_BYTES = int(os.getenv("MAX_FRAME_BYTES", "8192"))
+RATE_LIMIT_MAX_VIOLATIONS = int(os.getenv("RATE_LIMIT_MAX_VIOLATIONS", "10"))
+RATE_LIMIT_VIOLATION_WINDOW = float(os.getenv("RATE_LIMIT_VIOLATION_WINDOW", "10"))
+
+# Heartbeat: як часто перевіряти з'єднання, після скількох секунд тиші слати ping,
+# коли вважати гравця втраченим і скільки чекати на відправлення/закриття сокета
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", "10"))
+HEARTBEAT_IDLE = float(os.getenv("HEARTBEAT_IDLE", "20"))
+HEARTBEAT_TIMEOUT = float(os.getenv("HEARTBEAT_TIMEOUT", "60"))
+HEARTBEAT_SEND_TIMEOUT = float(os.getenv("HEARTBEAT_SEND_TIMEOUT", "5"))
+
+# Режим drain перед перезапуском: скільки секунд дати поточним іграм, щоб завершитися
+DRAIN_DEADLINE = float(os.getenv("DRAIN_DEADLINE", "600"))
+
+# Checkpoint стану кімнат: файл SQLite, як часто (секунд) записувати змінені кімнати
+# і скільки чекати на знімок однієї кімнати, перш ніж відкласти її до наступного разу
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "checkpoints.db")
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "5"))
+CHECKPOINT_SNAPSHOT_TIMEOUT = float(os.getenv("CHECKPOINT_SNAPSHOT_TIMEOUT", "1"))
+
+# Журнал подій ігор: каталог з файлом <game_id>.jsonl на кожну гру, як часто скидати буфер на диск
+# (секунд) і після скількох подій у буфері скидати його раніше
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", "game_logs")
+EVENT_LOG_FLUSH_INTERVAL = float(os.getenv("EVENT_LOG_FLUSH_INTERVAL", "1"))
+EVENT_LOG_BATCH_SIZE = int(os.getenv("EVENT_LOG_BATCH_SIZE", "500"))
+
+# Розмір пулу потоків для синхронних обробників REST (def-ендпоінти FastAPI).
+# Більше потоків, ніж з'єднань у пулі БД (DB_POOL_SIZE + DB_MAX_OVERFLOW), лише чекатимуть на з'єднання
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+
+# Профіль SQLite: журнал (WAL дозволяє читати під час запису), synchronous=NORMAL (у WAL fsync лише
+# на checkpoint журналу), розмір mmap у байтах і скільки мілісекунд чекати на блокування замість помилки
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Швидка гра: розмір кімнат, які matchmaking створює сам (мінімум і максимум гравців), і скільки секунд
+# місце в кімнаті тримається за гравцем, якого туди направили, поки він не підключиться
+QUICK_PLAY_MIN_PLAYERS = int(os.getenv("QUICK_PLAY_MIN_PLAYERS", "6"))
+QUICK_PLAY_MAX_PLAYERS = int(os.getenv("QUICK_PLAY_MAX_PLAYERS", "10"))
+QUICK_JOIN_RESERVE = float(os.getenv("QUICK_JOIN_RESERVE", "15"))
+
+# Глядачі: скільки їх може бути в одній кімнаті, скільки подій чекають на розсилку глядачам
+# (найстаріші відкидаються) і скільком глядачам надсилати за раз, перш ніж поступитися циклом подій
+MAX_SPECTATORS = int(os.getenv("MAX_SPECTATORS", "1000"))
+SPECTATOR_BACKLOG = int(os.getenv("SPECTATOR_BACKLOG", "256"))
+SPECTATOR_BATCH = int(os.getenv("SPECTATOR_BATCH", "100"))
+
+# Єдиний потік запису в БД: скільки записів щонайбільше об'єднувати в одну транзакцію
+DB_WRITER_BATCH_SIZE = int(os.getenv("DB_WRITER_BATCH_SIZE", "256"))
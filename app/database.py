@@ -1,18 +1,147 @@
-from sqlalchemy import create_engine
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from app.config import DATABASE_URL
+from app.config import (
+    DATABASE_REPLICA_URL, DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_POOL_TIMEOUT,
+    DB_STATEMENT_TIMEOUT_MS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_JOURNAL_MODE, SQLITE_MMAP_SIZE, SQLITE_SYNCHRONOUS,
+)
+from app.config import DB_POOL_SIZE as POOL_SIZE
+from app.metrics import (
+    DB_COMMIT_SECONDS, DB_CONNECTION_HOLD_SECONDS, DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUTS, DB_POOL_OVERFLOW,
+    DB_POOL_SIZE, DB_ROLLBACKS,
+)
 
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+# Профіль SQLite для кожного нового з'єднання пулу: WAL, щоб читачі не блокували запис і навпаки,
+# synchronous=NORMAL замість fsync на кожен коміт, mmap для читання та busy_timeout замість "database is locked"
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    # Режим журналу зберігається у файлі бази; зміна потребує блокування, тож лише коли він інший
+    if cursor.execute("PRAGMA journal_mode").fetchone()[0].lower() != SQLITE_JOURNAL_MODE.lower():
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+
+# Рушій з налаштуваннями пулу з конфігурації. pre_ping перевіряє з'єднання перед видачею (після рестарту
+# бази чи обриву з боку проксі), recycle закриває старі з'єднання раніше за таймаут сервера.
+# Для Postgres statement_timeout обмежує кожен запит на боці сервера
+def create_db_engine(url, name="primary"):
+    options = {
+        "pool_size": POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if url.startswith("sqlite") and (url == "sqlite://" or ":memory:" in url):
+        # База в пам'яті живе в одному з'єднанні: власний пул SQLAlchemy без розміру й переповнення
+        options = {"connect_args": {"check_same_thread": False}}
+    elif url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    elif url.startswith("postgresql") and DB_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    db_engine = create_engine(url, **options)
+    if url.startswith("sqlite"):
+        event.listen(db_engine, "connect", _sqlite_pragmas)
+    _watch_pool(db_engine, name)
+    return db_engine
+
+
+# Пул з'єднань: скільки зараз видано, розмір, переповнення та як довго з'єднання тримають
+def _watch_pool(db_engine, name):
+    @event.listens_for(db_engine, "checkout")
+    def _connection_checked_out(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.labels(name).inc()
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(db_engine, "checkin")
+    def _connection_checked_in(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            DB_CONNECTION_HOLD_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+engine = create_db_engine(DATABASE_URL)
+# Репліка для читання; без DATABASE_REPLICA_URL читання йдуть у той самий рушій, що й запис
+read_engine = create_db_engine(DATABASE_REPLICA_URL, "replica") if DATABASE_REPLICA_URL else engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
+
+# Час коміту кожної сесії потрапляє в метрику mafia_db_commit_seconds
+@event.listens_for(SessionLocal, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _rolled_back(session):
+    DB_ROLLBACKS.inc()
+
+
+def _pool_stat(name):
+    engines = {"primary": engine, "replica": read_engine} if read_engine is not engine else {"primary": engine}
+    stats = {}
+    for label, db_engine in engines.items():
+        method = getattr(db_engine.pool, name, None)
+        stats[(label,)] = method() if method else 0
+    return stats
+
+
+DB_POOL_CHECKED_OUT.set_collector(lambda: _pool_stat("checkedout"))
+DB_POOL_SIZE.set_collector(lambda: _pool_stat("size"))
+DB_POOL_OVERFLOW.set_collector(lambda: _pool_stat("overflow"))
+
+
+# Одиниця роботи: сесія (і з'єднання з пулу) існує лише всередині блоку with.
+# Успішний блок комітиться, помилка відкочується; сесія закривається в будь-якому разі.
+# Для довгоживучих з'єднань (WebSocket) використовується лише вона, а не get_db.
+# expire_on_commit=False лишає об'єкти завантаженими після коміту, щоб їх можна було віддати назовні.
+@contextmanager
+def session_scope(expire_on_commit=True):
+    db = SessionLocal(expire_on_commit=expire_on_commit)
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# Лише читання, з репліки: нічого не комітиться, транзакція відкочується при закритті сесії.
+# Репліка може відставати від основної бази, тож дані, які щойно записав той самий запит
+# чи користувач (реєстрація, вхід, перевірка токена), читаються через session_scope з основної
+@contextmanager
+def read_scope():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def get_db():
     db = SessionLocal()
     try: 
         yield db 
     finally: 
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    with read_scope() as db:
+        yield db
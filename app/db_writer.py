@@ -0,0 +1,150 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+
+from app.config import DB_WRITER_BATCH_SIZE
+from app.database import engine, session_scope
+from app.logger import get_logger
+from app.metrics import DB_WRITER_BATCH, DB_WRITER_ERRORS, DB_WRITER_QUEUE
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+# Об'єкти, які повертають записи, лишаються завантаженими після коміту пачки
+def writer_scope():
+    return session_scope(expire_on_commit=False)
+
+
+def _noop(db):
+    return None
+
+
+# Єдиний потік запису в БД. Записи з циклу подій стають у чергу, а потік забирає все, що накопичилося
+# (до batch_size), і виконує однією транзакцією: один коміт на пачку замість коміту на кожен запис,
+# і жодної боротьби за блокування SQLite між потоками. Читання йдуть окремими з'єднаннями пулу.
+# Запис — це функція func(db, *args); її результат повертається після коміту пачки.
+# Один потік потрібен лише SQLite з його єдиним записувачем: на інших БД (serialize=False) кожен запис
+# комітиться одразу у власній сесії з пулу потоків і не чекає на чужі
+class DatabaseWriter:
+    def __init__(self, scope=writer_scope, batch_size=DB_WRITER_BATCH_SIZE, serialize=None):
+        self.scope = scope
+        self.batch_size = batch_size
+        self.serialize = engine.dialect.name == "sqlite" if serialize is None else serialize
+        # Записи, що виконуються напряму (без черги), — щоб flush міг на них зачекати. Це futures циклу подій:
+        # їх додають і прибирають лише в циклі, тоді як потік пулу лише завершує concurrent Future
+        self._direct = set()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def start(self):
+        with self._lock:
+            if not self.is_running:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    async def stop(self):
+        """Дописує все з черги та зупиняє потік."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            await asyncio.to_thread(thread.join)
+        self._thread = None
+
+    def submit(self, func, *args):
+        """Ставить запис у чергу (потік стартує за потреби). Повертає concurrent.futures.Future."""
+        future = Future()
+        if not self.serialize:
+            loop = asyncio.get_running_loop()
+            waiter = asyncio.wrap_future(future, loop=loop)
+            self._direct.add(waiter)
+            waiter.add_done_callback(self._forget)
+            loop.run_in_executor(None, self._write, [(func, args, future)])
+            return future
+        self.start()
+        self._queue.put((func, args, future))
+        return future
+
+    async def run(self, func, *args):
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    async def flush(self):
+        """Чекає, доки всі поставлені раніше записи буде закомічено."""
+        if self._direct:
+            await asyncio.wait(list(self._direct))
+        if self.is_running:
+            await self.run(_noop)
+
+    def _forget(self, waiter):
+        self._direct.discard(waiter)
+        # Помилку отримує той, хто чекає на сам Future (run); тут її лише позначаємо як побачену
+        if not waiter.cancelled():
+            waiter.exception()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def _commit(self, batch):
+        with self.scope() as db:
+            return [func(db, *args) for func, args, _ in batch]
+
+    def _write(self, batch):
+        # Записи, на які вже ніхто не чекає (скасовані), пропускаються
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        DB_WRITER_BATCH.observe(len(batch))
+        if len(batch) == 1:
+            self._write_one(batch[0])
+            return
+        try:
+            results = self._commit(batch)
+        except Exception:
+            # Пачка відкотилася цілком: повторюємо записи поодинці, щоб помилку отримав лише винний
+            for item in batch:
+                self._write_one(item)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _write_one(self, item):
+        func, args, future = item
+        try:
+            result = self._commit([item])[0]
+        except Exception as e:
+            DB_WRITER_ERRORS.inc()
+            logger.exception("Database write %s failed", getattr(func, "__name__", func))
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+
+db_writer = DatabaseWriter()
+DB_WRITER_QUEUE.set_collector(lambda: {(): db_writer.pending})
@@ -0,0 +1,100 @@
+import anyio.from_thread
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.auth import get_current_user
+from app.database import read_scope, session_scope
+from app.game_rooms.notifications import notifications
+from app.game_rooms.presence import presence
+
+router = APIRouter(tags=["Friends"])
+
+
+# Друзі кількох користувачів одним запитом: {user_id: [(friend_id, username), ...]}
+def friends_of(db: Session, user_ids):
+    user_ids = list(user_ids)
+    friends = {user_id: [] for user_id in user_ids}
+    if not user_ids:
+        return friends
+    rows = db.execute(
+        select(models.Friendship.user_id, models.User.id, models.User.username)
+        .join(models.User, models.User.id == models.Friendship.friend_id)
+        .where(models.Friendship.user_id.in_(user_ids))
+        .order_by(models.Friendship.user_id, models.User.username)
+    )
+    for user_id, friend_id, username in rows:
+        friends[user_id].append((friend_id, username))
+    return friends
+
+
+# Хто додав цих користувачів у друзі (індекс friend_id, user_id): {user_id: [(follower_id, username), ...]}
+def followers_of(db: Session, user_ids):
+    user_ids = list(user_ids)
+    followers = {user_id: [] for user_id in user_ids}
+    if not user_ids:
+        return followers
+    rows = db.execute(
+        select(models.Friendship.friend_id, models.User.id, models.User.username)
+        .join(models.User, models.User.id == models.Friendship.user_id)
+        .where(models.Friendship.friend_id.in_(user_ids))
+        .order_by(models.Friendship.friend_id, models.User.username)
+    )
+    for user_id, follower_id, username in rows:
+        followers[user_id].append((follower_id, username))
+    return followers
+
+
+def friend_ids(db: Session, user_id: int):
+    return list(db.scalars(select(models.Friendship.friend_id).where(models.Friendship.user_id == user_id)))
+
+
+@router.post("/friends")
+def add_friend(
+        friend_data: schemas.AddFriend,
+        current_user: models.User = Depends(get_current_user)
+):
+    with session_scope() as db:
+        friend = db.get(models.User, friend_data.friend_id)
+        if not friend:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        if db.get(models.Friendship, (current_user.id, friend_data.friend_id)):
+            raise HTTPException(status_code=400, detail="User is already in your friends list")
+
+        db.add(models.Friendship(user_id=current_user.id, friend_id=friend_data.friend_id))
+    # Якщо користувач зараз онлайн, він одразу стежить і за новим другом (реєстр живе в циклі подій)
+    anyio.from_thread.run(presence.follow, current_user.id, friend_data.friend_id)
+    anyio.from_thread.run(notifications.notify, friend_data.friend_id, {
+        "type": "friend_added",
+        "user_id": current_user.id,
+        "username": current_user.username,
+    })
+    return {"message": "Friend added successfully"}
+
+
+# Списки з іменами одним запитом; з'єднання повертається в пул до перевірки response_model (див. app/main.py)
+@router.get("/friends", response_model=list[schemas.UserBase])
+def get_friends(current_user: models.User = Depends(get_current_user)):
+    with read_scope() as db:
+        friends = friends_of(db, [current_user.id])[current_user.id]
+    return [{"id": friend_id, "username": username} for friend_id, username in friends]
+
+
+@router.get("/friends/followers", response_model=list[schemas.UserBase])
+def get_followers(current_user: models.User = Depends(get_current_user)):
+    with read_scope() as db:
+        followers = followers_of(db, [current_user.id])[current_user.id]
+    return [{"id": follower_id, "username": username} for follower_id, username in followers]
+
+
+# Стан друзів з реєстру присутності: онлайн спочатку, далі за іменем
+@router.get("/friends/online")
+def get_online_friends(current_user: models.User = Depends(get_current_user)):
+    with read_scope() as db:
+        friends = friends_of(db, [current_user.id])[current_user.id]
+    # Реєстр змінюється лише в циклі подій, тож і читається там
+    found = anyio.from_thread.run_sync(presence.statuses, [friend_id for friend_id, _ in friends])
+    statuses = [{**status, "username": username} for status, (_, username) in zip(found, friends)]
+    return sorted(statuses, key=lambda status: (status["status"] == "offline", status["username"]))
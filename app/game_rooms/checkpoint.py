@@ -0,0 +1,176 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+from app.config import CHECKPOINT_INTERVAL, CHECKPOINT_PATH, CHECKPOINT_SNAPSHOT_TIMEOUT
+from app.logger import get_logger
+from app.metrics import (
+    CHECKPOINT_BYTES,
+    CHECKPOINT_ROOMS,
+    CHECKPOINT_SKIPPED,
+    CHECKPOINT_SNAPSHOT_SECONDS,
+    CHECKPOINT_WRITE_SECONDS,
+)
+from app.game_rooms.game_models import GameRoom
+from app.game_rooms.room_storage import active_rooms
+
+logger = get_logger(__name__)
+
+
+# Сховище checkpoint: одна таблиця SQLite, рядок на кімнату. Методи блокуючі — викликаються через to_thread
+class CheckpointStore:
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS room_checkpoints ("
+                "room_id INTEGER PRIMARY KEY, version INTEGER NOT NULL, saved_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+        return self
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def write(self, snapshots, deleted=()):
+        """Зберігає знімки та видаляє кімнати одним записом. Повертає розміри знімків у байтах."""
+        rows = [
+            (snapshot["id"], snapshot["version"], time.time(), json.dumps(snapshot, separators=(",", ":")))
+            for snapshot in snapshots
+        ]
+        self.open()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO room_checkpoints (room_id, version, saved_at, data) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.executemany("DELETE FROM room_checkpoints WHERE room_id = ?", [(room_id,) for room_id in deleted])
+        return [len(row[3]) for row in rows]
+
+    def load(self):
+        self.open()
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM room_checkpoints").fetchall()
+        return [json.loads(data) for data, in rows]
+
+
+# Інкрементальний checkpoint: раз на interval записує лише кімнати, чия версія змінилася.
+# Знімок знімається в акторі кімнати (узгоджений стан), а серіалізація й запис — в окремому потоці.
+# Знімки кімнат знімаються паралельно; кімната, чия черга не встигла за snapshot_timeout,
+# пропускається й лишається зміненою до наступного запису, не затримуючи решту
+class Checkpointer:
+    def __init__(self, store=None, rooms=active_rooms, interval=CHECKPOINT_INTERVAL,
+                 snapshot_timeout=CHECKPOINT_SNAPSHOT_TIMEOUT):
+        self.store = store or CheckpointStore()
+        self.rooms = rooms
+        self.interval = interval
+        self.snapshot_timeout = snapshot_timeout
+        self._saved = {}
+        self._deleted = set()
+        self._task = None
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.is_running:
+            # Новий запуск застосунку може йти в іншому циклі подій
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await asyncio.to_thread(self.store.close)
+
+    def forget(self, room_id):
+        """Кімната більше не існує: її checkpoint буде видалено під час наступного запису."""
+        self._saved.pop(room_id, None)
+        self._deleted.add(room_id)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Checkpoint failed")
+
+    async def flush(self):
+        """Записує всі змінені кімнати. Повертає кількість записаних кімнат."""
+        async with self._flush_lock:
+            dirty = [room for room in list(self.rooms.values()) if self._saved.get(room.id) != room.version]
+            snapshots = await asyncio.gather(*(self._snapshot_within_timeout(room) for room in dirty))
+            snapshots = [snapshot for snapshot in snapshots if snapshot is not None]
+            deleted, self._deleted = self._deleted, set()
+            return await self._write(snapshots, deleted)
+
+    async def save(self, snapshots):
+        """Записує вже зняті знімки (без тайм-ауту й пропусків) — наприклад, останні перед drain."""
+        async with self._flush_lock:
+            return await self._write(snapshots, ())
+
+    async def _write(self, snapshots, deleted):
+        if not snapshots and not deleted:
+            return 0
+        started = time.perf_counter()
+        sizes = await asyncio.to_thread(self.store.write, snapshots, deleted)
+        CHECKPOINT_WRITE_SECONDS.observe(time.perf_counter() - started)
+        for snapshot, size in zip(snapshots, sizes):
+            # Кімнату могли видалити, поки йшов запис
+            if snapshot["id"] not in self._deleted:
+                self._saved[snapshot["id"]] = snapshot["version"]
+            CHECKPOINT_BYTES.observe(size)
+        CHECKPOINT_ROOMS.inc(len(snapshots))
+        return len(snapshots)
+
+    async def _snapshot_within_timeout(self, room):
+        try:
+            return await asyncio.wait_for(room.actor.call(self._snapshot, room), self.snapshot_timeout)
+        except asyncio.TimeoutError:
+            CHECKPOINT_SKIPPED.labels("timeout").inc()
+            room.log.warning("Checkpoint snapshot timed out, retrying next interval")
+        except Exception:
+            CHECKPOINT_SKIPPED.labels("error").inc()
+            room.log.exception("Checkpoint snapshot failed")
+        return None
+
+    async def _snapshot(self, room):
+        with CHECKPOINT_SNAPSHOT_SECONDS.time():
+            return room.snapshot()
+
+    async def restore(self):
+        """Відновлює кімнати з checkpoint у rooms. Завершені ігри не відновлюються."""
+        restored = 0
+        for snapshot in await asyncio.to_thread(self.store.load):
+            room_id = snapshot["id"]
+            if snapshot["phase"] == "ended" or not snapshot["players"] or room_id in self.rooms:
+                self.forget(room_id)
+                continue
+            room = GameRoom.from_snapshot(snapshot)
+            self.rooms[room_id] = room
+            self._saved[room_id] = room.version
+            restored += 1
+            room.log.info("Restored room from checkpoint (phase %s, round %s)", room.phase, room.round)
+        logger.info("Restored %s rooms from checkpoint", restored)
+        return restored
+
+
+checkpointer = Checkpointer()
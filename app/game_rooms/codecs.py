@@ -0,0 +1,59 @@
+import json
+
+try:
+    import msgpack
+except ImportError:  # MessagePack необов'язковий: без нього сервер говорить лише JSON
+    msgpack = None
+
+
+# Текстові JSON-кадри; формат за замовчуванням для клієнтів без підпротоколу
+class JsonCodec:
+    name = "json"
+    subprotocol = "mafia.json"
+
+    def encode(self, message):
+        return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+    def parse(self, adapter, raw):
+        return adapter.validate_json(raw)
+
+    async def send(self, websocket, frame):
+        await websocket.send_text(frame)
+
+
+# Бінарні кадри MessagePack для клієнтів, що запросили підпротокол mafia.msgpack
+class MsgpackCodec:
+    name = "msgpack"
+    subprotocol = "mafia.msgpack"
+
+    def encode(self, message):
+        return msgpack.packb(message, use_bin_type=True)
+
+    def parse(self, adapter, raw):
+        try:
+            message = msgpack.unpackb(raw, raw=False)
+        except Exception:
+            # Нерозбірний кадр відхиляє сам валідатор конверта
+            message = None
+        return adapter.validate_python(message)
+
+    async def send(self, websocket, frame):
+        await websocket.send_bytes(frame)
+
+
+JSON_CODEC = JsonCodec()
+MSGPACK_CODEC = MsgpackCodec() if msgpack is not None else None
+
+CODECS = {codec.subprotocol: codec for codec in (JSON_CODEC, MSGPACK_CODEC) if codec is not None}
+
+
+def negotiate_codec(offered):
+    """
+    Обирає кодек за списком підпротоколів, які запропонував клієнт (у порядку клієнта).
+    Повертає (кодек, підпротокол для accept); без збігів — JSON без підпротоколу.
+    """
+    for subprotocol in offered:
+        codec = CODECS.get(subprotocol)
+        if codec is not None:
+            return codec, subprotocol
+    return JSON_CODEC, None
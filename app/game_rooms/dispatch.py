@@ -0,0 +1,218 @@
+import cProfile
+import heapq
+import io
+import itertools
+import pstats
+import random
+import time
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.config import HANDLER_PROFILE_SAMPLE_RATE, SLOW_HANDLER_LOG_SIZE, SLOW_HANDLER_MS
+from app.logger import get_logger
+from app.metrics import HANDLER_ERRORS, HANDLER_PAYLOAD_BYTES, HANDLER_SECONDS, INVALID_MESSAGES
+from app.schemas import EmptyPayload, InboundMessage
+from app.game_rooms.codecs import JSON_CODEC
+
+logger = get_logger(__name__)
+
+# Словник для збереження обробників повідомлень
+message_handlers = {}
+
+# Валідатори payload за типом повідомлення, зібрані один раз при реєстрації обробника
+message_validators = {}
+
+_envelope = TypeAdapter(InboundMessage)
+
+# Проміжні хуки навколо кожного виклику обробника: async def hook(ctx, call_next)
+handler_hooks = []
+
+
+# Контекст одного виклику обробника, спільний для всіх хуків
+class HandlerContext:
+    __slots__ = ("message_type", "handler", "kwargs", "payload_size", "duration", "profile")
+
+    def __init__(self, message_type, handler, kwargs, payload_size):
+        self.message_type = message_type
+        self.handler = handler
+        self.kwargs = kwargs
+        self.payload_size = payload_size
+        self.duration = None
+        self.profile = None
+
+    @property
+    def room(self):
+        return self.kwargs.get("room")
+
+    @property
+    def player(self):
+        return self.kwargs.get("player")
+
+
+async def _invoke(ctx):
+    return await ctx.handler(**ctx.kwargs)
+
+
+_chain = _invoke
+
+
+def _rebuild_chain():
+    # Ланцюжок хуків збирається один раз при зміні списку, а не на кожне повідомлення
+    global _chain
+    chain = _invoke
+    for hook in reversed(handler_hooks):
+        chain = (lambda hook, call_next: lambda ctx: hook(ctx, call_next))(hook, chain)
+    _chain = chain
+
+
+def add_handler_hook(hook):
+    handler_hooks.append(hook)
+    _rebuild_chain()
+    return hook
+
+
+def remove_handler_hook(hook):
+    if hook in handler_hooks:
+        handler_hooks.remove(hook)
+        _rebuild_chain()
+
+
+# Декоратор для реєстрації обробників повідомлень за типом.
+# payload_model описує payload; обробник отримує вже перевірений екземпляр моделі.
+def register_handler(message_type, payload_model=EmptyPayload):
+    def decorator(func):
+        logger.debug("Registered handler: %s → %s", message_type, func.__name__)
+        message_handlers[message_type] = func
+        message_validators[message_type] = TypeAdapter(payload_model)
+        return func
+    return decorator
+
+
+def parse_message(raw, codec=JSON_CODEC):
+    """
+    Розбирає та перевіряє сирий кадр (у форматі codec) ще до того, як він потрапить у чергу кімнати.
+    Повертає (тип, обробник, payload); обробник None, якщо тип невідомий.
+    Некоректний JSON або payload піднімає ValidationError.
+    """
+    _, message_type, handler, payload = parse_channel_message(raw, codec)
+    return message_type, handler, payload
+
+
+def parse_channel_message(raw, codec=JSON_CODEC):
+    """Те саме для кадрів спільного сокета користувача: (канал, тип, обробник, payload)."""
+    try:
+        message = codec.parse(_envelope, raw)
+        validator = message_validators.get(message.type)
+        if validator is None:
+            return message.channel, message.type, None, message.payload
+        return message.channel, message.type, message_handlers[message.type], validator.validate_python(message.payload)
+    except ValidationError:
+        INVALID_MESSAGES.inc()
+        raise
+
+
+def validation_error_message(error):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'message'}: {item['msg']}"
+        for item in error.errors(include_url=False)
+    )
+
+
+async def dispatch(message_type, handler, payload_size=0, **kwargs):
+    """Викликає обробник через ланцюжок хуків. kwargs передаються обробнику як є."""
+    return await _chain(HandlerContext(message_type, handler, kwargs, payload_size))
+
+
+# Розмір вхідних кадрів за типом повідомлення
+async def payload_size_hook(ctx, call_next):
+    HANDLER_PAYLOAD_BYTES.labels(ctx.message_type).observe(ctx.payload_size)
+    return await call_next(ctx)
+
+
+# Час виконання та помилки обробників
+async def timing_hook(ctx, call_next):
+    started = time.perf_counter()
+    try:
+        return await call_next(ctx)
+    except Exception:
+        HANDLER_ERRORS.labels(ctx.message_type).inc()
+        raise
+    finally:
+        ctx.duration = time.perf_counter() - started
+        HANDLER_SECONDS.labels(ctx.message_type).observe(ctx.duration)
+
+
+# Журнал найповільніших викликів: мін-купа фіксованого розміру за тривалістю
+class SlowHandlerLog:
+    def __init__(self, size):
+        self.size = size
+        self._heap = []
+        self._counter = itertools.count()
+
+    def record(self, ctx):
+        if self.size <= 0:
+            return
+        duration = ctx.duration
+        if len(self._heap) >= self.size and duration <= self._heap[0][0]:
+            return
+        room, player = ctx.room, ctx.player
+        entry = {
+            "type": ctx.message_type,
+            "duration_ms": round(duration * 1000, 3),
+            "payload_bytes": ctx.payload_size,
+            "room_id": getattr(room, "id", None),
+            "phase": getattr(room, "phase", None),
+            "round": getattr(room, "round", None),
+            "players": len(room.players) if room is not None else None,
+            "player_id": getattr(player, "id", None),
+            "at": time.time(),
+            "profile": ctx.profile,
+        }
+        item = (duration, next(self._counter), entry)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+        else:
+            heapq.heapreplace(self._heap, item)
+
+    def top(self, limit=None):
+        entries = [entry for _, _, entry in sorted(self._heap, reverse=True)]
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        self._heap.clear()
+
+
+slow_handlers = SlowHandlerLog(SLOW_HANDLER_LOG_SIZE)
+_profiling = False
+
+
+async def slow_handler_hook(ctx, call_next):
+    """
+    Записує виклик у журнал найповільніших. Частину викликів (HANDLER_PROFILE_SAMPLE_RATE)
+    проганяє під cProfile і зберігає профіль, якщо виклик виявився повільним.
+    Профіль охоплює весь потік, тож може містити й інші задачі циклу подій, що працювали під час await.
+    """
+    global _profiling
+    profiler = None
+    if not _profiling and HANDLER_PROFILE_SAMPLE_RATE > 0 and random.random() < HANDLER_PROFILE_SAMPLE_RATE:
+        _profiling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        return await call_next(ctx)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _profiling = False
+        if ctx.duration is not None:
+            if profiler is not None and ctx.duration * 1000 >= SLOW_HANDLER_MS:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(15)
+                ctx.profile = out.getvalue()
+            slow_handlers.record(ctx)
+
+
+# Порядок має значення: timing_hook виставляє ctx.duration для slow_handler_hook
+add_handler_hook(payload_size_hook)
+add_handler_hook(slow_handler_hook)
+add_handler_hook(timing_hook)
@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+from app.config import DRAIN_DEADLINE, HEARTBEAT_SEND_TIMEOUT
+from app.logger import get_logger
+from app.metrics import DRAINING
+from app.game_rooms.room_storage import active_rooms
+from app.game_rooms.checkpoint import checkpointer
+from app.db_writer import db_writer
+
+logger = get_logger(__name__)
+
+# Код закриття WebSocket "Service Restart": клієнт має перепідключитися пізніше
+SERVICE_RESTART = 1012
+
+IN_PROGRESS = ("night", "day")
+
+
+# Режим drain: нові кімнати й підключення не приймаються, кімнати в очікуванні
+# розпускаються одразу, а поточним іграм дається час до дедлайну, щоб завершитися
+class DrainController:
+    def __init__(self, rooms=active_rooms, checkpoints=checkpointer, poll_interval=0.5, close_timeout=HEARTBEAT_SEND_TIMEOUT,
+                 clock=time.monotonic, writer=db_writer):
+        self.rooms = rooms
+        self.checkpoints = checkpoints
+        self.writer = writer
+        self.poll_interval = poll_interval
+        self.close_timeout = close_timeout
+        self.clock = clock
+        self.draining = False
+        self.deadline = None
+        self._task = None
+
+    @property
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self, deadline=DRAIN_DEADLINE):
+        if not self.is_running:
+            self._task = asyncio.create_task(self.drain(deadline))
+        return self.status()
+
+    def status(self):
+        games = sum(1 for room in list(self.rooms.values()) if room.phase in IN_PROGRESS)
+        return {
+            "draining": self.draining,
+            "seconds_left": max(0.0, round(self.deadline - self.clock(), 1)) if self.deadline else None,
+            "rooms": len(self.rooms),
+            "games_in_progress": games,
+        }
+
+    async def drain(self, deadline=DRAIN_DEADLINE):
+        """
+        Переводить процес у режим drain і чекає, поки ігри завершаться або мине deadline (секунд).
+        Після повернення в пам'яті не лишається кімнат, а черги їхніх акторів порожні.
+        Останній знімок кожної кімнати знімається в її акторі в момент розпуску, після всіх
+        команд, що встигли стати в чергу, тож незавершені ігри продовжаться після перезапуску
+        саме з того стану, який бачили гравці. Наостанок дописується черга потоку запису в БД.
+        """
+        self.draining = True
+        self.deadline = self.clock() + deadline
+        logger.info("Draining %s rooms, deadline in %ss", len(self.rooms), deadline)
+
+        await self.checkpoints.flush()
+        notices = []
+        for room in list(self.rooms.values()):
+            if room.phase in IN_PROGRESS:
+                notices.append(room.actor.call(room.broadcast, {
+                    "type": "server_draining",
+                    "message": (
+                        "Сервер перезапускається. Якщо гра не завершиться вчасно, "
+                        "вона продовжиться після перепідключення"
+                    ),
+                    "seconds_left": deadline,
+                }))
+            else:
+                notices.append(self.release(room))
+        released = await asyncio.gather(*notices)
+        # Знімки пишуться без тайм-ауту: наступного інтервалу checkpoint після drain не буде
+        await self.checkpoints.save([snapshot for snapshot in released if snapshot is not None])
+
+        while self.clock() < self.deadline and any(room.phase in IN_PROGRESS for room in list(self.rooms.values())):
+            await asyncio.sleep(self.poll_interval)
+
+        released = await asyncio.gather(*(self.release(room) for room in list(self.rooms.values())))
+        await self.checkpoints.save(released)
+        await self.writer.flush()
+        logger.info("Drain finished")
+
+    def reset(self):
+        """Знімає режим drain: новий запуск застосунку в тому самому процесі знову приймає кімнати."""
+        if self.is_running:
+            self._task.cancel()
+        self._task = None
+        self.draining = False
+        self.deadline = None
+
+    async def release(self, room):
+        """
+        Просить гравців кімнати перепідключитися до іншого сервера та закриває їхні сокети.
+        Повертає знімок кімнати на момент розпуску.
+        """
+        players, snapshot = await room.actor.call(self._release, room)
+        await asyncio.gather(*(self._close(player) for player in players))
+        await room.actor.join()
+        await room.fanout.join()
+        return snapshot
+
+    async def _release(self, room):
+        players = list(room.players.values())
+        snapshot = room.snapshot()
+        await room.broadcast({
+            "type": "server_draining",
+            "message": "Сервер перезапускається, перепідключіться до кімнати",
+            "reconnect": True,
+        })
+        room.players.clear()
+        # Глядачі отримують те саме повідомлення й закриття після гравців
+        room.fanout.close(SERVICE_RESTART)
+        if self.rooms.get(room.id) is room:
+            del self.rooms[room.id]
+        room.log.info("Room released for drain")
+        return players, snapshot
+
+    async def _close(self, player):
+        try:
+            await asyncio.wait_for(player.websocket.close(code=SERVICE_RESTART), self.close_timeout)
+        except Exception as e:
+            logger.debug("Closing socket of player %s failed: %s", player.id, e)
+
+
+server_drain = DrainController()
+DRAINING.set_collector(lambda: {(): 1 if server_drain.draining else 0})
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+
+from fastapi import APIRouter, HTTPException, Path, Query
+from fastapi.responses import StreamingResponse
+
+from app.config import EVENT_LOG_BATCH_SIZE, EVENT_LOG_DIR, EVENT_LOG_FLUSH_INTERVAL
+from app.logger import get_logger
+from app.metrics import EVENT_LOG_EVENTS, EVENT_LOG_FLUSH_SECONDS
+
+logger = get_logger(__name__)
+
+router = APIRouter(tags=["Games"])
+
+INDEX_FILE = "index.jsonl"
+GAME_ID_PATTERN = "^[0-9a-f]{32}$"
+
+
+def _dumps(entry):
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+# Журнал подій ігор: одна подія — один рядок JSON у файлі <game_id>.jsonl, лише дописування.
+# Події накопичуються в пам'яті й серіалізуються та скидаються на диск пачками в окремому потоці.
+# Завершені ігри потрапляють в index.jsonl (room_id, час, переможець).
+class EventLog:
+    def __init__(self, directory=EVENT_LOG_DIR, flush_interval=EVENT_LOG_FLUSH_INTERVAL,
+                 batch_size=EVENT_LOG_BATCH_SIZE):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.enabled = False
+        self._pending = {}
+        self._pending_count = 0
+        self._finished = []
+        # Кеш index.jsonl; його будують і доповнюють різні потоки (to_thread), тому лише під _index_lock
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._task = None
+        self._wakeup = None
+
+    def start(self):
+        if not self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self.enabled = True
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.enabled = False
+        await self.flush()
+
+    # Запис подій (викликається з обробників у акторі кімнати, без вводу-виводу)
+
+    def begin(self, room):
+        """Починає журнал нової гри: room.game_id і склад гравців з ролями."""
+        if not self.enabled:
+            room.game_id = None
+            return
+        room.game_id = uuid.uuid4().hex
+        room.game_started_at = time.time()
+        self.record(
+            room, "game_started",
+            room_id=room.id,
+            role_preset=room.role_preset,
+            started_at=room.game_started_at,
+            players=[{"id": p.id, "name": p.name, "role": p.role} for p in room.players.values()],
+        )
+
+    def record(self, room, event_type, **data):
+        game_id = room.game_id
+        if game_id is None or not self.enabled:
+            return
+        # t — мілісекунди від початку гри; за ними replay відтворює паузи між подіями
+        event = {"t": round((time.time() - room.game_started_at) * 1000), "type": event_type, "round": room.round}
+        event.update(data)
+        self._pending.setdefault(game_id, []).append(event)
+        self._pending_count += 1
+        EVENT_LOG_EVENTS.labels(event_type).inc()
+        if self._pending_count >= self.batch_size:
+            self._wakeup.set()
+
+    def end(self, room, winner):
+        if room.game_id is None or not self.enabled:
+            return
+        self.record(room, "game_over", winner=winner,
+                    players=[{"id": p.id, "role": p.role, "is_alive": p.is_alive} for p in room.players.values()])
+        self._finished.append({
+            "game_id": room.game_id,
+            "room_id": room.id,
+            "started_at": room.game_started_at,
+            "ended_at": time.time(),
+            "rounds": room.round,
+            "winner": winner,
+        })
+        room.game_id = None
+
+    # Скидання на диск
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Event log flush failed")
+
+    async def flush(self):
+        if not self._pending and not self._finished:
+            return
+        pending, self._pending, self._pending_count = self._pending, {}, 0
+        finished, self._finished = self._finished, []
+        started = time.perf_counter()
+        await asyncio.to_thread(self._write, pending, finished)
+        EVENT_LOG_FLUSH_SECONDS.observe(time.perf_counter() - started)
+
+    def _write(self, pending, finished):
+        os.makedirs(self.directory, exist_ok=True)
+        for game_id, events in pending.items():
+            with open(self._path(game_id), "a", encoding="utf-8") as f:
+                f.write("".join(_dumps(event) + "\n" for event in events))
+        if finished:
+            # Файл і кеш змінюються разом: кеш, що саме читає файл, не пропустить дописаних записів
+            with self._index_lock:
+                with open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8") as f:
+                    f.write("".join(_dumps(entry) + "\n" for entry in finished))
+                if self._index is not None:
+                    for entry in finished:
+                        self._index[entry["game_id"]] = entry
+
+    # Читання (блокуючі методи, викликаються через to_thread)
+
+    def _path(self, game_id):
+        return os.path.join(self.directory, f"{game_id}.jsonl")
+
+    def _load_index(self):
+        # Викликається під _index_lock
+        if self._index is None:
+            index = {}
+            path = os.path.join(self.directory, INDEX_FILE)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            index[entry["game_id"]] = entry
+            self._index = index
+        return self._index
+
+    def game(self, game_id):
+        with self._index_lock:
+            return self._load_index().get(game_id)
+
+    def room_games(self, room_id):
+        with self._index_lock:
+            return [entry for entry in self._load_index().values() if entry["room_id"] == room_id]
+
+    def events(self, game_id):
+        with open(self._path(game_id), encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+event_log = EventLog()
+
+
+# Завершені ігри кімнати, від найновішої
+@router.get("/rooms/{room_id}/games")
+async def get_room_games(room_id: int):
+    games = await asyncio.to_thread(event_log.room_games, room_id)
+    return sorted(games, key=lambda entry: entry["started_at"], reverse=True)
+
+
+# Відтворення завершеної гри потоком NDJSON. speed — множник швидкості; 0 — без пауз
+@router.get("/games/{game_id}/replay")
+async def replay_game(
+        game_id: str = Path(..., pattern=GAME_ID_PATTERN),
+        speed: float = Query(1.0, ge=0, le=1000),
+):
+    if await asyncio.to_thread(event_log.game, game_id) is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    events = await asyncio.to_thread(event_log.events, game_id)
+
+    async def stream():
+        previous = 0
+        for event in events:
+            if speed > 0 and event["t"] > previous:
+                await asyncio.sleep((event["t"] - previous) / 1000 / speed)
+            previous = event["t"]
+            yield _dumps(event) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
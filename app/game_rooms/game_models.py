@@ -1,25 +1,44 @@
 import asyncio
 import random
+import time
 from typing import List, Dict
 from sqlalchemy.orm import Session
 from app.models import Room
 from itertools import count
 from fastapi import WebSocket, WebSocketDisconnect
+from app.game_rooms.room_actor import RoomActor
+from app.game_rooms.roles import get_role_distribution
+from app.config import MAX_SPECTATORS, ROLE_PRESET
+from app.logger import get_logger, room_logger
+from app.metrics import BROADCAST_BYTES, BROADCAST_FRAMES, BROADCAST_SECONDS
+from app.game_rooms.codecs import JSON_CODEC
+from app.game_rooms.projections import PUBLIC, RoomProjections
+from app.game_rooms.spectators import SpectatorFanout
 
 from websockets import broadcast
 
+logger = get_logger(__name__)
+
 # Клас гравця, що представляє окремого користувача в грі
 class Player:
-    def __init__(self, id, name, websocket):
+    def __init__(self, id, name, websocket, codec=JSON_CODEC, channel=None):
         self.id = id
         self.name = name
         self.websocket = websocket
+        # Формат кадрів, узгоджений при підключенні (JSON або MessagePack)
+        self.codec = codec
+        # Канал на спільному сокеті користувача ("room:5"), яким позначається кожне вихідне повідомлення;
+        # None — окремий сокет кімнати
+        self.channel = channel
+        # Час останнього кадру від клієнта (time.monotonic) та останній виміряний RTT у секундах
+        self.last_seen = time.monotonic()
+        self.rtt = None
         self.is_ready = False
         self.is_alive = True
         self.role = None
         self.vote = None
         self.night_action = None
-        print(f"Created player {id} with name {name}")
+        logger.debug("Created player %s with name %s", id, name)
 
     def to_dict(self):
         return {
@@ -28,57 +47,116 @@ class Player:
             "username": self.name,
             "is_ready": self.is_ready,
             "is_alive": self.is_alive,
-            "role": self.role,
             "is_owner": False  # Буде встановлено в GameRoom
         }
     
+    async def send(self, message):
+        # websocket None — гравець відновлений з checkpoint і ще не перепідключився
+        if self.websocket is None:
+            return
+        await self.codec.send(self.websocket, self.codec.encode(self.tag(message)))
+
+    def tag(self, message):
+        return message if self.channel is None else {"channel": self.channel, **message}
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "is_ready": self.is_ready,
+            "is_alive": self.is_alive,
+            "role": self.role,
+            "vote": self.vote,
+            "night_action": self.night_action,
+        }
+
+    @classmethod
+    def from_snapshot(cls, data):
+        player = cls(id=data["id"], name=data["name"], websocket=None)
+        player.is_ready = data["is_ready"]
+        player.is_alive = data["is_alive"]
+        player.role = data["role"]
+        player.vote = data["vote"]
+        player.night_action = data["night_action"]
+        return player
+
     def reset(self):
         self.is_ready = False
         self.is_alive = True
         self.role = None
         self.vote = None
         self.night_action = None
-        print(f"Reset player {self.id} state")
+        logger.debug("Reset player %s state", self.id)
         
 # Клас кімнати гри
 class GameRoom:
-    def __init__(self, id, name, owner_id, min_players=6, max_players=10, is_private = False):
+    def __init__(self, id, name, owner_id, min_players=6, max_players=10, is_private = False, role_preset=ROLE_PRESET):
         self.id = id
         self.name = name
         self.owner = owner_id
         self.min_players = min_players
         self.max_players = max_players
         self.players = {}
+        # Глядачі (Spectator, по одному на з'єднання) не входять у players, не рахуються в max_players
+        # і не зберігаються в checkpoint
+        self.spectators = set()
+        self.max_spectators = MAX_SPECTATORS
         self.phase = "waiting"  # waiting, night, day
         self.round = 0
         self.is_game_over = False
         self.is_private = is_private
+        self.role_preset = role_preset
         self.night_actions = {
             "mafia": [],
             "doctor": None,
             "detective": None
         }
         self.votes = {}
-        print(f"Created game room {id} with name {name}")
+        # Ідентифікатор поточної гри в журналі подій (None, якщо журнал не ведеться)
+        self.game_id = None
+        self.game_started_at = None
+        # Лічильник змін стану: збільшується після кожної команди, що могла змінити кімнату
+        self.version = 0
+        # Усі команди гравців кімнати виконуються послідовно через актор
+        self.actor = RoomActor(self)
+        self.fanout = SpectatorFanout(self)
+        # Списки гравців для кожного виду, закешовані до наступної зміни version
+        self.projections = RoomProjections(self)
+        # Логер з room_id; DEBUG можна увімкнути для окремої кімнати
+        self.log = room_logger(logger, id)
+        self.log.info("Created game room %s with name %s", id, name)
 
     def add_player(self, player):
         if len(self.players) >= self.max_players:
-            print(f"Cannot add player {player.id}: room is full")
+            self.log.info("Cannot add player %s: room is full", player.id)
             return False
         self.players[player.id] = player
-        print(f"Added player {player.id} to room {self.id}")
+        self.mark_dirty()
+        self.log.debug("Added player %s to room %s", player.id, self.id)
         return True
 
     def remove_player(self, player_id):
         if player_id in self.players:
             del self.players[player_id]
+            self.mark_dirty()
             if self.owner == player_id and self.players:
                 self.owner = next(iter(self.players))
-                print(f"New owner is {self.owner}")
-            print(f"Removed player {player_id} from room {self.id}")
+                self.log.info("New owner is %s", self.owner)
+            self.log.debug("Removed player %s from room %s", player_id, self.id)
             return True
         return False
     
+    def add_spectator(self, spectator):
+        if len(self.spectators) >= self.max_spectators:
+            self.log.info("Cannot add spectator %s: too many spectators", spectator.id)
+            return False
+        spectator.since = self.fanout.seq
+        self.spectators.add(spectator)
+        return True
+
+    def remove_spectator(self, spectator):
+        self.spectators.discard(spectator)
+
     def get_player(self, player_id):
         return self.players.get(player_id)
     
@@ -86,43 +164,110 @@ class GameRoom:
         player = self.get_player(player_id)
         if player:
             player.is_alive = False
-            print(f"Player {player_id} was killed")
+            self.mark_dirty()
+            self.log.debug("Player %s was killed", player_id)
             return True
         return False
 
-    def to_dict(self):
-        players_list = []
-        for p in self.players.values():
-            p_dict = p.to_dict()
-            p_dict["is_owner"] = (p.id == self.owner) # Динамически определяем владельца комнаты
-            players_list.append(p_dict)
-            
+    def mark_dirty(self):
+        self.version += 1
+
+    # Повний стан кімнати для checkpoint; ключі словників — рядки, як їх поверне JSON
+    def snapshot(self):
         return {
             "id": self.id,
             "name": self.name,
             "owner": self.owner,
             "min_players": self.min_players,
             "max_players": self.max_players,
+            "is_private": self.is_private,
+            "role_preset": self.role_preset,
             "phase": self.phase,
             "round": self.round,
             "is_game_over": self.is_game_over,
-            "players": players_list
+            "night_actions": {**self.night_actions, "mafia": list(self.night_actions["mafia"])},
+            "votes": {str(voter): target for voter, target in self.votes.items()},
+            "version": self.version,
+            "game_id": self.game_id,
+            "game_started_at": self.game_started_at,
+            "players": [player.snapshot() for player in self.players.values()],
         }
 
-    async def broadcast(self, message):
-        print(f"Broadcasting message to {len(self.players)} players in room {self.id}")
-        for player in self.players.values():
-            try:
-                await player.websocket.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting to player {player.id}: {str(e)}")
+    @classmethod
+    def from_snapshot(cls, data):
+        room = cls(
+            id=data["id"],
+            name=data["name"],
+            owner_id=data["owner"],
+            min_players=data["min_players"],
+            max_players=data["max_players"],
+            is_private=data["is_private"],
+            role_preset=data["role_preset"],
+        )
+        room.phase = data["phase"]
+        room.round = data["round"]
+        room.is_game_over = data["is_game_over"]
+        room.night_actions = data["night_actions"]
+        room.votes = {int(voter): target for voter, target in data["votes"].items()}
+        room.version = data["version"]
+        room.game_id = data.get("game_id")
+        room.game_started_at = data.get("game_started_at")
+        for player_data in data["players"]:
+            player = Player.from_snapshot(player_data)
+            room.players[player.id] = player
+        return room
+
+    def to_dict(self, view=PUBLIC):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "owner": self.owner,
+            "min_players": self.min_players,
+            "max_players": self.max_players,
+            "phase": self.phase,
+            "round": self.round,
+            "is_game_over": self.is_game_over,
+            "players": self.projections.players(view)
+        }
+
+    async def broadcast(self, message, with_players=False):
+        """
+        Розсилає повідомлення гравцям і глядачам. З with_players=True кожен отримувач
+        додатково бачить у "players" список гравців свого виду (див. RoomProjections).
+        """
+        self.log.debug("Broadcasting message to %s players in room %s", len(self.players), self.id)
+        # Повідомлення кодується один раз для кожного формату, каналу та виду, а не для кожного гравця
+        frames = {}
+        with BROADCAST_SECONDS.time():
+            for player in list(self.players.values()):
+                if player.websocket is None:
+                    continue
+                codec = player.codec
+                view = self.projections.view_for(player) if with_players else None
+                key = (codec, player.channel, view)
+                frame = frames.get(key)
+                if frame is None:
+                    projected = {**message, "players": self.projections.players(view)} if with_players else message
+                    frame = frames[key] = codec.encode(player.tag(projected))
+                try:
+                    await codec.send(player.websocket, frame)
+                except Exception as e:
+                    self.log.warning("Error broadcasting to player %s: %s", player.id, e)
+                    continue
+                BROADCAST_FRAMES.inc()
+                BROADCAST_BYTES.labels(codec.name).inc(len(frame))
+        # Глядачам — окремою задачею після гравців; список гравців їм потрібен лише тоді, коли вони є
+        if self.spectators:
+            if with_players:
+                message = {**message, "players": self.projections.players(self.projections.spectator_view())}
+            self.fanout.publish(message)
     
     def check_victory(self):
         if not self.is_game_over:
             mafia_count = sum(1 for p in self.players.values() if p.is_alive and p.role == "mafia")
             civilians_count = sum(1 for p in self.players.values() if p.is_alive and p.role != "mafia")
             
-            print(f"Victory check: mafia={mafia_count}, civilians={civilians_count}")
+            self.log.debug("Victory check: mafia=%s, civilians=%s", mafia_count, civilians_count)
             
             if mafia_count == 0:
                 return "civilians"
@@ -132,24 +277,25 @@ class GameRoom:
 
     def can_start_game(self) -> bool:
         if self.phase != "waiting":
-            print("Game cannot start: wrong phase")
+            self.log.debug("Game cannot start: wrong phase")
             return False
         if len(self.players) < self.min_players:
-            print("Game cannot start: not enough players")
+            self.log.debug("Game cannot start: not enough players")
             return False
         if not all(player.is_ready for player in self.players.values()):
-            print("Game cannot start: not all players are ready")
+            self.log.debug("Game cannot start: not all players are ready")
             return False
-        print("Game can start!")
+        self.log.debug("Game can start!")
         return True
 
     def start_game(self):
-        print(f"Starting game in room {self.id}...")
+        self.log.debug("Starting game in room %s...", self.id)
         if not self.can_start_game():
-            print("Cannot start game: conditions not met")
+            self.log.info("Cannot start game: conditions not met")
             raise ValueError("Cannot start game: conditions not met")
-        
-        print("Setting game state...")
+        # Ролі рахуються до будь-яких змін: якщо набір неможливий (ValueError), кімната лишається в очікуванні
+        roles = list(get_role_distribution(len(self.players), self.role_preset))
+
         self.phase = "night"  # Починаємо з ночі
         self.round = 1
         self.is_game_over = False
@@ -160,25 +306,22 @@ class GameRoom:
         }
         self.votes = {}
         
-        print("Assigning roles...")
-        self.assign_roles()
+        self.assign_roles(roles)
         
-        print("Resetting player states...")
         for player in self.players.values():
             player.is_ready = False
             player.is_alive = True
-            print(f"Player {player.id} ({player.name}): role={player.role}, is_alive={player.is_alive}")
+        self.mark_dirty()
         
-        print(f"Game started in room {self.id}")
+        self.log.info("Game started in room %s with %s players", self.id, len(self.players))
 
-    def assign_roles(self):
-        print(f"Assigning roles in room {self.id}...")
-        roles = ["mafia", "mafia", "doctor", "detective", "civilian", "civilian"]
+    def assign_roles(self, roles):
+        # roles — набір з get_role_distribution (уже порахований і закешований), тут лише перемішується
         random.shuffle(roles)
         
         players_list = list(self.players.values())
         for player, role in zip(players_list, roles):
             player.role = role
-            print(f"Assigned role {role} to player {player.id} ({player.name})")
+            self.log.debug("Assigned role %s to player %s (%s)", role, player.id, player.name)
 
 
@@ -1,26 +1,44 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status, Depends, Query
 from fastapi.websockets import WebSocketState
+from fastapi.concurrency import run_in_threadpool
 import json
-from app.database import get_db
+from app.database import get_read_db, session_scope
+from app.db_writer import db_writer
 from app.models import Messages, User, Room
 from sqlalchemy.orm import Session
 from jose import jwt, JWTError
 from app.auth import  get_user_by_email
-from app.config import SECRET_KEY, ALGORITHM
+from app.config import SECRET_KEY, ALGORITHM, HEARTBEAT_SEND_TIMEOUT
 import random, string
 from app.game_rooms.game_models import GameRoom, Player
+from app.game_rooms.spectators import Spectator
 from app.game_rooms.room_storage import active_rooms
 import asyncio
+import time
 from datetime import datetime
 from typing import Dict
+from app.logger import get_logger
+from app.metrics import (
+    AUTH_RESULTS, OVERSIZED_FRAMES, POLICY_DISCONNECTS, RATE_LIMITED, UNKNOWN_MESSAGES, WS_CONNECTIONS,
+    WS_CONNECTIONS_TOTAL, WS_RTT_SECONDS,
+)
+from app.game_rooms.codecs import negotiate_codec
+from app.game_rooms.rate_limit import ALL_FRAMES, ConnectionLimiter
+from app.game_rooms.drain import SERVICE_RESTART, server_drain
+from app.game_rooms.checkpoint import checkpointer
+from app.game_rooms.event_log import event_log
+from app.game_rooms.presence import presence
+from app.game_rooms.matchmaking import matchmaker
+from app.friends import friend_ids
+from app.game_rooms.dispatch import dispatch, message_handlers, parse_message, register_handler, validation_error_message
+from app.schemas import ChatPayload, EmptyPayload, PongPayload, TargetPayload
+from pydantic import ValidationError
+
+logger = get_logger(__name__)
 
 router = APIRouter(tags=["Rooms"])
 
 
-# Словник для збереження обробників повідомлень
-message_handlers = {}
-
-
 # Помилка автентифікації
 credentials_exception = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -28,28 +46,19 @@ credentials_exception = HTTPException(
     headers={"WWW-Authenticate": "Bearer"},
 )
 
-# Декоратор для реєстрації обробників повідомлень за типом
-def register_handler(message_type):
-    def decorator(func):
-        print(f"Registered handler: {message_type} → {func.__name__}")
-        message_handlers[message_type] = func 
-        return func
-    return decorator
-
 # Отримуємо користувача за токеном
-async def get_user_by_token(token: str, db: Session):
+def get_user_by_token(token: str, db: Session):
     try:
-        print(f"Decoding token: {token}")
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            print("No email found in token")
+            logger.info("No email found in token")
             raise credentials_exception
         user = get_user_by_email(db, email)
-        print(f"User found: {user}")
+        logger.debug("User found: %s", user.id if user else None)
         return user
     except JWTError as e:
-        print(f"JWT Error: {e}")
+        logger.info("JWT Error: %s", e)
         raise credentials_exception
 
 
@@ -61,128 +70,371 @@ def generate_guest_name():
 
 # WebSocket підключення до кімнати
 @router.websocket("/ws/room/{room_id}")
-async def websocket_endpoint(websocket: WebSocket, room_id: int, token: str = Query(None), db: Session = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket, room_id: int, token: str = Query(None)):
     try:
-        print(f"WebSocket connection attempt for room {room_id}")
+        logger.debug("WebSocket connection attempt for room %s", room_id)
+
+        # Під час drain нові підключення не приймаються: клієнт перепідключиться до іншого сервера
+        if server_drain.draining:
+            await websocket.accept()
+            await websocket.close(code=SERVICE_RESTART)
+            return
         
         # Перевіряємо токен
         if not token:
-            print("No token provided")
+            logger.info("No token provided")
+            AUTH_RESULTS.labels("missing").inc()
             await websocket.close(code=4000)
             return
             
-        # Отримуємо користувача
+        # Отримуємо користувача та кімнату. З'єднання з БД береться лише на час цих запитів,
+        # а не на все життя сокета; далі обробники відкривають власні короткі сесії
         try:
-            user = await get_user_by_token(token, db)
+            user, db_room, friends = await run_in_threadpool(load_user_and_room, token, room_id)
         except Exception as e:
-            print(f"Token or User verification error: {str(e)}")
+            logger.info("Token or User verification error: %s", e)
+            AUTH_RESULTS.labels("invalid").inc()
             await websocket.close(code=4000)
             return
         
         if not user:
-            print("User not found via token")
+            logger.info("User not found via token")
+            AUTH_RESULTS.labels("unknown_user").inc()
             await websocket.close(code=4000)
             return
+        AUTH_RESULTS.labels("ok").inc()
         
         # Перевіряємо чи існує кімната в базі даних
-        db_room = db.query(Room).filter(Room.id == room_id).first()
         if not db_room:
-            print(f"Room {room_id} not found in database")
+            logger.info("Room %s not found in database", room_id)
             await websocket.close(code=4000)
             return
 
-        # Перевіряємо чи існує кімната в активних кімнатах
-        room = active_rooms.get(room_id)
-        if not room:
-            # Якщо кімнати немає в active_rooms, створюємо її
-            room = GameRoom(
-                id=db_room.id,
-                name=db_room.name,
-                owner_id=db_room.owner,
-                min_players=db_room.min_players_number,
-                max_players=db_room.max_players_number
+        room = get_or_create_room(db_room)
+
+        # Приймаємо з'єднання; формат кадрів обирається за підпротоколом клієнта
+        codec, subprotocol = negotiate_codec(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=subprotocol)
+        room.log.info("WebSocket connection accepted for user %s in room %s", user.id, room_id)
+        WS_CONNECTIONS.inc()
+        WS_CONNECTIONS_TOTAL.inc()
+        try:
+            # Додаємо гравця до кімнати (через актор, щоб не перетинатися з іншими командами)
+            player = await room.actor.call(
+                join_room, room, Player(id=user.id, name=user.username, websocket=websocket, codec=codec)
             )
-            active_rooms[room_id] = room
-            print(f"Created new room instance: {room.id}")
+            if player is None:
+                room.log.info("Cannot add player %s to room %s", user.id, room_id)
+                await websocket.close(code=4003)
+                return
+
+            # Друзі бачать, що користувач у кімнаті; він отримує стан друзів і подальші зміни
+            await presence.connect(user.id, friends, player, room_id=room_id)
+            limiter = ConnectionLimiter()
+            try:
+                while True:
+                    raw = await receive_frame(websocket)
+                    player.last_seen = time.monotonic()
+                    room.log.debug("Received message from player %s: %s", user.id, raw)
+
+                    # Завеликі кадри та флуд відсікаються ще до розбору
+                    if limiter.frame_too_large(raw):
+                        room.log.info("Oversized frame (%s) from player %s", len(raw), user.id)
+                        OVERSIZED_FRAMES.inc()
+                        POLICY_DISCONNECTS.labels("oversized").inc()
+                        await websocket.close(code=1009)
+                        raise WebSocketDisconnect(1009)
+                    if not limiter.allow(ALL_FRAMES):
+                        await throttle(room, player, limiter, ALL_FRAMES)
+                        continue
+
+                    # Некоректні кадри відкидаються ще до черги кімнати
+                    try:
+                        msg_type, handler, payload = parse_message(raw, player.codec)
+                    except ValidationError as e:
+                        await player.send({
+                            "type": "error",
+                            "message": f"Некоректне повідомлення: {validation_error_message(e)}"
+                        })
+                        continue
+
+                    await handle_room_message(room, player, limiter, msg_type, handler, payload, len(raw))
+
+            except WebSocketDisconnect:
+                room.log.info("WebSocket disconnected for player %s", user.id)
+                await room.actor.call(leave_room, room, player, websocket)
+            finally:
+                # shield: друзі мають дізнатися про відключення, навіть якщо задачу обробника скасовано
+                await asyncio.shield(presence.disconnect(user.id, player))
+        finally:
+            WS_CONNECTIONS.dec()
+
+    except Exception as e:
+        logger.exception("Error in WebSocket connection: %s", e)
+        try:
+            if websocket.client_state.CONNECTED:
+                await websocket.close(code=1011)
+        except Exception:
+            pass
+        
 
-        # Приймаємо з'єднання
+# Перегляд кімнати без участі в грі: лише публічні події, без ролей до кінця гри.
+# Дивитися можна лише кімнату, що вже є в пам'яті; кадри від глядача, крім закриття, відхиляються
+@router.websocket("/ws/room/{room_id}/watch")
+async def watch_endpoint(websocket: WebSocket, room_id: int, token: str = Query(None)):
+    if server_drain.draining:
         await websocket.accept()
-        print(f"WebSocket connection accepted for user {user.id} in room {room_id}")
+        await websocket.close(code=SERVICE_RESTART)
+        return
+    if not token:
+        AUTH_RESULTS.labels("missing").inc()
+        await websocket.close(code=4000)
+        return
+    try:
+        user, _ = await run_in_threadpool(load_user, token)
+    except Exception as e:
+        logger.info("Token or User verification error: %s", e)
+        AUTH_RESULTS.labels("invalid").inc()
+        await websocket.close(code=4000)
+        return
+    if not user:
+        AUTH_RESULTS.labels("unknown_user").inc()
+        await websocket.close(code=4000)
+        return
+    AUTH_RESULTS.labels("ok").inc()
 
-        # Додаємо гравця до кімнати
-        player = Player(id=user.id, name=user.username, websocket=websocket)
-        if not room.add_player(player):
-            print(f"Cannot add player {user.id} to room {room_id}")
-            await websocket.close(code=4003)
-            return
+    room = active_rooms.get(room_id)
+    if room is None:
+        await websocket.close(code=4000)
+        return
 
-        # Відправляємо повідомлення про підключення
-        await room.broadcast({
-            "type": "player_joined",
-            "username": player.name,
-            "players": [p.to_dict() for p in room.players.values()]
+    codec, subprotocol = negotiate_codec(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
+    spectator = Spectator(id=user.id, name=user.username, websocket=websocket, codec=codec)
+    if not await room.actor.call(watch_room, room, spectator):
+        await websocket.close(code=4003)
+        return
+    limiter = ConnectionLimiter()
+    try:
+        while True:
+            raw = await receive_frame(websocket)
+            if limiter.frame_too_large(raw):
+                OVERSIZED_FRAMES.inc()
+                POLICY_DISCONNECTS.labels("oversized").inc()
+                await websocket.close(code=1009)
+                break
+            if not limiter.allow(ALL_FRAMES) and limiter.violation():
+                POLICY_DISCONNECTS.labels("rate_limit").inc()
+                await websocket.close(code=1008)
+                break
+    except WebSocketDisconnect:
+        room.log.debug("Spectator %s disconnected", user.id)
+    finally:
+        room.remove_spectator(spectator)
+
+
+# Додавання глядача (в акторі кімнати, щоб room_state не розминувся з подіями, що йдуть після нього)
+async def watch_room(room: GameRoom, spectator: Spectator):
+    if not room.add_spectator(spectator):
+        return False
+    # Черга кімнати чекає на глядача не довше, ніж розсилка глядачам (SpectatorFanout.send_timeout)
+    try:
+        await asyncio.wait_for(spectator.send({
+            "type": "room_state",
+            "room": room.to_dict(room.projections.spectator_view()),
+            "spectating": True,
+        }), HEARTBEAT_SEND_TIMEOUT)
+    except Exception as e:
+        room.log.info("Spectator %s left before room state: %s", spectator.id, e)
+        room.remove_spectator(spectator)
+        return False
+    return True
+
+
+# Кімната з пам'яті; якщо її там немає (наприклад, після перезапуску), створюємо з запису в БД
+def get_or_create_room(db_room: Room):
+    room = active_rooms.get(db_room.id)
+    if not room:
+        room = GameRoom(
+            id=db_room.id,
+            name=db_room.name,
+            owner_id=db_room.owner,
+            min_players=db_room.min_players_number,
+            max_players=db_room.max_players_number
+        )
+        active_rooms[db_room.id] = room
+        room.log.info("Created new room instance: %s", room.id)
+    return room
+
+
+# Розібране повідомлення гравця: ліміт за типом і виконання обробника в черзі кімнати.
+# Спільне для сокета кімнати та каналу кімнати на сокеті користувача (app/game_rooms/user_socket.py)
+async def handle_room_message(room: GameRoom, player: Player, limiter: ConnectionLimiter, msg_type: str, handler,
+                              payload, payload_size: int):
+    if handler and not limiter.allow(msg_type):
+        await throttle(room, player, limiter, msg_type)
+        return
+
+    if handler:
+        # Обробники однієї кімнати виконуються строго по черзі, через ланцюжок хуків
+        await room.actor.call(
+            dispatch,
+            msg_type,
+            handler,
+            payload_size=payload_size,
+            websocket=player.websocket,
+            payload=payload,
+            room_id=room.id,
+            db_writer=db_writer,
+            player=player,
+            room=room
+        )
+    else:
+        room.log.info("Unknown message type: %s", msg_type)
+        UNKNOWN_MESSAGES.inc()
+        await player.send({
+            "type": "error",
+            "message": f"Невідомий тип повідомлення: {msg_type}"
         })
 
-        # Відправляємо початковий стан кімнати
-        await websocket.send_json({
+
+# Відкидаємо повідомлення понад ліміт; після надто багатьох порушень закриваємо з'єднання (1008)
+async def throttle(room: GameRoom, player: Player, limiter: ConnectionLimiter, message_type: str):
+    RATE_LIMITED.labels(message_type).inc()
+    if limiter.violation():
+        room.log.info("Disconnecting player %s for flooding", player.id)
+        POLICY_DISCONNECTS.labels("rate_limit").inc()
+        await player.websocket.close(code=1008)
+        raise WebSocketDisconnect(1008)
+    await player.send({
+        "type": "error",
+        "code": "rate_limited",
+        "message": "Забагато повідомлень, спробуйте пізніше"
+    })
+
+
+# Користувач за токеном і його друзі в одній короткій сесії (у пулі потоків)
+def load_user(token: str):
+    with session_scope() as db:
+        user = get_user_by_token(token, db)
+        friends = friend_ids(db, user.id) if user else []
+        db.expunge_all()
+    return user, friends
+
+
+# Користувач за токеном, кімната та друзі (для підписки на їхню присутність) в одній короткій сесії;
+# об'єкти повертаються від'єднаними. Виконується в пулі потоків, як і решта роботи з БД поза REST
+def load_user_and_room(token: str, room_id: int):
+    with session_scope() as db:
+        user = get_user_by_token(token, db)
+        db_room = db.query(Room).filter(Room.id == room_id).first() if user else None
+        friends = friend_ids(db, user.id) if user else []
+        db.expunge_all()
+    return user, db_room, friends
+
+
+# Позначаємо кімнату в БД неактивною після завершення гри (запис для db_writer)
+def deactivate_room(db: Session, room_id: int):
+    db.query(Room).filter(Room.id == room_id).update({Room.is_active: False})
+
+
+# Отримуємо наступний кадр: текст для JSON, байти для MessagePack
+async def receive_frame(websocket: WebSocket):
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    text = message.get("text")
+    return text if text is not None else message.get("bytes")
+
+
+# Додавання гравця до кімнати (виконується в акторі кімнати).
+# Повертає гравця, що сидить у кімнаті, або None, якщо місця немає.
+async def join_room(room: GameRoom, player: Player):
+    seated = room.players.get(player.id)
+    if seated is not None:
+        # Повторне підключення (зокрема до кімнати, відновленої з checkpoint): роль і стан зберігаються
+        seated.websocket = player.websocket
+        seated.codec = player.codec
+        seated.channel = player.channel
+        seated.last_seen = player.last_seen
+        await seated.send({
             "type": "room_state",
-            "room": room.to_dict(),
+            "room": room.to_dict(room.projections.view_for(seated)),
         })
-        print(f"Sent initial room state to player {user.id}")
+        if seated.role:
+            await seated.send(role_message(room, seated))
+        room.log.info("Player %s reattached to room %s", seated.id, room.id)
+        return seated
+
+    if not room.add_player(player):
+        return None
+    matchmaker.seated(room, player.id)
+
+    # Відправляємо повідомлення про підключення
+    await room.broadcast({
+        "type": "player_joined",
+        "username": player.name,
+    }, with_players=True)
+
+    # Відправляємо початковий стан кімнати
+    await player.send({
+        "type": "room_state",
+        "room": room.to_dict(room.projections.view_for(player)),
+    })
+    room.log.debug("Sent initial room state to player %s", player.id)
+    return player
+
+
+# Видалення гравця з кімнати (виконується в акторі кімнати). websocket — з'єднання, що закрилося:
+# якщо гравець уже перепідключився через інше, його місце лишається за ним
+async def leave_room(room: GameRoom, player: Player, websocket):
+    if room.players.get(player.id) is not player or player.websocket is not websocket:
+        return
+    room.remove_player(player.id)
+    if not room.players:
+        if active_rooms.get(room.id) is room:
+            del active_rooms[room.id]
+            checkpointer.forget(room.id)
+        matchmaker.left(room, player.id)
+        room.fanout.close()
+        room.log.info("Room %s deleted as it's empty", room.id)
+    else:
+        await room.broadcast({
+            "type": "player_left",
+            "username": player.name,
+        }, with_players=True)
+        matchmaker.left(room, player.id)
+        room.log.debug("Player %s removed from room %s", player.id, room.id)
+
+
+# Роль гравця; мафія також дізнається своїх спільників
+def role_message(room: GameRoom, member: Player):
+    role_info = {
+        "type": "role_assigned",
+        "role": member.role
+    }
+    if member.role == "mafia":
+        role_info["other_mafia"] = [
+            {"id": p.id, "name": p.name}
+            for p in room.players.values()
+            if p.role == "mafia" and p.id != member.id
+        ]
+    return role_info
+
+
+# Відповідь клієнта на heartbeat ping: ts — значення з ping, повернуте без змін
+@register_handler("pong", PongPayload)
+async def handle_pong(payload: PongPayload, player: Player, **kwargs):
+    rtt = time.monotonic() - payload.ts / 1000
+    if rtt >= 0:
+        player.rtt = rtt
+        WS_RTT_SECONDS.observe(rtt)
 
-        try:
-            while True:
-                data = await websocket.receive_json()
-                print(f"Received message from player {user.id}: {data}")
-                
-                msg_type = data.get("type")
-                payload = data.get("payload", {})
-                
-                handler = message_handlers.get(msg_type)
-                    
-                if handler:
-                    await handler(
-                        websocket=websocket, 
-                        payload=payload, 
-                        room_id=room_id, 
-                        db=db, 
-                        player=player,
-                        room=room
-                    )
-                else:
-                    print(f"Unknown message type: {msg_type}")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": f"Невідомий тип повідомлення: {msg_type}"
-                    })
-
-        except WebSocketDisconnect:
-            print(f"WebSocket disconnected for player {user.id}")
-            room.remove_player(player.id)
-            if not room.players:
-                del active_rooms[room_id]
-                print(f"Room {room_id} deleted as it's empty")
-            else:
-                await room.broadcast({
-                    "type": "player_left",
-                    "username": player.name,
-                    "players": [p.to_dict() for p in room.players.values()]
-                })
-                print(f"Player {user.id} removed from room {room_id}")
 
-    except Exception as e:
-        print(f"Error in WebSocket connection: {str(e)}")
-        try:
-            if websocket.client_state.CONNECTED:
-                await websocket.close(code=1011)
-        except Exception:
-            pass
-        
-        
 # Обробка чату   
-@register_handler("chat")
-async def handle_chat(payload: dict, db: Session, player: Player ,room: GameRoom, **kwargs):
-    message = payload.get("message", "")
+@register_handler("chat", ChatPayload)
+async def handle_chat(payload: ChatPayload, player: Player, room: GameRoom, db_writer=db_writer, **kwargs):
+    message = payload.message
     if not message.strip():
         return
 
@@ -193,64 +445,54 @@ async def handle_chat(payload: dict, db: Session, player: Player ,room: GameRoom
         "message": message
     })
 
-    # Зберігаємо повідомлення в базі даних
+    # Зберігаємо повідомлення в базі даних. Запис іде в чергу потоку запису й комітиться пачкою
+    # разом з іншими; черга кімнати на нього не чекає, помилки логує сам db_writer
     if player.id:  # Тільки для авторизованих користувачів
-        new_message = Messages(
-            message=message,
-            user_id=player.id,
-            room_id=room.id
-        )
-        db.add(new_message)
-        db.commit()
+        db_writer.submit(save_message, message, player.id, room.id)
+
+
+def save_message(db: Session, message: str, user_id: int, room_id: int):
+    db.add(Messages(
+        message=message,
+        user_id=user_id,
+        room_id=room_id
+    ))
     
     
 # Обробка початку гри
 @register_handler("start_game")
-async def handler_start_game(websocket: WebSocket, payload: dict, player: Player, room: GameRoom, **kwargs):
+async def handler_start_game(websocket: WebSocket, payload: EmptyPayload, player: Player, room: GameRoom, **kwargs):
     if room.owner != player.id:
-        await websocket.send_json({
+        await player.send({
             "type": "error",
             "message": "Тільки власник кімнати може почати гру"
         })
         return
     
     if not room.can_start_game():
-        print("Game cannot start: conditions not met")
-        await websocket.send_json({
+        room.log.debug("Game cannot start: conditions not met")
+        await player.send({
             "type": "error",
             "message": "Не всі гравці готові або недостатньо гравців"
             })
         return
 
     try:
-        print("Starting game...")
         room.start_game()
+        event_log.begin(room)
+        matchmaker.game_started(room)
         
         # Потім відправляємо інформацію про ролі
-        for player in room.players.values():
-            role_info = {
-                    "type": "role_assigned",
-                    "role": player.role
-            }
-            
-            if player.role == "mafia":
-                other_mafia = [
-                    {"id": p.id, "name": p.name}
-                    for p in room.players.values()
-                    if p.role == "mafia" and p.id != player.id
-                ]
-                role_info["other_mafia"] = other_mafia
-            
-            await player.websocket.send_json(role_info)
-            print(f"Sent role info to player {player.id}")
+        for member in room.players.values():
+            await member.send(role_message(room, member))
+            room.log.debug("Sent role info to player %s", member.id)
 
         # Відправляємо повідомлення про початок гри
         await room.broadcast({
             "type": "game_started",
             "phase": room.phase,
             "round": room.round,
-            "players": [p.to_dict() for p in room.players.values()]
-        })
+        }, with_players=True)
         
         # Відправляємо повідомлення про нічну фазу
         await room.broadcast({
@@ -259,17 +501,17 @@ async def handler_start_game(websocket: WebSocket, payload: dict, player: Player
             "round": 1
         })
         
-        print("Game started successfully")
+        room.log.debug("Game started successfully")
     except Exception as e:
-        print(f"Error starting game: {str(e)}")
-        await websocket.send_json({
+        room.log.exception("Error starting game: %s", e)
+        await player.send({
             "type": "error",
             "message": f"Помилка при початку гри: {str(e)}"
         })
 
 
 # Головна логіка роботи нічних дій
-async def resolve_night(room: GameRoom, db: Session ):
+async def resolve_night(room: GameRoom, db_writer=db_writer):
     mafia_targets = room.night_actions["mafia"]
     doctor_save = room.night_actions["doctor"]
     detective_check = room.night_actions["detective"]
@@ -283,12 +525,14 @@ async def resolve_night(room: GameRoom, db: Session ):
     # 2. Применяем ночные действия (убийство или спасение доктором)
     if victim:
         if doctor_save == victim.id:
+            event_log.record(room, "player_saved", player_id=victim.id)
             await room.broadcast({
                 "type": "player_saved",
                 "message": f"Гравця {victim.name} намагались вбити, але лікар врятував його!"
             })
         else:
             room.kill_player(victim.id)
+            event_log.record(room, "player_killed", player_id=victim.id, by="mafia")
             await room.broadcast({
                 "type": "player_killed",
                 "message": f"{victim.name} був вбитий цієї ночі."
@@ -300,7 +544,9 @@ async def resolve_night(room: GameRoom, db: Session ):
         if checked:
             detective = next((p for p in room.players.values() if p.role == "detective"), None)
             if detective:
-                await detective.websocket.send_json({
+                event_log.record(room, "investigation", player_id=detective.id, target_id=checked.id,
+                                 is_mafia=checked.role == "mafia")
+                await detective.send({
                     "type": "investigation_result",
                     "target": checked.name,
                     "is_mafia": checked.role == "mafia"
@@ -315,18 +561,17 @@ async def resolve_night(room: GameRoom, db: Session ):
 
     for p in room.players.values():
         p.is_ready = False
+    room.mark_dirty()
 
     # 5. Проверяем условия победы ПОСЛЕ того, как жертва официально погибла
     winner = room.check_victory()
     if winner:
         room.phase = "ended"
         room.is_game_over = True
+        event_log.end(room, winner)
         
         # Обновляем статус в БД
-        db_room = db.query(Room).filter(Room.id == room.id).first()
-        if db_room:
-            db_room.is_active = False
-            db.commit()
+        await db_writer.run(deactivate_room, room.id)
 
         await room.broadcast({
             "type": "game_over",
@@ -343,6 +588,7 @@ async def resolve_night(room: GameRoom, db: Session ):
 
     # 6. Если игра продолжается, переходим к дневной фазе
     room.phase = "day"
+    event_log.record(room, "phase_change", phase="day")
     await room.broadcast({
         "type": "phase_change",
         "phase": "day",
@@ -351,30 +597,33 @@ async def resolve_night(room: GameRoom, db: Session ):
 
 
 # Обробка нічних дій (наприклад, вбивство)
-@register_handler("night_action")
-async def night_action(websocket: WebSocket, payload: dict, db: Session, room_id:int, player: Player, room: GameRoom, **kwargs):
+@register_handler("night_action", TargetPayload)
+async def night_action(websocket: WebSocket, payload: TargetPayload, room_id: int, player: Player, room: GameRoom,
+                       db_writer=db_writer, **kwargs):
     """
     payload = {
-        "actor_id": int,
         "target_id": int
     }
     """
     if room.is_game_over:
-        await websocket.send_json({
+        await player.send({
             "type": "error",
             "message": "Гра вже завершена"
         })
         return
     
+    if room.phase != "night":
+        await player.send({"type": "error", "message": "Нічні дії можливі тільки вночі"})
+        return
+
     if not player.is_alive:
-        await websocket.send_json({"type": "error", "message": "Мертвий гравець не може діяти"})
+        await player.send({"type": "error", "message": "Мертвий гравець не може діяти"})
         return
     
-    target_id = payload.get("target_id")
-    target = room.get_player(target_id)
+    target = room.get_player(payload.target_id)
 
     if not target:
-        await websocket.send_json({"type": "error", "message": "Ціль не знайдена"})
+        await player.send({"type": "error", "message": "Ціль не знайдена"})
         return
 
     # Сохраняем действия
@@ -386,40 +635,44 @@ async def night_action(websocket: WebSocket, payload: dict, db: Session, room_id
         room.night_actions["detective"] = target.id
 
     player.is_ready = True
+    room.mark_dirty()
+    event_log.record(room, "night_action", player_id=player.id, role=player.role, target_id=target.id)
 
     # Проверяем готовность только специальных ролей (мафия, доктор, детектив)
     special_players = [p for p in room.players.values() 
                       if p.role in ["mafia", "doctor", "detective"] and p.is_alive]
     
     if all(p.is_ready for p in special_players):
-        print("Всі нічні дії виконані, переходимо до розв'язання ночі...")
-        await resolve_night(room, db)
+        room.log.debug("Всі нічні дії виконані, переходимо до розв'язання ночі...")
+        await resolve_night(room, db_writer)
         
     
 # Голосування
-@register_handler("vote")
-async def vote(websocket: WebSocket, payload: dict, db: Session, player: Player, room: GameRoom, **kwargs):
+@register_handler("vote", TargetPayload)
+async def vote(websocket: WebSocket, payload: TargetPayload, player: Player, room: GameRoom,
+               db_writer=db_writer, **kwargs):
     if room.is_game_over:
-        await websocket.send_json({"type": "error", "message": "Гра вже завершена"})
+        await player.send({"type": "error", "message": "Гра вже завершена"})
         return
     
     if room.phase != "day":
-        await websocket.send_json({"type": "error", "message": "Голосувати можна тільки вдень"})
+        await player.send({"type": "error", "message": "Голосувати можна тільки вдень"})
         return
         
     if not player.is_alive:
-        await websocket.send_json({"type": "error", "message": "Невірний гравець або мертвий"})
+        await player.send({"type": "error", "message": "Невірний гравець або мертвий"})
         return
     
-    target_id = int(payload["target_id"])
-    target = room.get_player(target_id)
+    target = room.get_player(payload.target_id)
     if not target or not target.is_alive:
-        await websocket.send_json({"type": "error", "message": "Ціль голосування не знайдена або вже мертва"})
+        await player.send({"type": "error", "message": "Ціль голосування не знайдена або вже мертва"})
         return
     
     # Записуємо чий саме це голос (запобігає накрутці): ключ - ID голосуючого, значення - за кого
     room.votes[player.id] = target.id
     player.is_ready = True
+    room.mark_dirty()
+    event_log.record(room, "vote", player_id=player.id, target_id=target.id)
     
     await room.broadcast({
         "type": "vote_cast",
@@ -448,11 +701,13 @@ async def vote(websocket: WebSocket, payload: dict, db: Session, player: Player,
         
         if victim:
             room.kill_player(victim.id)
+            event_log.record(room, "player_killed", player_id=victim.id, by="vote")
             await room.broadcast({
                 "type": "player_killed_vote",
                 "message": f"{victim.name} був повішений за результатами голосування."
             })
         else:
+            event_log.record(room, "vote_tie")
             await room.broadcast({
                 "type": "vote_tie",
                 "message": "Голоси розділилися порівну. Нікого не ліквідовано."
@@ -462,17 +717,16 @@ async def vote(websocket: WebSocket, payload: dict, db: Session, player: Player,
         room.votes = {}
         for p in room.players.values():
             p.is_ready = False
+        room.mark_dirty()
         
         # Перевіряємо умови перемоги
         winner = room.check_victory()
         if winner:
             room.phase = "ended"
             room.is_game_over = True
+            event_log.end(room, winner)
             
-            db_room = db.query(Room).filter(Room.id == room.id).first()
-            if db_room:
-                db_room.is_active = False
-                db.commit()
+            await db_writer.run(deactivate_room, room.id)
                 
             await room.broadcast({
                 "type": "game_over",
@@ -488,6 +742,7 @@ async def vote(websocket: WebSocket, payload: dict, db: Session, player: Player,
         # Збільшуємо раунд і йдемо в ніч!
         room.round += 1
         room.phase = "night"
+        event_log.record(room, "phase_change", phase="night")
         
         for p in room.players.values():
             p.is_ready = False
@@ -501,23 +756,22 @@ async def vote(websocket: WebSocket, payload: dict, db: Session, player: Player,
         
 # Змінюємо статус готовності
 @register_handler("toggle_ready")
-async def handle_toggle_ready(payload: dict, db: Session, room: GameRoom, player: Player, **kwargs):
+async def handle_toggle_ready(payload: EmptyPayload, room: GameRoom, player: Player, **kwargs):
     # Змінюємо статус готовності
     player.is_ready = not player.is_ready
-    print(f"Player {player.id} ready state changed to {player.is_ready}")
+    room.mark_dirty()
+    room.log.debug("Player %s ready state changed to %s", player.id, player.is_ready)
 
     # Перевіряємо загальний стан готовності
     all_ready = all(p.is_ready for p in room.players.values())
-    print(f"All players ready: {all_ready}")
 
     # Відправляємо оновлення всім гравцям
     await room.broadcast({
         "type": "player_ready",
         "player_id": player.id,
         "is_ready": player.is_ready,
-        "players": [p.to_dict() for p in room.players.values()]
-    })
-    print(f"Broadcasted ready state update for player {player.id}")
+    }, with_players=True)
+    room.log.debug("Broadcasted ready state update for player %s", player.id)
 
     # Відправляємо додаткове повідомлення про загальний стан готовності
     if all_ready:
@@ -538,13 +792,13 @@ async def get_room_players(room_id: int):
         # Кімната ще не створена в пам'яті або пуста
         return []
 
-    # Повертаємо список підключених гравців
-    return [player.to_dict() for player in room.players.values()]
+    # Повертаємо список підключених гравців; ролі — лише після завершення гри, як і глядачам
+    return room.projections.players(room.projections.spectator_view())
 
 
 # Отримати історію повідомлень кімнати (останні 50 повідомлень)
 @router.get("/rooms/{room_id}/messages")
-async def get_room_messages(room_id: int, db: Session = Depends(get_db)):
+def get_room_messages(room_id: int, db: Session = Depends(get_read_db)):
     """
     Отримати історію повідомлень кімнати (останні 50 повідомлень)
     """
@@ -554,10 +808,10 @@ async def get_room_messages(room_id: int, db: Session = Depends(get_db)):
         if not db_room:
             raise HTTPException(status_code=404, detail="Кімнату не знайдено")
             
-        # Отримуємо повідомлення разом із користувачами (за допомогою join, щоб працювало миттєво)
-        # Якщо у вас у моделі Messages немає зв'язку з User, можна залишити звичайний query, але цей варіант оптимальніший
+        # Отримуємо повідомлення разом з іменами авторів одним запитом (outer join: гості без користувача)
         messages = (
-            db.query(Messages)
+            db.query(Messages, User.username)
+            .outerjoin(User, User.id == Messages.user_id)
             .filter(Messages.room_id == room_id)
             .order_by(Messages.writing_time.desc())
             .limit(50)
@@ -566,18 +820,16 @@ async def get_room_messages(room_id: int, db: Session = Depends(get_db)):
         
         messages_list = []
         # Перевертаємо, щоб старі повідомлення йшли спочатку (зверху вниз, як у звичайних чатах)
-        for msg in reversed(messages):
+        for msg, username in reversed(messages):
             try:
-                # Шукаємо автора повідомлення
-                user = db.query(User).filter(User.id == msg.user_id).first()
                 messages_list.append({
                     "id": msg.id,
                     "message": msg.message,
-                    "username": user.username if user else "Гість",
+                    "username": username or "Гість",
                     "created_at": msg.writing_time.isoformat() if msg.writing_time else None
                 })
             except Exception as e:
-                print(f"Помилка обробки повідомлення {msg.id}: {str(e)}")
+                logger.warning("Помилка обробки повідомлення %s: %s", msg.id, e)
                 continue
             
         return messages_list
@@ -585,5 +837,5 @@ async def get_room_messages(room_id: int, db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Помилка в get_room_messages: {str(e)}")
+        logger.exception("Помилка в get_room_messages: %s", e)
         raise HTTPException(status_code=500, detail="Внутрішня помилка сервера")
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from app.config import HEARTBEAT_IDLE, HEARTBEAT_INTERVAL, HEARTBEAT_SEND_TIMEOUT, HEARTBEAT_TIMEOUT
+from app.logger import get_logger
+from app.metrics import HEARTBEAT_EVICTIONS, HEARTBEAT_PINGS
+from app.game_rooms.game_rooms import leave_room
+from app.game_rooms.room_storage import active_rooms
+
+logger = get_logger(__name__)
+
+
+# Один планувальник на процес: раз на interval обходить усіх гравців активних кімнат,
+# пінгує тих, від кого давно нічого не було, і виселяє тих, хто мовчить довше timeout
+class HeartbeatScheduler:
+    def __init__(self, rooms=active_rooms, interval=HEARTBEAT_INTERVAL, idle=HEARTBEAT_IDLE,
+                 timeout=HEARTBEAT_TIMEOUT, send_timeout=HEARTBEAT_SEND_TIMEOUT, clock=time.monotonic):
+        self.rooms = rooms
+        self.interval = interval
+        self.idle = idle
+        self.timeout = timeout
+        self.send_timeout = send_timeout
+        self.clock = clock
+        self._task = None
+
+    @property
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Heartbeat tick failed")
+
+    async def tick(self):
+        """Один обхід: ping для мовчазних сокетів, виселення для тих, хто не відповідає."""
+        now = self.clock()
+        pings, evictions = [], []
+        for room in list(self.rooms.values()):
+            for player in list(room.players.values()):
+                silent = now - player.last_seen
+                if silent >= self.timeout:
+                    evictions.append(self.evict(room, player))
+                elif silent >= self.idle and player.websocket is not None:
+                    pings.append(self.ping(player))
+        # Повільний сокет не повинен затримувати решту, тому все паралельно і з тайм-аутом
+        await asyncio.gather(*pings, *evictions)
+        return len(pings), len(evictions)
+
+    async def ping(self, player):
+        HEARTBEAT_PINGS.inc()
+        try:
+            await asyncio.wait_for(
+                player.send({"type": "ping", "ts": self.clock() * 1000}), self.send_timeout
+            )
+        except Exception as e:
+            logger.debug("Ping to player %s failed: %s", player.id, e)
+
+    async def evict(self, room, player):
+        HEARTBEAT_EVICTIONS.inc()
+        room.log.info("Evicting unresponsive player %s", player.id)
+        websocket = player.websocket
+        # leave_room розсилає player_left решті гравців; завислий сокет серед них не повинен
+        # затримати обхід інших кімнат, тож на виселення теж діє тайм-аут
+        try:
+            await asyncio.wait_for(room.actor.call(leave_room, room, player, websocket), self.send_timeout)
+        except Exception as e:
+            logger.debug("Leaving room for player %s did not finish: %r", player.id, e)
+        if websocket is None:
+            return
+        try:
+            await asyncio.wait_for(websocket.close(code=1001), self.send_timeout)
+        except Exception as e:
+            logger.debug("Closing socket of player %s failed: %s", player.id, e)
+
+
+heartbeat = HeartbeatScheduler()
@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app import models
+from app.auth import get_current_user
+from app.config import QUICK_JOIN_RESERVE, QUICK_PLAY_MAX_PLAYERS, QUICK_PLAY_MIN_PLAYERS
+from app.db_writer import db_writer
+from app.logger import get_logger
+from app.metrics import MATCHMAKING_OPEN_ROOMS, MATCHMAKING_PLACEMENTS, MATCHMAKING_WAIT_SECONDS
+from app.game_rooms.dispatch import add_handler_hook
+from app.game_rooms.drain import server_drain
+from app.game_rooms.game_models import GameRoom
+from app.game_rooms.room_storage import active_rooms
+
+logger = get_logger(__name__)
+
+router = APIRouter(tags=["Matchmaking"])
+
+
+# Індекс кімнат для швидкої гри: публічні кімнати в очікуванні з вільними місцями.
+# Для кожного розміру кімнати (max_players) — купа з ключем (скільки гравців бракує до min_players,
+# -заповненість, room_id): першою йде кімната, найближча до старту, серед рівних — найстаріша.
+# Купа не перебудовується при змінах: новий ключ кімнати просто додається, а застарілі записи
+# відкидаються, коли опиняються на вершині, тож і зміна, і пошук коштують O(log n).
+# Гравцю, якого направили в кімнату, місце резервується на reserve_timeout секунд, щоб одночасні
+# запити не відправили в одну кімнату більше людей, ніж у ній є місць
+class Matchmaker:
+    def __init__(self, rooms=active_rooms, reserve_timeout=QUICK_JOIN_RESERVE, clock=time.monotonic, writer=db_writer):
+        self.rooms = rooms
+        self.reserve_timeout = reserve_timeout
+        self.clock = clock
+        self.writer = writer
+        # max_players -> купа ключів; room_id -> (max_players, актуальний ключ)
+        self._heaps = {}
+        self._keys = {}
+        self._entries = 0
+        # room_id -> {user_id: до коли тримати місце}
+        self._reserved = {}
+        # user_id -> коли гравець уперше попросив швидку гру (для часу до старту)
+        self._waiting_since = {}
+        # Розмір кімнати -> задача, що саме створює для нього кімнату
+        self._creating = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, room):
+        """Перераховує місце кімнати в індексі; викликається після кожної зміни складу чи фази."""
+        if not self._joinable(room):
+            self.discard(room.id)
+            return
+        filled = len(room.players) + self._pending(room.id)
+        if filled >= room.max_players:
+            self.discard(room.id, keep_reservations=True)
+            return
+        key = (max(0, room.min_players - filled), -filled, room.id)
+        if self._keys.get(room.id) == (room.max_players, key):
+            return
+        self._keys[room.id] = (room.max_players, key)
+        heapq.heappush(self._heaps.setdefault(room.max_players, []), key)
+        self._entries += 1
+        # Застарілих записів не більше, ніж живих: інакше пам'ять росла б з кожною зміною
+        if self._entries > 2 * len(self._keys) + 64:
+            self._compact()
+
+    def discard(self, room_id, keep_reservations=False):
+        self._keys.pop(room_id, None)
+        if not keep_reservations:
+            self._reserved.pop(room_id, None)
+
+    def seated(self, room, user_id):
+        """Гравець сів у кімнату: резерв більше не потрібен."""
+        reserved = self._reserved.get(room.id)
+        if reserved is not None:
+            reserved.pop(user_id, None)
+            if not reserved:
+                del self._reserved[room.id]
+        self.update(room)
+
+    def left(self, room, user_id):
+        # Гравець, що вийшов до старту, наступним запитом починає чекати заново
+        self._waiting_since.pop(user_id, None)
+        self.update(room)
+
+    def game_started(self, room):
+        now = self.clock()
+        for player_id in room.players:
+            since = self._waiting_since.pop(player_id, None)
+            if since is not None:
+                MATCHMAKING_WAIT_SECONDS.observe(now - since)
+        self.discard(room.id)
+
+    def find(self, user_id, size=None):
+        """Найкраща кімната для гравця (з резервом місця) або None."""
+        best = None
+        for heap_size in ([size] if size is not None else list(self._heaps)):
+            candidate = self._peek(heap_size)
+            if candidate is not None and (best is None or candidate[0] < best[0]):
+                best = candidate
+        if best is None:
+            return None
+        room = best[1]
+        self.reserve(room, user_id)
+        return room
+
+    def reserve(self, room, user_id):
+        self._reserved.setdefault(room.id, {})[user_id] = self.clock() + self.reserve_timeout
+        self.update(room)
+
+    async def quick_join(self, user_id, size=None):
+        """
+        Кімната для швидкої гри: найкраща з відкритих або нова, якщо підходящих немає.
+        Повертає (GameRoom, створена чи ні); місце в кімнаті вже зарезервоване за user_id.
+        """
+        self._waiting_since.setdefault(user_id, self.clock())
+        room = self.find(user_id, size)
+        if room is not None:
+            MATCHMAKING_PLACEMENTS.labels("joined").inc()
+            return room, False
+
+        size = size or QUICK_PLAY_MAX_PLAYERS
+        # Одночасні запити того самого розміру чекають на одну нову кімнату, а не створюють кожен свою
+        task = self._creating.get(size)
+        if task is None:
+            task = self._creating[size] = asyncio.ensure_future(self._create_room(user_id, size))
+            task.add_done_callback(lambda _: self._creating.pop(size, None))
+            room = await asyncio.shield(task)
+            self.reserve(room, user_id)
+            MATCHMAKING_PLACEMENTS.labels("created").inc()
+            return room, True
+        await asyncio.shield(task)
+        return await self.quick_join(user_id, size)
+
+    async def _create_room(self, owner_id, size):
+        db_room = await self.writer.run(save_quick_room, owner_id, min(QUICK_PLAY_MIN_PLAYERS, size), size)
+        room = GameRoom(
+            id=db_room.id,
+            name=db_room.name,
+            owner_id=owner_id,
+            min_players=db_room.min_players_number,
+            max_players=db_room.max_players_number,
+        )
+        self.rooms[room.id] = room
+        room.log.info("Created quick-play room for %s players", size)
+        return room
+
+    def _joinable(self, room):
+        return room.phase == "waiting" and not room.is_private and self.rooms.get(room.id) is room
+
+    def _pending(self, room_id):
+        reserved = self._reserved.get(room_id)
+        if not reserved:
+            return 0
+        now = self.clock()
+        for user_id in [user_id for user_id, until in reserved.items() if until <= now]:
+            del reserved[user_id]
+        if not reserved:
+            del self._reserved[room_id]
+            return 0
+        return len(reserved)
+
+    def _peek(self, size):
+        heap = self._heaps.get(size)
+        while heap:
+            key = heap[0]
+            room_id = key[2]
+            room = self.rooms.get(room_id)
+            if self._keys.get(room_id) != (size, key) or room is None:
+                heapq.heappop(heap)
+                self._entries -= 1
+                if room is None:
+                    self.discard(room_id)
+                continue
+            # Прострочені резерви звільняють місця: ключ міг змінитися
+            self.update(room)
+            if self._keys.get(room_id) != (size, key):
+                continue
+            return key, room
+        return None
+
+    def _compact(self):
+        heaps = {}
+        for size, key in self._keys.values():
+            heaps.setdefault(size, []).append(key)
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        self._heaps = heaps
+        self._entries = len(self._keys)
+
+
+# Запис кімнати для db_writer; назву з номером кімнати видно в списку /api/rooms
+def save_quick_room(db: Session, owner_id: int, min_players: int, max_players: int):
+    db_room = models.Room(
+        name="Quick play",
+        owner=owner_id,
+        min_players_number=min_players,
+        max_players_number=max_players,
+        is_private=False,
+        is_active=True,
+    )
+    db.add(db_room)
+    db.flush()
+    db_room.name = f"Quick play #{db_room.id}"
+    return db_room
+
+
+matchmaker = Matchmaker()
+MATCHMAKING_OPEN_ROOMS.set_collector(lambda: {(): len(matchmaker)})
+
+
+# Будь-який обробник міг змінити склад, готовність чи фазу кімнати: індекс оновлюється одразу.
+# Якщо ключ не змінився (чат, голосування), це лише порівняння кортежів
+async def matchmaking_hook(ctx, call_next):
+    try:
+        return await call_next(ctx)
+    finally:
+        if ctx.room is not None:
+            matchmaker.update(ctx.room)
+
+
+add_handler_hook(matchmaking_hook)
+
+
+# Швидка гра для клієнтів окремого сокета кімнати: повертає кімнату, до якої слід підключитися
+# через /api/ws/room/{room_id}. На спільному сокеті те саме робить {"channel": "lobby", "type": "quick_join"}
+@router.post("/matchmaking/quick_join")
+async def quick_join(
+        size: Optional[int] = Query(None, ge=4, le=12),
+        current_user: models.User = Depends(get_current_user)
+):
+    if server_drain.draining:
+        raise HTTPException(status_code=503, detail="Server is draining", headers={"Retry-After": "30"})
+    room, created = await matchmaker.quick_join(current_user.id, size)
+    return {"room_id": room.id, "created": created, "players": len(room.players), "max_players": room.max_players}
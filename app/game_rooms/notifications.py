@@ -0,0 +1,52 @@
+import asyncio
+
+from app.config import HEARTBEAT_SEND_TIMEOUT
+from app.logger import get_logger
+from app.metrics import NOTIFICATIONS_SENT
+
+logger = get_logger(__name__)
+
+
+# Особисті сповіщення користувачам (новий друг тощо). Доставляються лише на відкриті сокети,
+# підписані на канал notifications; офлайн-користувачі нічого не отримують і нічого не займають.
+# sink — будь-що з async send(message), зазвичай канал спільного сокета користувача
+class NotificationHub:
+    def __init__(self, send_timeout=HEARTBEAT_SEND_TIMEOUT):
+        self.send_timeout = send_timeout
+        self._sinks = {}
+
+    def __len__(self):
+        return len(self._sinks)
+
+    def subscribe(self, user_id, sink):
+        self._sinks.setdefault(user_id, []).append(sink)
+
+    def unsubscribe(self, user_id, sink):
+        sinks = self._sinks.get(user_id)
+        if not sinks:
+            return
+        for i in range(len(sinks) - 1, -1, -1):
+            if sinks[i] is sink:
+                del sinks[i]
+                break
+        if not sinks:
+            del self._sinks[user_id]
+
+    async def notify(self, user_id, message):
+        """Надсилає сповіщення на всі сокети користувача; повільний сокет не затримує решту."""
+        sinks = list(self._sinks.get(user_id, ()))
+        delivered = await asyncio.gather(*(self._send(user_id, sink, message) for sink in sinks))
+        NOTIFICATIONS_SENT.inc(sum(delivered))
+        return sum(delivered)
+
+    async def _send(self, user_id, sink, message):
+        try:
+            await asyncio.wait_for(sink.send(message), self.send_timeout)
+        except Exception as e:
+            # Сокет закриється сам: heartbeat або обробник з'єднання приберуть підписку
+            logger.warning("Notification to user %s failed: %r", user_id, e)
+            return False
+        return True
+
+
+notifications = NotificationHub()
@@ -0,0 +1,148 @@
+import asyncio
+from array import array
+
+from app.config import HEARTBEAT_SEND_TIMEOUT
+from app.logger import get_logger
+from app.metrics import PRESENCE_ONLINE, PRESENCE_SEND_FAILURES, PRESENCE_UPDATES, PRESENCE_WATCHES
+
+logger = get_logger(__name__)
+
+OFFLINE = "offline"
+ONLINE = "online"
+IN_ROOM = "in_room"
+
+
+# Хто з користувачів зараз онлайн і в якій кімнаті. Живе в пам'яті процесу й наповнюється
+# підключеннями та відключеннями сокетів. Онлайн-користувач підписаний на своїх друзів:
+# при кожній зміні їхнього стану він отримує {"type": "presence", ...} через свій сокет.
+# Індекси підписок — array('q'): 8 байт на зв'язок без окремого об'єкта int на кожен.
+# Щоб відключення не шукало себе лінійно в підписниках популярного друга, для кожної підписки
+# зберігається її позиція в його масиві; видалення — перенесення останнього елемента на місце видаленого.
+# Офлайн-користувачі не займають нічого, крім записів у масивах тих, хто на них підписаний.
+# Сокет, на який не вдалося надіслати оновлення, вважається мертвим і прибирається з реєстру.
+class PresenceRegistry:
+    def __init__(self, send_timeout=HEARTBEAT_SEND_TIMEOUT):
+        self.send_timeout = send_timeout
+        # user_id -> [(room_id, sink), ...]: відкриті з'єднання; поточна кімната — з останнього з'єднання, що її має.
+        # sink — будь-що з async send(message), зазвичай Player
+        self._connections = {}
+        # user_id -> друзі, на яких він підписаний; _slots[user_id][i] — позиція user_id у _watchers[друг i];
+        # _watchers: user_id -> хто на нього підписаний
+        self._watching = {}
+        self._slots = {}
+        self._watchers = {}
+        self.watch_count = 0
+
+    def __len__(self):
+        return len(self._connections)
+
+    def is_online(self, user_id):
+        return user_id in self._connections
+
+    def status(self, user_id):
+        connections = self._connections.get(user_id)
+        if not connections:
+            return {"user_id": user_id, "status": OFFLINE, "room_id": None}
+        # Будь-яке з'єднання з кімнатою важливіше за з'єднання без неї (спільний сокет користувача)
+        room_id = next((room_id for room_id, _ in reversed(connections) if room_id is not None), None)
+        return {"user_id": user_id, "status": ONLINE if room_id is None else IN_ROOM, "room_id": room_id}
+
+    def statuses(self, user_ids):
+        return [self.status(user_id) for user_id in user_ids]
+
+    def friends_presence(self, user_id):
+        """Стан усіх друзів онлайн-користувача, як у першому повідомленні після connect."""
+        return {"type": "friends_presence", "friends": self.statuses(self._watching.get(user_id, ()))}
+
+    async def connect(self, user_id, friend_ids, sink, room_id=None):
+        """Нове з'єднання користувача: перше — підписує його на друзів; друзі дізнаються про новий стан."""
+        before = self.status(user_id)
+        connections = self._connections.get(user_id)
+        if connections is None:
+            connections = self._connections[user_id] = []
+            self._subscribe(user_id, friend_ids)
+        connections.append((room_id, sink))
+        if not await self._send(user_id, sink, self.friends_presence(user_id)):
+            await self.disconnect(user_id, sink)
+            return
+        if self.status(user_id) != before:
+            await self.publish(user_id)
+
+    async def disconnect(self, user_id, sink):
+        connections = self._connections.get(user_id)
+        if not connections:
+            return
+        before = self.status(user_id)
+        for i in range(len(connections) - 1, -1, -1):
+            if connections[i][1] is sink:
+                del connections[i]
+                break
+        if not connections:
+            del self._connections[user_id]
+            self._unsubscribe(user_id)
+        if self.status(user_id) != before:
+            await self.publish(user_id)
+
+    async def follow(self, user_id, friend_id):
+        """Новий друг онлайн-користувача: підписка та його поточний стан."""
+        connections = self._connections.get(user_id)
+        if not connections or friend_id in self._watching[user_id]:
+            return
+        self._watch(user_id, friend_id)
+        await self._deliver([(user_id, sink) for _, sink in connections], {"type": "presence", **self.status(friend_id)})
+
+    async def publish(self, user_id):
+        """Надсилає поточний стан user_id усім онлайн-підписникам; повільний сокет не затримує решту."""
+        watchers = self._watchers.get(user_id)
+        if not watchers:
+            return
+        targets = [(watcher, sink) for watcher in list(watchers) for _, sink in self._connections.get(watcher, ())]
+        PRESENCE_UPDATES.inc(len(targets))
+        await self._deliver(targets, {"type": "presence", **self.status(user_id)})
+
+    async def _deliver(self, targets, message):
+        delivered = await asyncio.gather(*(self._send(user_id, sink, message) for user_id, sink in targets))
+        for (user_id, sink), ok in zip(targets, delivered):
+            if not ok:
+                await self.disconnect(user_id, sink)
+
+    def _subscribe(self, user_id, friend_ids):
+        self._watching[user_id] = array("q")
+        self._slots[user_id] = array("q")
+        for friend_id in dict.fromkeys(friend_ids):
+            self._watch(user_id, friend_id)
+
+    def _watch(self, user_id, friend_id):
+        watchers = self._watchers.setdefault(friend_id, array("q"))
+        self._watching[user_id].append(friend_id)
+        self._slots[user_id].append(len(watchers))
+        watchers.append(user_id)
+        self.watch_count += 1
+
+    def _unsubscribe(self, user_id):
+        targets = self._watching.pop(user_id, ())
+        slots = self._slots.pop(user_id, ())
+        self.watch_count -= len(targets)
+        for friend_id, slot in zip(targets, slots):
+            watchers = self._watchers[friend_id]
+            last = watchers.pop()
+            if last != user_id:
+                # Останній підписник переїжджає на звільнене місце; його позицію оновлюємо
+                watchers[slot] = last
+                self._slots[last][self._watching[last].index(friend_id)] = slot
+            elif not watchers:
+                del self._watchers[friend_id]
+
+    async def _send(self, user_id, sink, message):
+        try:
+            await asyncio.wait_for(sink.send(message), self.send_timeout)
+        except Exception as e:
+            PRESENCE_SEND_FAILURES.inc()
+            logger.warning("Presence update to user %s failed, dropping the connection: %r", user_id, e)
+            return False
+        return True
+
+
+presence = PresenceRegistry()
+PRESENCE_ONLINE.set_collector(lambda: {(): len(presence)})
+PRESENCE_WATCHES.set_collector(lambda: {(): presence.watch_count})
@@ -0,0 +1,60 @@
+from app.metrics import PROJECTION_BUILDS
+
+# Види списку гравців: публічний (без ролей), для мафії (ролі спільників), повний (після гри та для адміністраторів).
+# Особистий вид гравця — його id: публічний список плюс власна роль
+PUBLIC = "public"
+MAFIA = "mafia"
+ADMIN = "admin"
+
+# Після завершення гри ролі відкриваються всім
+REVEALED_PHASES = ("ended",)
+
+
+# Списки гравців кімнати для різних глядачів. Кожен вид будується один раз на версію кімнати
+# (room.version, див. GameRoom.mark_dirty) і далі віддається готовим, тож broadcast не збирає
+# список для кожного отримувача. Повернуті списки спільні: змінювати їх не можна
+class RoomProjections:
+    def __init__(self, room):
+        self.room = room
+        self._version = None
+        self._views = {}
+
+    def view_for(self, player):
+        """Вид, що належить гравцю: ролі бачить лише той, кому їх можна знати."""
+        if self.room.phase in REVEALED_PHASES:
+            return ADMIN
+        if player.role is None:
+            return PUBLIC
+        if player.role == "mafia":
+            return MAFIA
+        return player.id
+
+    def spectator_view(self):
+        return ADMIN if self.room.phase in REVEALED_PHASES else PUBLIC
+
+    def players(self, view=PUBLIC):
+        if self._version != self.room.version:
+            self._views.clear()
+            self._version = self.room.version
+        players = self._views.get(view)
+        if players is None:
+            players = self._views[view] = self._build(view)
+        return players
+
+    def _build(self, view):
+        if view == PUBLIC:
+            PROJECTION_BUILDS.labels(PUBLIC).inc()
+            owner = self.room.owner
+            return [{**player.to_dict(), "is_owner": player.id == owner} for player in self.room.players.values()]
+        # Решта видів — публічний список, у якому частина записів доповнена роллю
+        if view == ADMIN:
+            reveal = lambda player: True
+        elif view == MAFIA:
+            reveal = lambda player: player.role == "mafia"
+        else:
+            reveal = lambda player: player.id == view
+        PROJECTION_BUILDS.labels(view if isinstance(view, str) else "self").inc()
+        return [
+            {**entry, "role": player.role} if reveal(player) else entry
+            for player, entry in zip(self.room.players.values(), self.players(PUBLIC))
+        ]
@@ -0,0 +1,57 @@
+import time
+
+from app.config import MAX_FRAME_BYTES, RATE_LIMIT_MAX_VIOLATIONS, RATE_LIMIT_VIOLATION_WINDOW, RATE_LIMITS
+
+ALL_FRAMES = "*"
+
+
+# Відро токенів: поповнюється зі швидкістю rate за секунду до burst
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated", "clock")
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.clock = clock
+        self.updated = clock()
+
+    def allow(self, cost=1):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+
+# Обмежувач одного з'єднання: спільне відро для всіх кадрів, відра за типами повідомлень
+# та відро порушень — коли воно вичерпане, клієнта слід від'єднати
+class ConnectionLimiter:
+    def __init__(self, limits=RATE_LIMITS, max_frame_bytes=MAX_FRAME_BYTES,
+                 max_violations=RATE_LIMIT_MAX_VIOLATIONS, violation_window=RATE_LIMIT_VIOLATION_WINDOW,
+                 clock=time.monotonic):
+        self.limits = limits
+        self.max_frame_bytes = max_frame_bytes
+        self.clock = clock
+        self._buckets = {}
+        self._violations = TokenBucket(max_violations / violation_window, max_violations, clock)
+
+    def frame_too_large(self, raw):
+        # Для текстових кадрів рахуються символи, а не байти UTF-8 — це дешевше і для ліміту достатньо
+        return len(raw) > self.max_frame_bytes
+
+    def allow(self, message_type):
+        """Чи пропустити повідомлення. Типи без власного ліміту обмежує лише спільне відро."""
+        bucket = self._buckets.get(message_type)
+        if bucket is None:
+            limit = self.limits.get(message_type)
+            if limit is None:
+                return True
+            bucket = self._buckets[message_type] = TokenBucket(*limit, clock=self.clock)
+        return bucket.allow()
+
+    def violation(self):
+        """Реєструє порушення. Повертає True, якщо порушень забагато і з'єднання треба закрити."""
+        return not self._violations.allow()
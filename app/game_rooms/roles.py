@@ -0,0 +1,58 @@
+from functools import lru_cache
+
+from app.config import ROLE_PRESET
+
+MIN_PLAYERS = 4
+MAX_PLAYERS = 12
+
+# Набори ролей: скільки гравців припадає на одного мафіозі та з якої кількості
+# гравців у грі з'являється кожна спеціальна роль
+ROLE_PRESETS = {
+    "classic": {
+        "players_per_mafia": 3,
+        "special_roles": {"doctor": 4, "detective": 4},
+    },
+    "simple": {
+        "players_per_mafia": 4,
+        "special_roles": {"doctor": 6},
+    },
+    "extended": {
+        "players_per_mafia": 3,
+        "special_roles": {"doctor": 4, "detective": 6},
+    },
+}
+
+if ROLE_PRESET not in ROLE_PRESETS:
+    raise ValueError(f"Unknown ROLE_PRESET {ROLE_PRESET!r}, expected one of {', '.join(ROLE_PRESETS)}")
+
+
+def build_role_distribution(player_count, preset):
+    """
+    Рахує набір ролей для заданої кількості гравців.
+    Мафії завжди менше, ніж решти гравців, інакше гра закінчилася б одразу.
+    """
+    mafia = max(1, player_count // preset["players_per_mafia"])
+    mafia = min(mafia, (player_count - 1) // 2)
+
+    specials = [
+        role for role, min_count in preset["special_roles"].items()
+        if player_count >= min_count
+    ][:player_count - mafia]
+    civilians = player_count - mafia - len(specials)
+
+    return tuple(["mafia"] * mafia + specials + ["civilian"] * civilians)
+
+
+@lru_cache(maxsize=None)
+def get_role_distribution(player_count, preset_name=ROLE_PRESET):
+    if preset_name not in ROLE_PRESETS:
+        raise ValueError(f"Unknown role preset: {preset_name}")
+    if not MIN_PLAYERS <= player_count <= MAX_PLAYERS:
+        raise ValueError(f"Player count must be between {MIN_PLAYERS} and {MAX_PLAYERS}")
+    return build_role_distribution(player_count, ROLE_PRESETS[preset_name])
+
+
+# Розподіли для всіх дозволених розмірів кімнат рахуються один раз при імпорті
+for _preset_name in ROLE_PRESETS:
+    for _player_count in range(MIN_PLAYERS, MAX_PLAYERS + 1):
+        get_role_distribution(_player_count, _preset_name)
@@ -0,0 +1,60 @@
+import asyncio
+
+
+# Актор кімнати: усі команди, що змінюють стан GameRoom, проходять через одну чергу
+# і виконуються по черзі одним споживачем. Між кімнатами блокувань немає.
+class RoomActor:
+    def __init__(self, room):
+        self.room = room
+        self.inbox = asyncio.Queue()
+        self._task = None
+
+    @property
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    async def call(self, func, *args, **kwargs):
+        """
+        Ставить корутину func(*args, **kwargs) у чергу кімнати і чекає її результат.
+        Виняток з func повертається тому, хто викликав call.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.inbox.put_nowait((func, args, kwargs, future))
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    async def join(self):
+        """Чекає, поки черга кімнати спорожніє."""
+        while self.is_running:
+            await asyncio.shield(self._task)
+
+    async def _run(self):
+        # Споживач живе лише поки в черзі є команди, тож порожні кімнати не тримають задач
+        future = None
+        try:
+            while not self.inbox.empty():
+                func, args, kwargs, future = self.inbox.get_nowait()
+                if future.cancelled():
+                    continue
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                except BaseException as e:
+                    # Скасування задачі актора (чи KeyboardInterrupt) не повинне лишити виклик чекати вічно
+                    if not future.done():
+                        if isinstance(e, asyncio.CancelledError):
+                            future.cancel()
+                        else:
+                            future.set_exception(e)
+                    raise
+                else:
+                    if not future.cancelled():
+                        future.set_result(result)
+        finally:
+            # Якщо споживач зупинився не через порожню чергу, решта команд уже не виконається
+            while not self.inbox.empty():
+                *_, pending = self.inbox.get_nowait()
+                pending.cancel()
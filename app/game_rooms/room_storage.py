@@ -1,4 +1,17 @@
 from typing import Dict
 from app.game_rooms.game_models import GameRoom
+from app.metrics import ACTIVE_ROOMS, ROOM_PLAYERS, SPECTATORS
 
-active_rooms : Dict[int, GameRoom] = {}
\ No newline at end of file
+active_rooms : Dict[int, GameRoom] = {}
+
+
+def rooms_by_phase():
+    counts = {}
+    for room in list(active_rooms.values()):
+        counts[room.phase] = counts.get(room.phase, 0) + 1
+    return counts
+
+
+ACTIVE_ROOMS.set_collector(rooms_by_phase)
+ROOM_PLAYERS.set_collector(lambda: {(): sum(len(room.players) for room in list(active_rooms.values()))})
+SPECTATORS.set_collector(lambda: {(): sum(len(room.spectators) for room in list(active_rooms.values()))})
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from collections import deque
+
+from app.config import HEARTBEAT_SEND_TIMEOUT, SPECTATOR_BACKLOG, SPECTATOR_BATCH
+from app.logger import get_logger
+from app.metrics import SPECTATOR_DROPPED, SPECTATOR_FANOUT_SECONDS, SPECTATOR_FRAMES
+from app.game_rooms.codecs import JSON_CODEC
+
+logger = get_logger(__name__)
+
+_CLOSE = object()
+
+
+# Глядач кімнати: лише отримує публічні події, не займає місця гравця й нічого не змінює в грі
+class Spectator:
+    def __init__(self, id, name, websocket, codec=JSON_CODEC, channel=None):
+        self.id = id
+        self.name = name
+        self.websocket = websocket
+        self.codec = codec
+        self.channel = channel
+        # Номер події, з якої глядач бачить кімнату: старіші, ще не розіслані, він уже отримав у room_state
+        self.since = 0
+
+    def tag(self, message):
+        return message if self.channel is None else {"channel": self.channel, **message}
+
+    async def send(self, message):
+        await self.codec.send(self.websocket, self.codec.encode(self.tag(message)))
+
+
+# Розсилка глядачам кімнати окремо від гравців. broadcast лише ставить подію в чергу й одразу повертається;
+# окрема задача кодує її один раз для кожного формату та каналу й надсилає готовий кадр глядачам пачками
+# по batch, поступаючись циклом подій між пачками, тож 500 глядачів не затримують чергу кімнати.
+# Якщо глядачі не встигають, найстаріші події відкидаються; глядач, на якого не вдалося надіслати, відключається
+class SpectatorFanout:
+    def __init__(self, room, backlog=SPECTATOR_BACKLOG, batch=SPECTATOR_BATCH, send_timeout=HEARTBEAT_SEND_TIMEOUT):
+        self.room = room
+        self.backlog = backlog
+        self.batch = batch
+        self.send_timeout = send_timeout
+        self.seq = 0
+        self._pending = deque()
+        self._task = None
+
+    @property
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    def publish(self, message):
+        """
+        Подія для глядачів; повідомлення не повинно змінюватися після виклику.
+        Списки гравців у ньому мають бути вже у виді для глядачів (RoomProjections.spectator_view).
+        """
+        if not self.room.spectators:
+            return
+        self.seq += 1
+        self._enqueue((self.seq, message))
+
+    def close(self, code=1001):
+        """Після розсилки вже поставлених подій закриває сокети всіх глядачів."""
+        if self.room.spectators:
+            self._enqueue((_CLOSE, code))
+
+    async def join(self):
+        while self.is_running:
+            await asyncio.shield(self._task)
+
+    def _enqueue(self, item):
+        self._pending.append(item)
+        if len(self._pending) > self.backlog:
+            self._pending.popleft()
+            SPECTATOR_DROPPED.labels("backlog").inc()
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._pending:
+            seq, message = self._pending.popleft()
+            spectators = list(self.room.spectators)
+            if seq is _CLOSE:
+                await asyncio.gather(*(self._close(spectator, message) for spectator in spectators))
+                continue
+            started = time.perf_counter()
+            frames = {}
+            for i in range(0, len(spectators), self.batch):
+                await asyncio.gather(*(
+                    self._send(spectator, seq, message, frames) for spectator in spectators[i:i + self.batch]
+                ))
+                await asyncio.sleep(0)
+            SPECTATOR_FANOUT_SECONDS.observe(time.perf_counter() - started)
+
+    async def _send(self, spectator, seq, message, frames):
+        if seq <= spectator.since:
+            return
+        codec = spectator.codec
+        frame = frames.get((codec, spectator.channel))
+        if frame is None:
+            frame = frames[codec, spectator.channel] = codec.encode(spectator.tag(message))
+        try:
+            await asyncio.wait_for(codec.send(spectator.websocket, frame), self.send_timeout)
+        except Exception as e:
+            SPECTATOR_DROPPED.labels("send_failed").inc()
+            self.room.log.warning("Dropping spectator %s: %r", spectator.id, e)
+            self.room.remove_spectator(spectator)
+            await self._close(spectator, 1001)
+            return
+        SPECTATOR_FRAMES.inc()
+
+    async def _close(self, spectator, code):
+        self.room.remove_spectator(spectator)
+        try:
+            await asyncio.wait_for(spectator.websocket.close(code=code), self.send_timeout)
+        except Exception as e:
+            logger.debug("Closing spectator %s failed: %s", spectator.id, e)
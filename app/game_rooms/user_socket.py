@@ -0,0 +1,407 @@
+import asyncio
+import time
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.websockets import WebSocketState
+from pydantic import TypeAdapter, ValidationError
+
+from app.database import session_scope
+from app.logger import get_logger
+from app.metrics import (
+    AUTH_RESULTS, CHANNEL_SUBSCRIPTIONS, OVERSIZED_FRAMES, POLICY_DISCONNECTS, RATE_LIMITED, USER_SOCKETS,
+)
+from app.models import Room
+from app.schemas import QuickJoinPayload
+from app.game_rooms.codecs import negotiate_codec
+from app.game_rooms.dispatch import parse_channel_message, validation_error_message
+from app.game_rooms.drain import SERVICE_RESTART, server_drain
+from app.game_rooms.game_models import Player
+from app.game_rooms.game_rooms import (
+    get_or_create_room, handle_room_message, join_room, leave_room, load_user, receive_frame, watch_room,
+)
+from app.game_rooms.matchmaking import matchmaker
+from app.game_rooms.notifications import notifications
+from app.game_rooms.presence import presence
+from app.game_rooms.rate_limit import ALL_FRAMES, ConnectionLimiter
+from app.game_rooms.room_storage import active_rooms
+from app.game_rooms.spectators import Spectator
+
+logger = get_logger(__name__)
+
+router = APIRouter(tags=["Rooms"])
+
+LOBBY = "lobby"
+PRESENCE = "presence"
+NOTIFICATIONS = "notifications"
+ROOM_PREFIX = "room:"
+WATCH_PREFIX = "watch:"
+
+_quick_join = TypeAdapter(QuickJoinPayload)
+
+
+# Канал спільного сокета: повідомлення в нього позначаються {"channel": name, ...}
+class Channel:
+    kind = None
+
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.name = name
+
+    async def send(self, message):
+        await self.connection.emit(self.name, message)
+
+    async def open(self):
+        pass
+
+    async def receive(self, msg_type, handler, payload, payload_size):
+        await self.connection.error(self.name, f"Невідомий тип повідомлення: {msg_type}")
+
+    async def leave(self):
+        pass
+
+
+# Список кімнат, до яких можна приєднатися: знімок при підписці та на запит "list".
+# {"type": "quick_join", "payload": {"size": 8}} — швидка гра: matchmaking обирає або створює кімнату,
+# клієнт отримує {"type": "matched", "room_id": ...} і одразу підписку на її канал
+class LobbyChannel(Channel):
+    kind = LOBBY
+
+    async def open(self):
+        await self.send(lobby_rooms())
+
+    async def receive(self, msg_type, handler, payload, payload_size):
+        if msg_type == "list":
+            await self.send(lobby_rooms())
+        elif msg_type == "quick_join":
+            await self.quick_join(payload)
+        else:
+            await super().receive(msg_type, handler, payload, payload_size)
+
+    async def quick_join(self, payload):
+        try:
+            request = _quick_join.validate_python(payload)
+        except ValidationError as e:
+            await self.connection.error(self.name, f"Некоректне повідомлення: {validation_error_message(e)}")
+            return
+        if server_drain.draining:
+            await self.connection.error(self.name, "Сервер перезапускається", code="draining")
+            return
+        room, created = await matchmaker.quick_join(self.connection.user.id, request.size)
+        await self.send({"type": "matched", "room_id": room.id, "created": created})
+        await self.connection.subscribe(f"{ROOM_PREFIX}{room.id}")
+
+
+# Стан друзів: знімок при підписці, далі оновлення з реєстру присутності через UserConnection.send
+class PresenceChannel(Channel):
+    kind = PRESENCE
+
+    async def open(self):
+        await self.send(presence.friends_presence(self.connection.user.id))
+
+
+class NotificationsChannel(Channel):
+    kind = NOTIFICATIONS
+
+    async def open(self):
+        notifications.subscribe(self.connection.user.id, self)
+
+    async def leave(self):
+        notifications.unsubscribe(self.connection.user.id, self)
+
+
+# Присутність у кімнаті лише позначається в реєстрі: оновлення друзів іде каналом presence
+class RoomMarker:
+    async def send(self, message):
+        return None
+
+
+# Канал, що для кімнати виглядає окремим сокетом: кадри йдуть у спільне з'єднання,
+# а close закриває лише цей канал, тож heartbeat, drain і ліміти працюють з ним, як з окремим сокетом
+class SocketChannel(Channel):
+    def __init__(self, connection, name, room_id):
+        super().__init__(connection, name)
+        self.room_id = room_id
+        self.room = None
+
+    async def send_text(self, frame):
+        await self.connection.write(frame)
+
+    async def send_bytes(self, frame):
+        await self.connection.write(frame)
+
+    async def close(self, code=1000):
+        await self.connection.unsubscribe(self.name, code)
+
+
+# Канал кімнати: гравець із тими самими обробниками, що й на /ws/room
+class RoomChannel(SocketChannel):
+    kind = "room"
+
+    def __init__(self, connection, name, room_id):
+        super().__init__(connection, name, room_id)
+        self.player = None
+        self.marker = RoomMarker()
+
+    async def open(self):
+        connection = self.connection
+        user = connection.user
+        if server_drain.draining:
+            return SERVICE_RESTART
+        db_room = await run_in_threadpool(load_room, self.room_id)
+        if not db_room:
+            await connection.error(self.name, "Кімнату не знайдено")
+            return 4000
+        self.room = get_or_create_room(db_room)
+        self.player = await self.room.actor.call(
+            join_room, self.room,
+            Player(id=user.id, name=user.username, websocket=self, codec=connection.codec, channel=self.name),
+        )
+        if self.player is None:
+            self.room.log.info("Cannot add player %s to room %s", user.id, self.room_id)
+            return 4003
+        await presence.connect(user.id, connection.friends, self.marker, room_id=self.room_id)
+
+    async def receive(self, msg_type, handler, payload, payload_size):
+        try:
+            await handle_room_message(
+                self.room, self.player, self.connection.limiter, msg_type, handler, payload, payload_size
+            )
+        except WebSocketDisconnect as e:
+            # Ліміт уже закрив канал (websocket гравця — це канал); сокет користувача та інші підписки лишаються
+            self.room.log.info("Channel %s closed with code %s", self.name, e.code)
+
+    async def leave(self):
+        if self.player is None:
+            return
+        await self.room.actor.call(leave_room, self.room, self.player, self)
+        await presence.disconnect(self.connection.user.id, self.marker)
+
+
+# Канал глядача "watch:<id>": публічні події кімнати без участі в грі, як на /ws/room/{id}/watch
+class WatchChannel(SocketChannel):
+    kind = "watch"
+
+    def __init__(self, connection, name, room_id):
+        super().__init__(connection, name, room_id)
+        self.spectator = None
+
+    async def open(self):
+        if server_drain.draining:
+            return SERVICE_RESTART
+        self.room = active_rooms.get(self.room_id)
+        if self.room is None:
+            await self.connection.error(self.name, "Кімнату не знайдено")
+            return 4000
+        user = self.connection.user
+        spectator = Spectator(
+            id=user.id, name=user.username, websocket=self, codec=self.connection.codec, channel=self.name
+        )
+        if not await self.room.actor.call(watch_room, self.room, spectator):
+            return 4003
+        self.spectator = spectator
+
+    async def receive(self, msg_type, handler, payload, payload_size):
+        await self.connection.error(self.name, "Глядачі не можуть надсилати повідомлення в кімнату")
+
+    async def leave(self):
+        if self.spectator is not None:
+            self.room.remove_spectator(self.spectator)
+
+
+CHANNELS = {LOBBY: LobbyChannel, PRESENCE: PresenceChannel, NOTIFICATIONS: NotificationsChannel}
+ROOM_CHANNELS = {ROOM_PREFIX: RoomChannel, WATCH_PREFIX: WatchChannel}
+
+
+def make_channel(connection, name):
+    if name in CHANNELS:
+        return CHANNELS[name](connection, name)
+    prefix, _, room_id = (name or "").partition(":")
+    channel = ROOM_CHANNELS.get(prefix + ":")
+    if channel is not None and room_id.isdigit():
+        return channel(connection, name, int(room_id))
+    return None
+
+
+# Одне з'єднання користувача з кількома підписками: {"channel": ..., "type": ..., "payload": {...}}.
+# Керування — {"type": "subscribe" | "unsubscribe", "channel": ...}, канали: "room:5", "watch:5", "lobby",
+# "presence", "notifications".
+# Обробники кімнати (message_handlers) доступні в каналі "room:<id>" з тими самими типами і payload, що й на /ws/room
+class UserConnection:
+    def __init__(self, websocket, user, codec, friends):
+        self.websocket = websocket
+        self.user = user
+        self.codec = codec
+        self.friends = friends
+        self.channels = {}
+        self.limiter = ConnectionLimiter()
+        # Кадри з різних кімнат і реєстрів не мають перемежовуватися в одному з'єднанні
+        self._write_lock = asyncio.Lock()
+
+    async def write(self, frame):
+        async with self._write_lock:
+            await self.codec.send(self.websocket, frame)
+
+    async def emit(self, channel, message):
+        await self.write(self.codec.encode(message if channel is None else {"channel": channel, **message}))
+
+    async def error(self, channel, text, **extra):
+        await self.emit(channel, {"type": "error", "message": text, **extra})
+
+    # Приймач для реєстру присутності: з'єднання онлайн, поки відкрите, а оновлення йдуть лише з підпискою
+    async def send(self, message):
+        channel = self.channels.get(PRESENCE)
+        if channel is not None:
+            await channel.send(message)
+
+    async def subscribe(self, name):
+        if name in self.channels:
+            return
+        channel = make_channel(self, name)
+        if channel is None:
+            await self.error(name, f"Невідомий канал: {name}")
+            return
+        # Канал реєструється до відкриття: кімната надсилає room_state ще під час join_room
+        self.channels[name] = channel
+        code = await channel.open()
+        if code is not None:
+            if self.channels.get(name) is channel:
+                del self.channels[name]
+            await self.emit(name, {"type": "unsubscribed", "code": code})
+            return
+        CHANNEL_SUBSCRIPTIONS.labels(channel.kind).inc()
+        await self.emit(name, {"type": "subscribed"})
+
+    async def unsubscribe(self, name, code=1000, notify=True):
+        channel = self.channels.pop(name, None)
+        if channel is None:
+            return
+        # shield: гравець має вийти з кімнати, навіть якщо задачу з'єднання скасовано
+        await asyncio.shield(channel.leave())
+        if notify:
+            try:
+                await self.emit(name, {"type": "unsubscribed", "code": code})
+            except Exception as e:
+                logger.debug("Unsubscribe notice to user %s failed: %s", self.user.id, e)
+
+    async def close(self):
+        """Сокет закрито: вихід з усіх кімнат, друзі бачать користувача офлайн."""
+        for name in list(self.channels):
+            await self.unsubscribe(name, notify=False)
+        await presence.disconnect(self.user.id, self)
+
+    async def throttle(self, channel, message_type):
+        RATE_LIMITED.labels(message_type).inc()
+        if self.limiter.violation():
+            logger.info("Disconnecting user %s for flooding", self.user.id)
+            POLICY_DISCONNECTS.labels("rate_limit").inc()
+            raise WebSocketDisconnect(1008)
+        await self.error(channel, "Забагато повідомлень, спробуйте пізніше", code="rate_limited")
+
+    async def handle_frame(self, raw):
+        # Будь-який кадр — ознака живого з'єднання для всіх кімнат на ньому
+        now = time.monotonic()
+        for channel in list(self.channels.values()):
+            if isinstance(channel, RoomChannel) and channel.player is not None:
+                channel.player.last_seen = now
+
+        if self.limiter.frame_too_large(raw):
+            logger.info("Oversized frame (%s) from user %s", len(raw), self.user.id)
+            OVERSIZED_FRAMES.inc()
+            POLICY_DISCONNECTS.labels("oversized").inc()
+            raise WebSocketDisconnect(1009)
+        if not self.limiter.allow(ALL_FRAMES):
+            await self.throttle(None, ALL_FRAMES)
+            return
+
+        try:
+            name, msg_type, handler, payload = parse_channel_message(raw, self.codec)
+        except ValidationError as e:
+            await self.error(None, f"Некоректне повідомлення: {validation_error_message(e)}")
+            return
+
+        if msg_type == "subscribe":
+            await self.subscribe(name)
+        elif msg_type == "unsubscribe":
+            await self.unsubscribe(name)
+        elif name in self.channels:
+            await self.channels[name].receive(msg_type, handler, payload, len(raw))
+        else:
+            await self.error(name, f"Немає підписки на канал: {name}")
+
+
+# Кімнати в очікуванні, де ще є місця
+def lobby_rooms():
+    return {
+        "type": "rooms",
+        "rooms": [
+            {
+                "id": room.id,
+                "name": room.name,
+                "players": len(room.players),
+                "min_players": room.min_players,
+                "max_players": room.max_players,
+            }
+            for room in list(active_rooms.values())
+            if room.phase == "waiting" and not room.is_private and len(room.players) < room.max_players
+        ],
+    }
+
+
+def load_room(room_id: int):
+    with session_scope() as db:
+        db_room = db.query(Room).filter(Room.id == room_id).first()
+        db.expunge_all()
+    return db_room
+
+
+# Спільний сокет користувача: кімнати, лобі, присутність друзів і сповіщення в одному з'єднанні
+@router.websocket("/ws/user")
+async def user_socket(websocket: WebSocket, token: str = Query(None)):
+    if server_drain.draining:
+        await websocket.accept()
+        await websocket.close(code=SERVICE_RESTART)
+        return
+    if not token:
+        AUTH_RESULTS.labels("missing").inc()
+        await websocket.close(code=4000)
+        return
+    try:
+        user, friends = await run_in_threadpool(load_user, token)
+    except Exception as e:
+        logger.info("Token or User verification error: %s", e)
+        AUTH_RESULTS.labels("invalid").inc()
+        await websocket.close(code=4000)
+        return
+    if not user:
+        AUTH_RESULTS.labels("unknown_user").inc()
+        await websocket.close(code=4000)
+        return
+    AUTH_RESULTS.labels("ok").inc()
+
+    codec, subprotocol = negotiate_codec(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
+    connection = UserConnection(websocket, user, codec, friends)
+    USER_SOCKETS.inc()
+    await presence.connect(user.id, friends, connection)
+    code = None
+    try:
+        while True:
+            await connection.handle_frame(await receive_frame(websocket))
+    except WebSocketDisconnect as e:
+        code = e.code
+        logger.info("User socket disconnected for user %s", user.id)
+    except Exception as e:
+        code = 1011
+        logger.exception("Error in user socket: %s", e)
+    finally:
+        USER_SOCKETS.dec()
+        # Одним shield: кімнати й друзі мають дізнатися про відключення, навіть якщо задачу скасовано
+        await asyncio.shield(connection.close())
+        # Закриття з боку сервера (флуд, завеликий кадр, помилка); клієнт, що пішов сам, сокет уже закрив
+        connected = WebSocketState.CONNECTED
+        if websocket.client_state == connected and websocket.application_state == connected:
+            try:
+                await websocket.close(code=code or 1000)
+            except Exception:
+                pass
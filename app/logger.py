@@ -0,0 +1,141 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+
+from app.config import LOG_DEBUG_ROOMS, LOG_DEBUG_SAMPLE_RATE, LOG_FORMAT, LOG_LEVEL
+
+APP_LOGGER = "app"
+
+# Кімнати, для яких увімкнено DEBUG незалежно від загального рівня
+_debug_rooms = set(LOG_DEBUG_ROOMS)
+_listener = None
+_listening = False
+
+# Стандартні поля LogRecord; все інше потрапило в запис через extra
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+# Один JSON-об'єкт на рядок: ts, level, logger, msg та всі поля з extra (room_id, player_id, ...)
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# Пропускає лише частку DEBUG-записів; INFO і вище не чіпає, як і DEBUG кімнат,
+# для яких його ввімкнули окремо (enable_room_debug, LOG_DEBUG_ROOMS)
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.INFO or self.rate >= 1:
+            return True
+        if getattr(record, "room_id", None) in _debug_rooms:
+            return True
+        return random.random() < self.rate
+
+
+# Логер кімнати: додає room_id до кожного запису і вмикає DEBUG для окремих кімнат
+class RoomLogger(logging.LoggerAdapter):
+    def isEnabledFor(self, level):
+        if self.extra["room_id"] in _debug_rooms:
+            return level >= logging.DEBUG
+        return self.logger.isEnabledFor(level)
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**self.extra, **kwargs.get("extra", {})}
+        return msg, kwargs
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.isEnabledFor(level):
+            msg, kwargs = self.process(msg, kwargs)
+            self.logger._log(level, msg, args, **kwargs)
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+def room_logger(logger, room_id):
+    return RoomLogger(logger, {"room_id": room_id})
+
+
+def enable_room_debug(room_id):
+    _debug_rooms.add(room_id)
+
+
+def disable_room_debug(room_id):
+    _debug_rooms.discard(room_id)
+
+
+def debug_rooms():
+    return sorted(_debug_rooms)
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, sample_rate=LOG_DEBUG_SAMPLE_RATE):
+    """
+    Налаштовує логер застосунку: записи кладуться в чергу без блокування циклу подій,
+    а в stderr їх пише окремий потік QueueListener. Потік запускає start_logging;
+    до того записи лише накопичуються в черзі.
+    """
+    global _listener
+
+    stream = logging.StreamHandler()
+    if fmt == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    logger = logging.getLogger(APP_LOGGER)
+    stop_logging()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, stream, respect_handler_level=True)
+    return logger
+
+
+def start_logging():
+    global _listening
+    if _listener is not None and not _listening:
+        _listener.start()
+        _listening = True
+
+
+def stop_logging():
+    """Дописує записи, що лишилися в черзі, і зупиняє потік."""
+    global _listening
+    if _listening:
+        _listener.stop()
+        _listening = False
+
+
+# Для CLI-скриптів: налаштування й одразу запуск потоку
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, sample_rate=LOG_DEBUG_SAMPLE_RATE):
+    logger = configure_logging(level, fmt, sample_rate)
+    start_logging()
+    return logger
+
+
+atexit.register(stop_logging)
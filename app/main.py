@@ -1,35 +1,74 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, Query
+from contextlib import asynccontextmanager
+import os
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Request, Query
+import anyio.to_thread
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.websockets import WebSocket
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_read_db, read_scope, session_scope
 from app import models, schemas, database
 from app.auth import  get_current_user
 from app.game_rooms.game_rooms import router as game_router
+from app.game_rooms.user_socket import router as user_socket_router
+from app.game_rooms.matchmaking import matchmaker, router as matchmaking_router
 from app.auth import router as auth_router
+from app.admin import router as admin_router
+from app.friends import friend_ids, router as friends_router
+from app.metrics import router as metrics_router
 import random, string
-models.Base.metadata.create_all(bind=database.engine)
 from app.game_rooms.room_storage import active_rooms
 from app.game_rooms.game_models import GameRoom
+from app.game_rooms.heartbeat import heartbeat
+from app.game_rooms.drain import server_drain
+from app.game_rooms.checkpoint import checkpointer
+from app.game_rooms.event_log import event_log, router as games_router
+from app.db_writer import db_writer
 from typing import Optional
 from sqlalchemy import delete
+from app.logger import configure_logging, get_logger, start_logging, stop_logging
+from app.config import AUTO_MIGRATE, THREADPOOL_SIZE, UPLOAD_FOLDER
+from app.migrations import upgrade as migrate
+
+logger = get_logger(__name__)
+
+# Фонові задачі процесу: heartbeat для всіх з'єднань і checkpoint кімнат.
+# Кімнати з незавершеними іграми відновлюються з checkpoint, гравці перепідключаються до них
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Потік запису логів живе лише між стартом і зупинкою застосунку, а не з моменту імпорту
+    start_logging()
+    # Синхронні обробники REST виконуються в пулі потоків; його розмір обмежує одночасну роботу з БД
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Ресурси, яких не торкається імпорт: схема БД і каталог завантажень
+    if AUTO_MIGRATE:
+        await anyio.to_thread.run_sync(migrate, database.engine)
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    await checkpointer.restore()
+    # Відновлені кімнати в очікуванні знову доступні для швидкої гри
+    for room in list(active_rooms.values()):
+        matchmaker.update(room)
+    checkpointer.start()
+    event_log.start()
+    db_writer.start()
+    heartbeat.start()
+    yield
+    # До зупинки uvicorn вже закрив сокети; тут лише розпускаємо кімнати та дочікуємося черг акторів.
+    # Щоб ігри встигли завершитися, drain слід запускати заздалегідь через POST /api/admin/drain
+    await server_drain.drain(deadline=0)
+    await heartbeat.stop()
+    await checkpointer.stop()
+    await event_log.stop()
+    await db_writer.stop()
+    # Контролер drain спільний для процесу: наступний старт (тести, перезапуск через --reload) починає з чистого стану
+    server_drain.reset()
+    stop_logging()
+
+
+router = APIRouter()
 
-app = FastAPI(title="Mafia Game")
-
-# Налаштування CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # URL вашого фронтенду
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(game_router, prefix="/api")
-app.include_router(auth_router, prefix="/auth", tags=["Auth"])
 
 # WebSocket тестовий ендпоінт
-@app.websocket("/ws/test")
+@router.websocket("/ws/test")
 async def websocket_test(websocket: WebSocket):
     await websocket.accept()
     try:
@@ -37,39 +76,46 @@ async def websocket_test(websocket: WebSocket):
             data = await websocket.receive_text()
             await websocket.send_text(f"Message received: {data}")
     except Exception as e:
-        print(f"WebSocket test error: {e}")
+        logger.debug("WebSocket test error: %s", e)
         await websocket.close()
 
-@app.get("/")
+@router.get("/")
 async def root():
     return {"message": "Welcome to Mafia Game API"}
 
 
-@app.get("/api/rooms", response_model=list[schemas.RoomResponse])
-async def get_active_rooms(db: Session = Depends(get_db)):
-    rooms = db.query(models.Room).filter(models.Room.is_active == True).all()
+# Обробники лише з роботою з БД оголошені звичайними def: FastAPI виконує їх у пулі потоків,
+# і блокуючі запити SQLAlchemy не зупиняють цикл подій, який обслуговує ігрові сокети.
+# Відповідь з response_model FastAPI перевіряє знову в пулі потоків, тож з'єднання має повернутися
+# в пул ще в обробнику (read_scope/session_scope), інакше запит чекає на потік, тримаючи з'єднання, а потоки —
+# на з'єднання. Списки, профілі й рейтинг лише читають, тож ідуть на репліку (read_scope)
+@router.get("/api/rooms", response_model=list[schemas.RoomResponse])
+def get_active_rooms():
+    with read_scope() as db:
+        rooms = db.query(models.Room).filter(models.Room.is_active == True).all()
+        db.expunge_all()
     return rooms
 
 
-@app.get("/api/rooms/{room_id}", response_model=schemas.RoomResponse)
-async def get_room(room_id: int, db: Session = Depends(get_db)):
-    room = db.query(models.Room).filter(models.Room.id == room_id).first()
+@router.get("/api/rooms/{room_id}", response_model=schemas.RoomResponse)
+def get_room(room_id: int):
+    with read_scope() as db:
+        room = db.query(models.Room).filter(models.Room.id == room_id).first()
+        db.expunge_all()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     return room
 
 
-@app.post("/api/rooms", response_model=schemas.RoomResponse)
+@router.post("/api/rooms", response_model=schemas.RoomResponse)
 async def create_room(
         room: schemas.RoomCreate,
         password: Optional[str] = Query(None),
-        current_user: Optional[models.User] = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: Optional[models.User] = Depends(get_current_user)
 ):
+    if server_drain.draining:
+        raise HTTPException(status_code=503, detail="Server is draining", headers={"Retry-After": "30"})
     try:
-        print(f"Creating room with data: {room.dict()}")
-        print(f"Current user: {current_user}")
-        
         if room.is_private and not password: 
             raise HTTPException(status_code=400, detail="Password is required for private rooms")
         
@@ -79,8 +125,6 @@ async def create_room(
         else:
             owner_id = current_user.id
 
-        print(f"Creating room with owner_id: {owner_id}")
-
         db_room = models.Room(
             name=room.name,
             password=password,
@@ -91,13 +135,10 @@ async def create_room(
             is_active=True  # Додаємо це поле
         )
         
-        print(f"Created db_room object: {db_room.__dict__}")
-        
-        db.add(db_room)
-        db.commit()
-        db.refresh(db_room)
+        # Запис у БД — через потік запису; active_rooms змінюється лише в циклі подій
+        db_room = await db_writer.run(save_room, db_room)
 
-        print(f"Room saved to database with id: {db_room.id}")
+        logger.info("Room saved to database with id: %s (owner_id=%s)", db_room.id, owner_id)
 
         game_room = GameRoom(
             id=db_room.id,
@@ -107,73 +148,66 @@ async def create_room(
             max_players=db_room.max_players_number,
         )
         
-        print(f"Created game_room object: {game_room.__dict__}")
-        
         active_rooms[db_room.id] = game_room
+        matchmaker.update(game_room)
         return db_room
         
     except Exception as e:
-        print(f"Error creating room: {str(e)}")
-        db.rollback()
+        logger.exception("Error creating room: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Записи для db_writer: коміт робить сам потік запису, однією транзакцією на пачку
+def save_room(db: Session, db_room: models.Room):
+    db.add(db_room)
+    db.flush()
+    return db_room
+
 
-@app.delete("/api/rooms/{room_id}")
+
+@router.delete("/api/rooms/{room_id}")
 async def delete_room(
         room_id: int,
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user: models.User = Depends(get_current_user)
 ):
     
-    room = delete(models.Room).where(models.Room.id == room_id, models.Room.owner == current_user.id)
-    db.execute(room)
-    db.commit()
+    await db_writer.run(delete_room_row, room_id, current_user.id)
 
     if room_id in active_rooms: 
-        del active_rooms[room_id]
+        active_rooms.pop(room_id).fanout.close()
+        checkpointer.forget(room_id)
+        matchmaker.discard(room_id)
     return {"message": "Room deleted successfully"}
 
-# User profile routes
-@app.get("/api/users/{user_id}", response_model=schemas.UserResponse)
-async def get_user_profile(
-        user_id: int,
-        db: Session = Depends(get_db)
-):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
+def delete_room_row(db: Session, room_id: int, owner_id: int):
+    db.execute(delete(models.Room).where(models.Room.id == room_id, models.Room.owner == owner_id))
 
-@app.get("/api/profile", response_model=schemas.UserResponse)
-async def get_my_profile(current_user: models.User = Depends(get_current_user)):
-    return current_user
 
+# User profile routes
+@router.get("/api/users/{user_id}", response_model=schemas.UserResponse)
+def get_user_profile(user_id: int):
+    with read_scope() as db:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user_profile(db, user)
 
-@app.post("/api/friends")
-async def add_friend(
-        friend_data: schemas.AddFriend,
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
-):
-    friend = db.query(models.User).filter(models.User.id == friend_data.friend_id).first()
-    if not friend:
-        raise HTTPException(status_code=404, detail="User not found")
 
-    if not current_user.friends:
-        current_user.friends = []
+# Власний профіль читається з основної бази: щойно доданий друг має бути в списку
+@router.get("/api/profile", response_model=schemas.UserResponse)
+def get_my_profile(current_user: models.User = Depends(get_current_user)):
+    with session_scope() as db:
+        return user_profile(db, current_user)
 
-    if friend_data.friend_id in current_user.friends:
-        raise HTTPException(status_code=400, detail="User is already in your friends list")
 
-    current_user.friends.append(friend_data.friend_id)
-    db.commit()
-    return {"message": "Friend added successfully"}
+def user_profile(db: Session, user: models.User):
+    profile = schemas.UserResponse.model_validate(user)
+    profile.friends = friend_ids(db, user.id)
+    return profile
 
 
-@app.get("/api/leaderboard")
-async def get_leaderboard(db: Session = Depends(get_db)):
+@router.get("/api/leaderboard")
+def get_leaderboard(db: Session = Depends(get_read_db)):
     top_players = db.query(models.User).order_by(models.User.matches.desc()).limit(10).all()
     return [
         {
@@ -186,4 +220,34 @@ async def get_leaderboard(db: Session = Depends(get_db)):
         for player in top_players
     ]
 
-# uvicorn app.main:app --reload
\ No newline at end of file
+
+# Застосунок збирається без звернень до БД чи файлів: усе це робить lifespan під час старту
+def create_app():
+    configure_logging()
+    app = FastAPI(title="Mafia Game", lifespan=lifespan)
+
+    # Налаштування CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # URL вашого фронтенду
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.include_router(router)
+    app.include_router(game_router, prefix="/api")
+    app.include_router(user_socket_router, prefix="/api")
+    app.include_router(matchmaking_router, prefix="/api")
+    app.include_router(games_router, prefix="/api")
+    app.include_router(auth_router, prefix="/auth", tags=["Auth"])
+    app.include_router(friends_router, prefix="/api")
+    app.include_router(admin_router, prefix="/api/admin")
+    app.include_router(metrics_router)
+    return app
+
+
+app = create_app()
+
+# uvicorn app.main:app --reload
+# uvicorn app.main:create_app --factory
\ No newline at end of file
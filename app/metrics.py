@@ -0,0 +1,290 @@
+import bisect
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(tags=["Metrics"])
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+# Базовий клас метрики: дочірні значення зберігаються за кортежем значень міток
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield from child.samples(self.name, self.labelnames, values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {value}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labelnames, values):
+        yield name, _format_labels(labelnames, values), self.value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._collector = None
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def dec(self, amount=1):
+        self._children[()].dec(amount)
+
+    def set(self, value):
+        self._children[()].set(value)
+
+    def set_collector(self, collector):
+        """Значення рахуються лише під час збору: collector() -> {кортеж міток: значення}."""
+        self._collector = collector
+
+    def samples(self):
+        if self._collector is None:
+            yield from super().samples()
+            return
+        for values, value in self._collector().items():
+            if not isinstance(values, tuple):
+                values = (values,)
+            yield self.name, _format_labels(self.labelnames, values), value
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self, name, labelnames, values):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{name}_bucket", _format_labels(labelnames, values, ("le", bound)), cumulative
+        yield f"{name}_bucket", _format_labels(labelnames, values, ("le", "+Inf")), self.count
+        yield f"{name}_sum", _format_labels(labelnames, values), self.sum
+        yield f"{name}_count", _format_labels(labelnames, values), self.count
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bucket_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.bucket_bounds)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Метрики застосунку
+WS_CONNECTIONS = gauge("mafia_ws_connections", "Open room WebSocket connections")
+WS_CONNECTIONS_TOTAL = counter("mafia_ws_connections_total", "Accepted room WebSocket connections")
+ACTIVE_ROOMS = gauge("mafia_active_rooms", "Rooms held in memory by phase", ["phase"])
+ROOM_PLAYERS = gauge("mafia_room_players", "Players seated in in-memory rooms")
+HANDLER_SECONDS = histogram("mafia_handler_seconds", "WebSocket message handler latency", ["type"])
+HANDLER_ERRORS = counter("mafia_handler_errors_total", "WebSocket message handlers that raised", ["type"])
+INVALID_MESSAGES = counter("mafia_invalid_messages_total", "WebSocket frames rejected by validation")
+UNKNOWN_MESSAGES = counter("mafia_unknown_messages_total", "WebSocket messages with an unknown type")
+BROADCAST_SECONDS = histogram("mafia_broadcast_seconds", "GameRoom.broadcast fan-out time")
+BROADCAST_FRAMES = counter("mafia_broadcast_frames_total", "Frames sent by GameRoom.broadcast")
+BROADCAST_BYTES = counter("mafia_broadcast_bytes_total", "Bytes sent by GameRoom.broadcast", ["encoding"])
+DB_COMMIT_SECONDS = histogram("mafia_db_commit_seconds", "Database session commit time")
+DB_ROLLBACKS = counter("mafia_db_rollbacks_total", "Database session rollbacks")
+DB_POOL_CHECKED_OUT = gauge(
+    "mafia_db_pool_checked_out", "Database connections currently checked out of the pool", ["engine"]
+)
+DB_POOL_SIZE = gauge("mafia_db_pool_size", "Configured database pool size", ["engine"])
+DB_POOL_OVERFLOW = gauge("mafia_db_pool_overflow", "Database connections opened beyond the pool size", ["engine"])
+DB_POOL_CHECKOUTS = counter("mafia_db_pool_checkouts_total", "Database connection checkouts", ["engine"])
+DB_CONNECTION_HOLD_SECONDS = histogram(
+    "mafia_db_connection_hold_seconds", "Time a database connection stays checked out of the pool", ["engine"]
+)
+DB_WRITER_QUEUE = gauge("mafia_db_writer_queue", "Writes waiting for the database writer thread")
+DB_WRITER_BATCH = histogram(
+    "mafia_db_writer_batch_size", "Writes committed in one database writer transaction",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+DB_WRITER_ERRORS = counter("mafia_db_writer_errors_total", "Writes that raised in the database writer")
+HANDLER_PAYLOAD_BYTES = histogram(
+    "mafia_handler_payload_bytes", "Inbound WebSocket frame size by message type", ["type"],
+    buckets=(64, 128, 256, 512, 1024, 4096, 16384, 65536),
+)
+RATE_LIMITED = counter("mafia_rate_limited_total", "WebSocket messages dropped by rate limits", ["type"])
+OVERSIZED_FRAMES = counter("mafia_oversized_frames_total", "WebSocket frames over MAX_FRAME_BYTES")
+POLICY_DISCONNECTS = counter(
+    "mafia_ws_policy_disconnects_total", "Room WebSocket connections closed for abuse", ["reason"]
+)
+WS_RTT_SECONDS = histogram("mafia_ws_rtt_seconds", "Heartbeat ping/pong round-trip time")
+HEARTBEAT_PINGS = counter("mafia_heartbeat_pings_total", "Heartbeat pings sent to idle sockets")
+HEARTBEAT_EVICTIONS = counter("mafia_heartbeat_evictions_total", "Players evicted for not answering heartbeats")
+DRAINING = gauge("mafia_draining", "1 while the process refuses new rooms and connections")
+CHECKPOINT_SNAPSHOT_SECONDS = histogram("mafia_checkpoint_snapshot_seconds", "Time to snapshot one room on the event loop")
+CHECKPOINT_WRITE_SECONDS = histogram("mafia_checkpoint_write_seconds", "Checkpoint batch serialization and write time")
+CHECKPOINT_BYTES = histogram(
+    "mafia_checkpoint_bytes", "Serialized checkpoint size per room",
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+CHECKPOINT_ROOMS = counter("mafia_checkpoint_rooms_total", "Room checkpoints written")
+CHECKPOINT_SKIPPED = counter("mafia_checkpoint_skipped_total", "Rooms left for the next checkpoint", ["reason"])
+EVENT_LOG_EVENTS = counter("mafia_event_log_events_total", "Game events appended to the event log", ["type"])
+EVENT_LOG_FLUSH_SECONDS = histogram("mafia_event_log_flush_seconds", "Event log batch write time")
+PRESENCE_ONLINE = gauge("mafia_presence_online_users", "Users with at least one open socket")
+PRESENCE_WATCHES = gauge("mafia_presence_watches", "Friend subscriptions held by online users")
+PRESENCE_UPDATES = counter("mafia_presence_updates_total", "Presence updates pushed to friends")
+PRESENCE_SEND_FAILURES = counter(
+    "mafia_presence_send_failures_total", "Presence updates that failed and dropped the subscriber's connection"
+)
+USER_SOCKETS = gauge("mafia_ws_user_sockets", "Open multiplexed user WebSocket connections")
+CHANNEL_SUBSCRIPTIONS = counter(
+    "mafia_ws_channel_subscriptions_total", "Channels subscribed on multiplexed user sockets", ["kind"]
+)
+NOTIFICATIONS_SENT = counter("mafia_notifications_sent_total", "Notifications delivered to user sockets")
+MATCHMAKING_OPEN_ROOMS = gauge("mafia_matchmaking_open_rooms", "Public waiting rooms with free seats")
+MATCHMAKING_PLACEMENTS = counter(
+    "mafia_matchmaking_placements_total", "Quick-play requests by outcome", ["result"]
+)
+MATCHMAKING_WAIT_SECONDS = histogram(
+    "mafia_matchmaking_wait_seconds", "Time from a player's first quick-play request to the start of their game",
+    buckets=(1, 5, 10, 20, 30, 60, 120, 300, 600, 1800),
+)
+SPECTATORS = gauge("mafia_spectators", "Spectators watching in-memory rooms")
+SPECTATOR_FRAMES = counter("mafia_spectator_frames_total", "Frames sent to spectators")
+SPECTATOR_DROPPED = counter(
+    "mafia_spectator_dropped_total", "Spectator events or connections dropped to protect players", ["reason"]
+)
+SPECTATOR_FANOUT_SECONDS = histogram("mafia_spectator_fanout_seconds", "Time to deliver one event to all spectators")
+PROJECTION_BUILDS = counter("mafia_projection_builds_total", "Player lists built per viewer kind", ["view"])
+AUTH_RESULTS = counter("mafia_ws_auth_total", "WebSocket token verification results", ["result"])
+
+
+# Збір виконується в циклі подій: значення рахуються з тих самих структур, що й ігри
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,47 @@
+# Початкова схема: користувачі, кімнати, повідомлення чату.
+# Таблиці описані тут, а не взяті з app.models, щоб міграція не змінювалася разом з моделями.
+# checkfirst: бази, створені раніше через create_all, просто отримують версію 1
+from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+Table(
+    "user", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String, unique=True, index=True),
+    Column("hashed_password", String, nullable=False),
+    Column("email", String, unique=True, index=True),
+    Column("friends", JSON),
+    Column("created_at", DateTime),
+    Column("matches", Integer),
+    Column("survivor_matches", Integer),
+    Column("mafia_matches", Integer),
+    Column("is_host", Boolean),
+    Column("is_admin", Boolean),
+)
+
+Table(
+    "room", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, index=True),
+    Column("password", String, nullable=True),
+    Column("owner", Integer, ForeignKey("user.id"), nullable=True),
+    Column("players_number", Integer),
+    Column("min_players_number", Integer),
+    Column("max_players_number", Integer),
+    Column("is_private", Boolean),
+    Column("is_active", Boolean),
+)
+
+Table(
+    "message", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("message", Text),
+    Column("user_id", Integer, ForeignKey("user.id")),
+    Column("room_id", Integer, ForeignKey("room.id")),
+    Column("writing_time", DateTime),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,45 @@
+# Друзі переїжджають зі списку JSON у user.friends до таблиці friendship з індексами в обидва боки.
+# Ідентифікатори неіснуючих користувачів і повтори зі старих списків відкидаються
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Index, Integer, MetaData, Table, inspect, select, text
+
+metadata = MetaData()
+
+user = Table(
+    "user", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("friends", JSON),
+)
+
+friendship = Table(
+    "friendship", metadata,
+    Column("user_id", Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True),
+    Column("friend_id", Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True),
+    Column("created_at", DateTime),
+    Index("ix_friendship_friend_id_user_id", "friend_id", "user_id"),
+)
+
+
+def upgrade(conn):
+    friendship.create(conn, checkfirst=True)
+    # База, створена через create_all з новими моделями, списку JSON уже не має
+    if "friends" not in {column["name"] for column in inspect(conn).get_columns("user")}:
+        return
+
+    rows = conn.execute(select(user.c.id, user.c.friends)).all()
+    existing = {user_id for user_id, _ in rows}
+    now = datetime.now()
+    pairs = {
+        (user_id, friend_id)
+        for user_id, friends in rows
+        for friend_id in (friends or [])
+        if isinstance(friend_id, int) and friend_id in existing
+    }
+    if pairs:
+        conn.execute(
+            friendship.insert(),
+            [{"user_id": user_id, "friend_id": friend_id, "created_at": now} for user_id, friend_id in sorted(pairs)],
+        )
+
+    conn.execute(text('ALTER TABLE "user" DROP COLUMN friends'))
@@ -0,0 +1,71 @@
+"""
+Версійні міграції схеми БД.
+
+Кожна міграція — модуль NNNN_назва.py у цьому пакеті з функцією upgrade(conn); номер у назві файлу
+і є версією. Застосована версія зберігається в таблиці schema_version, кожна міграція виконується
+у власній транзакції разом з оновленням версії.
+
+    python -m app.migrations            # застосувати всі нові міграції
+    python -m app.migrations --current  # показати поточну версію
+"""
+import importlib
+import os
+import pkgutil
+
+from sqlalchemy import text
+
+from app.logger import get_logger
+
+logger = get_logger(__name__)
+
+VERSION_TABLE = "schema_version"
+
+
+# Міграції пакета за зростанням версії: [(версія, модуль)]
+def discover():
+    migrations = []
+    for module in pkgutil.iter_modules([os.path.dirname(__file__)]):
+        prefix, _, _ = module.name.partition("_")
+        if prefix.isdigit():
+            migrations.append((int(prefix), importlib.import_module(f"{__name__}.{module.name}")))
+    return sorted(migrations, key=lambda item: item[0])
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (version INTEGER NOT NULL)"))
+
+
+def _read_version(conn):
+    return conn.execute(text(f"SELECT MAX(version) FROM {VERSION_TABLE}")).scalar() or 0
+
+
+def current_version(db_engine):
+    with db_engine.begin() as conn:
+        _ensure_version_table(conn)
+        return _read_version(conn)
+
+
+# Застосовує міграції новіші за поточну версію (до target включно). Повертає список застосованих версій.
+# Кілька воркерів можуть стартувати одночасно: у Postgres транзакцію міграції серіалізує advisory lock,
+# у SQLite — блокування запису (BEGIN IMMEDIATE), тож версія перечитується вже під блокуванням
+def upgrade(db_engine=None, target=None):
+    if db_engine is None:
+        from app.database import engine as db_engine
+    applied = []
+    for version, module in discover():
+        if target is not None and version > target:
+            break
+        with db_engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": VERSION_TABLE})
+            elif conn.dialect.name == "sqlite":
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            _ensure_version_table(conn)
+            if version <= _read_version(conn):
+                continue
+            module.upgrade(conn)
+            conn.execute(text(f"DELETE FROM {VERSION_TABLE}"))
+            conn.execute(text(f"INSERT INTO {VERSION_TABLE} (version) VALUES (:version)"), {"version": version})
+        logger.info("Applied migration %s", module.__name__.rsplit(".", 1)[-1])
+        applied.append(version)
+    return applied
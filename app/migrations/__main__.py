@@ -0,0 +1,21 @@
+import argparse
+
+from app.database import engine
+from app.logger import setup_logging
+from app.migrations import current_version, upgrade
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    parser.add_argument("--current", action="store_true", help="print the applied version and exit")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    if not args.current:
+        upgrade(engine, target=args.target)
+    print(current_version(engine))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.types import JSON
 from app.database import Base
 from datetime import datetime
 
@@ -10,7 +9,6 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String, nullable=False)
     email = Column(String, unique=True, index=True)
-    friends = Column(JSON, default = list)
     created_at = Column(DateTime, default=datetime.now)
     matches = Column(Integer, default=0)
     survivor_matches = Column(Integer, default=0)
@@ -19,6 +17,18 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
 
 
+# Дружба — рядок (user_id, friend_id): user_id додав friend_id у друзі.
+# Первинний ключ обслуговує "мої друзі", другий індекс — "хто додав мене"
+class Friendship(Base):
+    __tablename__ = "friendship"
+
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    friend_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (Index("ix_friendship_friend_id_user_id", "friend_id", "user_id"),)
+
+
 class Messages(Base):
     __tablename__ = "message"
 
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Union
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Union
 from pydantic import validator
 
 class UserBase(BaseModel):
@@ -71,4 +71,30 @@ class RoomResponse(RoomBase):
     is_active: bool = True
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Вхідні повідомлення WebSocket: {"type": ..., "payload": {...}};
+# на спільному сокеті користувача ще й "channel" ("room:5", "lobby", ...), сокет кімнати його ігнорує
+class InboundMessage(BaseModel):
+    type: str
+    payload: Dict[str, Any] = {}
+    channel: Optional[str] = None
+
+class EmptyPayload(BaseModel):
+    pass
+
+class ChatPayload(BaseModel):
+    message: str = Field("", max_length=1000)
+
+class PongPayload(BaseModel):
+    ts: float
+
+
+class TargetPayload(BaseModel):
+    target_id: int
+
+
+# Бажаний розмір кімнати для швидкої гри (max_players); None — будь-яка
+class QuickJoinPayload(BaseModel):
+    size: Optional[int] = Field(None, ge=4, le=12)
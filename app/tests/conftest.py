@@ -0,0 +1,118 @@
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Тести не повинні торкатися робочої бази, checkpoint чи журналу ігор у поточному каталозі.
+# Змінні середовища виставляються до першого імпорту app.config
+_workdir = tempfile.mkdtemp(prefix="mafia-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["CHECKPOINT_PATH"] = os.path.join(_workdir, "checkpoints.db")
+os.environ["EVENT_LOG_DIR"] = os.path.join(_workdir, "game_logs")
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+
+# Модулі застосунку імпортуються лише після змінних середовища
+from app.game_rooms.codecs import JsonCodec  # noqa: E402
+from app.game_rooms.game_models import GameRoom, Player  # noqa: E402
+
+
+# Схема тестової бази — тими самими міграціями, що й у робочій; імпорт застосунку БД не торкається
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    from app.database import engine
+    from app.migrations import upgrade
+
+    upgrade(engine)
+
+
+# Контролер drain спільний для процесу: тест, що лишив його ввімкненим, не повинен ламати наступні
+@pytest.fixture(autouse=True)
+def reset_drain():
+    from app.game_rooms.drain import server_drain
+
+    server_drain.reset()
+    yield
+    server_drain.reset()
+
+
+# Підроблений сокет для тестів без сервера: текстові кадри розбираються з JSON у sent, бінарні лишаються
+# в binary. delay затримує кожне надсилання, hang — надсилання й закриття (завислий клієнт). Навіть без
+# затримки надсилання віддає керування циклу подій, щоб інші команди могли вклинитися
+class FakeWebSocket:
+    def __init__(self, delay=0, hang=False):
+        self.delay = 3600 if hang else delay
+        self.hang = hang
+        self.sent = []
+        self.binary = []
+        self.closed = None
+
+    async def send_text(self, frame):
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(frame))
+
+    async def send_bytes(self, frame):
+        await asyncio.sleep(self.delay)
+        self.binary.append(frame)
+
+    async def close(self, code=1000):
+        if self.hang:
+            await asyncio.sleep(3600)
+        self.closed = code
+
+
+class CountingCodec(JsonCodec):
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, message):
+        self.encoded += 1
+        return super().encode(message)
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_socket():
+    return FakeWebSocket
+
+
+@pytest.fixture
+def counting_codec():
+    return CountingCodec()
+
+
+@pytest.fixture
+def fake_clock():
+    return FakeClock()
+
+
+# Кімната з гравцями p1..pN (id 1..N) на підроблених сокетах. roles задає і кількість гравців, і їхні ролі;
+# sockets — власні сокети гравців. Решта аргументів іде в GameRoom (min_players, max_players, ...)
+@pytest.fixture
+def make_room():
+    def make(room_id=1, players=3, roles=None, sockets=None, phase="waiting", round=0, codec=None, **kwargs):
+        room = GameRoom(id=room_id, name=f"room{room_id}", owner_id=1, **kwargs)
+        if sockets is None:
+            sockets = [FakeWebSocket() for _ in range(len(roles) if roles is not None else players)]
+        for i, websocket in enumerate(sockets, start=1):
+            player = Player(id=i, name=f"p{i}", websocket=websocket)
+            if codec is not None:
+                player.codec = codec
+            if roles is not None:
+                player.role = roles[i - 1]
+            room.add_player(player)
+        room.phase = phase
+        room.round = round
+        return room
+
+    return make
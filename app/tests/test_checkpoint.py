@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+from app.game_rooms.checkpoint import Checkpointer, CheckpointStore
+from app.game_rooms.dispatch import dispatch
+from app.game_rooms.game_models import GameRoom, Player
+from app.game_rooms.game_rooms import handle_chat, handle_pong, join_room, night_action
+from app.schemas import ChatPayload, PongPayload, TargetPayload
+
+ROLES = ["mafia", "mafia", "doctor", "detective", "civilian", "civilian"]
+
+
+def make_game(make_room, room_id=1):
+    return make_room(room_id, roles=ROLES, phase="night", round=2, min_players=6, max_players=6)
+
+
+def make_checkpointer(tmp_path, rooms):
+    return Checkpointer(CheckpointStore(str(tmp_path / "checkpoints.db")), rooms)
+
+
+def test_snapshot_round_trip(make_room):
+    room = make_game(make_room)
+    room.night_actions["mafia"].append(5)
+    room.votes = {1: 5, 2: 6}
+    room.players[5].is_alive = False
+    room.mark_dirty()
+
+    restored = GameRoom.from_snapshot(json.loads(json.dumps(room.snapshot())))
+
+    assert restored.snapshot() == room.snapshot()
+    assert restored.votes == {1: 5, 2: 6}
+    assert restored.players[1].role == "mafia"
+    assert not restored.players[5].is_alive
+    assert restored.players[1].websocket is None
+
+
+def test_only_dirty_rooms_are_written(tmp_path, make_room):
+    rooms = {i: make_game(make_room, i) for i in range(1, 4)}
+    checkpoints = make_checkpointer(tmp_path, rooms)
+
+    async def scenario():
+        assert await checkpoints.flush() == 3
+        assert await checkpoints.flush() == 0
+        # Обробник змінив кімнату 2 — записується лише вона
+        room = rooms[2]
+        player = room.players[1]
+        await room.actor.call(
+            dispatch, "night_action", night_action, websocket=player.websocket,
+            payload=TargetPayload(target_id=5), room_id=room.id, db=None, player=player, room=room,
+        )
+        assert await checkpoints.flush() == 1
+
+        checkpoints.forget(3)
+        del rooms[3]
+        await checkpoints.flush()
+        return await asyncio.to_thread(checkpoints.store.load)
+
+    saved = {snapshot["id"]: snapshot for snapshot in asyncio.run(scenario())}
+    assert set(saved) == {1, 2}
+    assert saved[2]["night_actions"]["mafia"] == [5]
+
+
+def test_restored_room_accepts_reconnecting_players(tmp_path, make_room, fake_socket):
+    rooms = {1: make_game(make_room)}
+    asyncio.run(make_checkpointer(tmp_path, rooms).flush())
+
+    restored_rooms = {}
+    checkpoints = make_checkpointer(tmp_path, restored_rooms)
+    assert asyncio.run(checkpoints.restore()) == 1
+    room = restored_rooms[1]
+
+    websocket = fake_socket()
+    seated = asyncio.run(join_room(room, Player(id=1, name="p1", websocket=websocket)))
+
+    assert seated is room.players[1]
+    assert seated.websocket is websocket
+    assert seated.role == "mafia"
+    assert [m["type"] for m in websocket.sent] == ["room_state", "role_assigned"]
+    assert websocket.sent[1]["other_mafia"] == [{"id": 2, "name": "p2"}]
+    # Гравцям, що ще не повернулися, нічого не надсилається
+    asyncio.run(room.broadcast({"type": "system", "message": "hi"}))
+    assert websocket.sent[-1]["type"] == "system"
+
+
+def test_finished_games_are_not_restored(tmp_path, make_room):
+    room = make_game(make_room)
+    room.phase = "ended"
+    asyncio.run(make_checkpointer(tmp_path, {1: room}).flush())
+
+    restored_rooms = {}
+    checkpoints = make_checkpointer(tmp_path, restored_rooms)
+    assert asyncio.run(checkpoints.restore()) == 0
+    assert asyncio.run(checkpoints.flush()) == 0
+    assert asyncio.run(asyncio.to_thread(checkpoints.store.load)) == []
+
+
+def test_busy_room_is_skipped_until_next_flush(tmp_path, make_room):
+    rooms = {i: make_game(make_room, i) for i in range(1, 4)}
+    checkpoints = make_checkpointer(tmp_path, rooms)
+    checkpoints.snapshot_timeout = 0.05
+    release = asyncio.Event()
+
+    async def busy():
+        await release.wait()
+
+    async def scenario():
+        # Черга кімнати 2 зайнята довгою командою: решта кімнат записуються без неї
+        blocker = asyncio.ensure_future(rooms[2].actor.call(busy))
+        await asyncio.sleep(0)
+        assert await checkpoints.flush() == 2
+        release.set()
+        await blocker
+        assert await checkpoints.flush() == 1
+        return await asyncio.to_thread(checkpoints.store.load)
+
+    assert {snapshot["id"] for snapshot in asyncio.run(scenario())} == {1, 2, 3}
+
+
+# Чат зберігається через db_writer; тут БД не потрібна
+class NullWriter:
+    def submit(self, func, *args):
+        pass
+
+
+def test_chat_and_pong_do_not_dirty_the_room(tmp_path, make_room):
+    rooms = {1: make_game(make_room)}
+    checkpoints = make_checkpointer(tmp_path, rooms)
+    room = rooms[1]
+    player = room.players[1]
+
+    async def command(name, handler, payload):
+        await room.actor.call(
+            dispatch, name, handler, websocket=player.websocket,
+            payload=payload, room_id=room.id, db=None, db_writer=NullWriter(), player=player, room=room,
+        )
+
+    async def scenario():
+        await checkpoints.flush()
+        await command("chat", handle_chat, ChatPayload(message="hi"))
+        await command("pong", handle_pong, PongPayload(ts=0))
+        assert await checkpoints.flush() == 0
+        await command("night_action", night_action, TargetPayload(target_id=5))
+        assert await checkpoints.flush() == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from app.game_rooms.codecs import JSON_CODEC, negotiate_codec
+from app.game_rooms.dispatch import parse_message
+
+msgpack = pytest.importorskip("msgpack")
+
+from app.game_rooms.codecs import MSGPACK_CODEC  # noqa: E402
+
+
+def test_negotiate_prefers_client_order():
+    assert negotiate_codec(["mafia.msgpack", "mafia.json"]) == (MSGPACK_CODEC, "mafia.msgpack")
+    assert negotiate_codec(["mafia.json", "mafia.msgpack"]) == (JSON_CODEC, "mafia.json")
+
+
+def test_negotiate_defaults_to_json_without_subprotocol():
+    assert negotiate_codec([]) == (JSON_CODEC, None)
+    assert negotiate_codec(["unknown"]) == (JSON_CODEC, None)
+
+
+def test_msgpack_frame_is_validated_like_json():
+    raw = msgpack.packb({"type": "chat", "payload": {"message": "привіт"}})
+    message_type, handler, payload = parse_message(raw, MSGPACK_CODEC)
+    assert message_type == "chat"
+    assert handler is not None
+    assert payload.message == "привіт"
+
+
+def test_undecodable_msgpack_frame_is_rejected():
+    from pydantic import ValidationError
+
+    with pytest.raises(ValidationError):
+        parse_message(b"\xc1", MSGPACK_CODEC)
+
+
+def test_broadcast_encodes_once_per_codec(monkeypatch, make_room):
+    room = make_room(players=6)
+    for player in room.players.values():
+        player.codec = MSGPACK_CODEC if player.id % 2 else JSON_CODEC
+
+    calls = {"json": 0, "msgpack": 0}
+    for codec in (JSON_CODEC, MSGPACK_CODEC):
+        original = codec.encode
+
+        def counting(message, codec=codec, original=original):
+            calls[codec.name] += 1
+            return original(message)
+
+        monkeypatch.setattr(codec, "encode", counting)
+
+    asyncio.run(room.broadcast({"type": "phase_change", "phase": "night"}))
+
+    assert calls == {"json": 1, "msgpack": 1}
+    for player in room.players.values():
+        ws = player.websocket
+        if player.codec is MSGPACK_CODEC:
+            assert msgpack.unpackb(ws.binary[0]) == {"type": "phase_change", "phase": "night"}
+        else:
+            assert ws.sent[0] == {"type": "phase_change", "phase": "night"}
@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.config import DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_SIZE
+from app.database import Base, ReadSessionLocal, SessionLocal, create_db_engine, engine, read_engine
+from app.main import app
+from app.models import Room, User
+
+
+def make_replica():
+    # Друга база SQLite замість репліки Postgres: ті самі таблиці, інші дані
+    path = os.path.join(tempfile.mkdtemp(prefix="mafia-replica-"), "replica.db")
+    replica = create_db_engine(f"sqlite:///{path}", "replica")
+    Base.metadata.create_all(bind=replica)
+    return replica
+
+
+def test_engine_pool_follows_config():
+    assert engine.pool.size() == DB_POOL_SIZE
+    assert engine.pool._max_overflow == DB_MAX_OVERFLOW
+    assert engine.pool._recycle == DB_POOL_RECYCLE
+    assert engine.pool._pre_ping
+    # Без DATABASE_REPLICA_URL читання йдуть в основну базу
+    assert read_engine is engine
+
+
+def test_reads_go_to_replica_and_writes_to_primary():
+    Base.metadata.create_all(bind=engine)
+    replica = make_replica()
+    db = SessionLocal()
+    try:
+        owner = User(username="replica_owner", email="replica_owner@example.com", hashed_password="x")
+        db.add(owner)
+        db.commit()
+        token = create_access_token({"sub": owner.email})
+    finally:
+        db.close()
+    with replica.begin() as conn:
+        conn.execute(Room.__table__.insert().values(
+            name="replica-only", min_players_number=4, max_players_number=6, is_active=True,
+        ))
+
+    ReadSessionLocal.configure(bind=replica)
+    try:
+        client = TestClient(app)
+        created = client.post(
+            "/api/rooms",
+            json={"name": "primary-only", "min_players_number": 4, "max_players_number": 6},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert created.status_code == 200
+        names = {room["name"] for room in client.get("/api/rooms").json()}
+    finally:
+        ReadSessionLocal.configure(bind=read_engine)
+        replica.dispose()
+
+    # Новою кімнатою керує основна база, а список прочитано з репліки, куди вона ще не дійшла
+    assert names == {"replica-only"}
+    db = SessionLocal()
+    try:
+        assert db.query(Room).filter(Room.name == "primary-only").count() == 1
+        assert db.query(Room).filter(Room.name == "replica-only").count() == 0
+    finally:
+        db.close()
@@ -0,0 +1,67 @@
+from contextlib import ExitStack
+
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.database import Base, SessionLocal, engine
+from app.db_writer import db_writer
+from app.main import app
+from app.models import Messages, Room, User
+
+SOCKETS = 200
+ROOM_SIZE = 10
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        users = [
+            User(username=f"idle{i}", email=f"idle{i}@example.com", hashed_password="x")
+            for i in range(SOCKETS)
+        ]
+        db.add_all(users)
+        db.flush()
+        rooms = [
+            Room(name=f"idle{i}", owner=users[i * ROOM_SIZE].id, min_players_number=4, max_players_number=ROOM_SIZE)
+            for i in range(SOCKETS // ROOM_SIZE)
+        ]
+        db.add_all(rooms)
+        db.commit()
+        return [(user.id, user.email) for user in users], [room.id for room in rooms]
+    finally:
+        db.close()
+
+
+def receive_until(ws, message_type):
+    while True:
+        message = ws.receive_json()
+        if message["type"] == message_type:
+            return message
+
+
+def test_idle_sockets_hold_no_db_connections():
+    users, rooms = seed()
+
+    with TestClient(app) as client, ExitStack() as stack:
+        sockets = []
+        for i, (user_id, email) in enumerate(users):
+            token = create_access_token({"sub": email})
+            ws = stack.enter_context(client.websocket_connect(f"/api/ws/room/{rooms[i // ROOM_SIZE]}?token={token}"))
+            receive_until(ws, "room_state")
+            sockets.append(ws)
+
+        # Сотні відкритих сокетів і жодного з'єднання з пулу
+        assert engine.pool.checkedout() == 0
+
+        sockets[0].send_json({"type": "chat", "payload": {"message": "привіт"}})
+        assert receive_until(sockets[1], "chat")["message"] == "привіт"
+        # Запис чату йде через потік запису; після його скидання з'єднання повернуто в пул
+        client.portal.call(db_writer.flush)
+        assert engine.pool.checkedout() == 0
+
+    db = SessionLocal()
+    try:
+        assert db.query(Messages).filter(Messages.room_id == rooms[0]).count() == 1
+    finally:
+        db.close()
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import text
+
+from app.database import Base, SessionLocal, engine
+from app.db_writer import DatabaseWriter, writer_scope
+from app.models import Messages, Room
+
+
+class CountingScope:
+    def __init__(self):
+        self.transactions = 0
+
+    @contextmanager
+    def __call__(self):
+        self.transactions += 1
+        with writer_scope() as db:
+            yield db
+
+
+def make_room():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        room = Room(name="writer", min_players_number=4, max_players_number=6)
+        db.add(room)
+        db.commit()
+        return room.id
+    finally:
+        db.close()
+
+
+def add_message(db, room_id, text):
+    message = Messages(message=text, room_id=room_id)
+    db.add(message)
+    db.flush()
+    return message.id
+
+
+def fail(db):
+    raise ValueError("boom")
+
+
+def block(db, started, release):
+    started.set()
+    release.wait(5)
+
+
+def test_sqlite_connections_use_production_pragmas():
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+def test_queued_writes_commit_in_one_transaction():
+    room_id = make_room()
+    scope = CountingScope()
+    writer = DatabaseWriter(scope=scope, batch_size=100)
+
+    async def scenario():
+        # Потік запису зайнятий, тож наступні записи накопичуються в черзі й ідуть однією пачкою
+        started, release = threading.Event(), threading.Event()
+        blocker = writer.submit(block, started, release)
+        await asyncio.to_thread(started.wait, 5)
+        writes = [writer.submit(add_message, room_id, f"m{i}") for i in range(50)]
+        release.set()
+        ids = await asyncio.gather(*(asyncio.wrap_future(write) for write in writes))
+        blocker.result()
+        await writer.stop()
+        return ids
+
+    ids = asyncio.run(scenario())
+
+    assert len(set(ids)) == 50
+    assert scope.transactions == 2
+    db = SessionLocal()
+    try:
+        assert db.query(Messages).filter(Messages.room_id == room_id).count() == 50
+    finally:
+        db.close()
+
+
+def test_failed_write_does_not_roll_back_its_batch():
+    room_id = make_room()
+    writer = DatabaseWriter(batch_size=100)
+
+    async def scenario():
+        started, release = threading.Event(), threading.Event()
+        writer.submit(block, started, release)
+        await asyncio.to_thread(started.wait, 5)
+        good = [writer.submit(add_message, room_id, f"ok{i}") for i in range(3)]
+        bad = writer.submit(fail)
+        release.set()
+        with pytest.raises(ValueError):
+            await asyncio.wrap_future(bad)
+        await asyncio.gather(*(asyncio.wrap_future(write) for write in good))
+        await writer.stop()
+
+    asyncio.run(scenario())
+
+    db = SessionLocal()
+    try:
+        assert db.query(Messages).filter(Messages.room_id == room_id).count() == 3
+    finally:
+        db.close()
+
+
+def test_flush_waits_for_pending_writes():
+    room_id = make_room()
+    writer = DatabaseWriter()
+
+    async def scenario():
+        for i in range(20):
+            writer.submit(add_message, room_id, f"f{i}")
+        await writer.flush()
+        db = SessionLocal()
+        try:
+            count = db.query(Messages).filter(Messages.room_id == room_id).count()
+        finally:
+            db.close()
+        await writer.stop()
+        return count
+
+    assert asyncio.run(scenario()) == 20
+
+
+def test_non_sqlite_writes_commit_directly():
+    room_id = make_room()
+    scope = CountingScope()
+    writer = DatabaseWriter(scope=scope, serialize=False)
+
+    async def scenario():
+        ids = await asyncio.gather(*(writer.run(add_message, room_id, f"d{i}") for i in range(5)))
+        writer.submit(add_message, room_id, "last")
+        await writer.flush()
+        return ids
+
+    ids = asyncio.run(scenario())
+
+    # Без потоку запису: кожен запис — окрема транзакція
+    assert len(set(ids)) == 5 and not writer.is_running
+    assert scope.transactions == 6
+
+
+def test_only_sqlite_uses_the_writer_thread():
+    assert DatabaseWriter().serialize == (engine.dialect.name == "sqlite")
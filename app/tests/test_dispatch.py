@@ -0,0 +1,74 @@
+import asyncio
+
+from app.game_rooms import dispatch as dispatch_module
+from app.game_rooms.dispatch import (
+    HandlerContext,
+    SlowHandlerLog,
+    add_handler_hook,
+    dispatch,
+    remove_handler_hook,
+)
+from app.game_rooms.game_models import GameRoom, Player
+
+
+def test_hooks_wrap_handler_in_registration_order():
+    calls = []
+
+    async def outer(ctx, call_next):
+        calls.append("outer:before")
+        result = await call_next(ctx)
+        calls.append("outer:after")
+        return result
+
+    async def inner(ctx, call_next):
+        calls.append(f"inner:{ctx.message_type}:{ctx.payload_size}")
+        return await call_next(ctx)
+
+    async def handler(value, **kwargs):
+        calls.append("handler")
+        return value * 2
+
+    add_handler_hook(outer)
+    add_handler_hook(inner)
+    try:
+        result = asyncio.run(dispatch("double", handler, payload_size=12, value=21))
+    finally:
+        remove_handler_hook(outer)
+        remove_handler_hook(inner)
+
+    assert result == 42
+    assert calls == ["outer:before", "inner:double:12", "handler", "outer:after"]
+
+
+def test_slow_handlers_are_recorded_with_room_context():
+    room = GameRoom(id=950, name="slow", owner_id=1)
+    room.phase = "day"
+    room.round = 3
+    player = Player(id=1, name="p1", websocket=None)
+    room.add_player(player)
+
+    async def slow(**kwargs):
+        await asyncio.sleep(0.01)
+
+    dispatch_module.slow_handlers.clear()
+    asyncio.run(dispatch("vote", slow, payload_size=40, room=room, player=player))
+
+    entry = dispatch_module.slow_handlers.top(1)[0]
+    assert entry["type"] == "vote"
+    assert entry["room_id"] == 950
+    assert entry["phase"] == "day"
+    assert entry["round"] == 3
+    assert entry["player_id"] == 1
+    assert entry["payload_bytes"] == 40
+    assert entry["duration_ms"] >= 10
+
+
+def test_slow_handler_log_keeps_top_n():
+    log = SlowHandlerLog(3)
+    for duration in [0.5, 0.1, 0.9, 0.3, 0.7]:
+        ctx = HandlerContext("chat", None, {}, 0)
+        ctx.duration = duration
+        log.record(ctx)
+
+    assert [entry["duration_ms"] for entry in log.top()] == [900.0, 700.0, 500.0]
+    assert len(log.top(2)) == 2
@@ -0,0 +1,125 @@
+import asyncio
+
+from app.game_rooms.checkpoint import Checkpointer, CheckpointStore
+from app.game_rooms.drain import SERVICE_RESTART, DrainController
+
+
+def sockets(room):
+    return [player.websocket for player in room.players.values()]
+
+
+def make_drain(tmp_path, rooms, **kwargs):
+    checkpoints = Checkpointer(CheckpointStore(str(tmp_path / "checkpoints.db")), rooms)
+    return DrainController(rooms, checkpoints, poll_interval=0.01, **kwargs), checkpoints
+
+
+def test_waiting_rooms_are_released_and_games_finish(tmp_path, make_room):
+    waiting, playing = make_room(1, phase="waiting"), make_room(2, phase="night")
+    waiting_sockets, playing_sockets = sockets(waiting), sockets(playing)
+    rooms = {1: waiting, 2: playing}
+    drain, _ = make_drain(tmp_path, rooms)
+
+    async def scenario():
+        task = asyncio.create_task(drain.drain(deadline=5))
+        while not all(ws.closed for ws in waiting_sockets):
+            await asyncio.sleep(0.01)
+        # Кімната в очікуванні вже розпущена, гра ще триває
+        assert list(rooms) == [2]
+        assert all(ws.closed == SERVICE_RESTART for ws in waiting_sockets)
+        assert all(ws.closed is None for ws in playing_sockets)
+        assert drain.status()["games_in_progress"] == 1
+        playing.phase = "ended"
+        await asyncio.wait_for(task, 1)
+
+    asyncio.run(scenario())
+
+    assert rooms == {}
+    assert drain.draining
+    assert waiting_sockets[0].sent[-1]["reconnect"] is True
+    assert [m["type"] for m in playing_sockets[0].sent] == ["server_draining", "server_draining"]
+    assert all(ws.closed == SERVICE_RESTART for ws in playing_sockets)
+
+
+def test_deadline_checkpoints_and_releases_unfinished_games(tmp_path, make_room):
+    clock = [0.0]
+    rooms = {1: make_room(1, phase="day", round=3)}
+    drain, checkpoints = make_drain(tmp_path, rooms, clock=lambda: clock[0])
+
+    async def scenario():
+        task = asyncio.create_task(drain.drain(deadline=60))
+        await asyncio.sleep(0.05)
+        assert rooms
+        clock[0] = 61
+        await asyncio.wait_for(task, 1)
+
+    asyncio.run(scenario())
+    assert rooms == {}
+
+    # Незавершена гра лишилася в checkpoint і повернеться після перезапуску
+    assert asyncio.run(checkpoints.restore()) == 1
+    assert rooms[1].phase == "day"
+    assert rooms[1].round == 3
+    assert all(player.websocket is None for player in rooms[1].players.values())
+
+
+def test_app_restart_in_same_process_accepts_rooms():
+    from fastapi.testclient import TestClient
+
+    from app.auth import create_access_token
+    from app.database import session_scope
+    from app.game_rooms.drain import server_drain
+    from app.main import app
+    from app.models import User
+
+    with session_scope() as db:
+        db.add(User(username="restart_owner", email="restart_owner@example.com", hashed_password="x"))
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'restart_owner@example.com'})}"}
+
+    with TestClient(app):
+        pass
+    # Lifespan завершився drain-ом, але наступний старт не повинен відмовляти в кімнатах
+    assert not server_drain.draining
+    with TestClient(app) as client:
+        created = client.post(
+            "/api/rooms", json={"name": "after-restart", "min_players_number": 4, "max_players_number": 6}, headers=headers,
+        )
+    assert created.status_code == 200
+
+
+def test_commands_queued_before_release_reach_the_checkpoint(tmp_path, make_room):
+    clock = [0.0]
+    room = make_room(1, phase="day", round=3)
+    rooms = {1: room}
+    drain, checkpoints = make_drain(tmp_path, rooms, clock=lambda: clock[0])
+    # Зайнята кімната не встигла б за тайм-аут звичайного checkpoint
+    checkpoints.snapshot_timeout = 0.01
+    busy = asyncio.Event()
+
+    async def hold():
+        await busy.wait()
+
+    async def next_round():
+        # Команда гравця: діє, лише поки кімната ще не розпущена
+        if room.players:
+            room.round += 1
+            room.mark_dirty()
+
+    async def scenario():
+        task = asyncio.create_task(drain.drain(deadline=60))
+        # Drain уже попередив гравців і чекає на завершення гри
+        while not room.players[1].websocket.sent:
+            await asyncio.sleep(0.01)
+        blocker = asyncio.ensure_future(room.actor.call(hold))
+        early = asyncio.ensure_future(room.actor.call(next_round))
+        clock[0] = 61
+        await asyncio.sleep(0.05)
+        # Ця команда стає в чергу вже після того, як drain почав розпускати кімнату
+        late = asyncio.ensure_future(room.actor.call(next_round))
+        busy.set()
+        await asyncio.wait_for(asyncio.gather(task, blocker, early, late), 1)
+
+    asyncio.run(scenario())
+
+    assert room.round == 4
+    assert asyncio.run(checkpoints.restore()) == 1
+    assert rooms[1].round == room.round
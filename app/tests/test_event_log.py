@@ -0,0 +1,80 @@
+import asyncio
+import json
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.benchmarks.simulation import run_simulation
+from app.game_rooms.event_log import EventLog, event_log, router
+
+
+def play(tmp_path, monkeypatch, games=3):
+    monkeypatch.setattr(event_log, "_index", None)
+    asyncio.run(run_simulation(games, 6, "scripted", seed=3, event_log_dir=str(tmp_path)))
+    monkeypatch.setattr(event_log, "_index", None)
+    return [asyncio.run(asyncio.to_thread(event_log.room_games, room_id)) for room_id in range(1, games + 1)]
+
+
+def test_games_are_logged_and_indexed(tmp_path, monkeypatch):
+    games = play(tmp_path, monkeypatch)
+
+    assert [len(room_games) for room_games in games] == [1, 1, 1]
+    for (entry,) in games:
+        events = event_log.events(entry["game_id"])
+        assert events[0]["type"] == "game_started"
+        assert len(events[0]["players"]) == 6
+        assert all(p["role"] for p in events[0]["players"])
+        assert events[-1] == {**events[-1], "type": "game_over", "winner": entry["winner"]}
+        types = {event["type"] for event in events}
+        assert {"night_action", "vote", "player_killed", "phase_change"} <= types
+        assert [event["t"] for event in events] == sorted(event["t"] for event in events)
+
+
+def test_replay_streams_finished_game(tmp_path, monkeypatch):
+    (entry,), *_ = play(tmp_path, monkeypatch, games=1)
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+
+    response = client.get(f"/api/games/{entry['game_id']}/replay", params={"speed": 0})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == event_log.events(entry["game_id"])
+
+    assert client.get(f"/api/rooms/{entry['room_id']}/games").json() == [entry]
+    assert client.get(f"/api/games/{'0' * 32}/replay").status_code == 404
+    assert client.get("/api/games/..%2Findex/replay").status_code in (404, 422)
+
+
+def test_no_events_without_running_log():
+    assert not event_log.enabled
+    report = asyncio.run(run_simulation(2, 6, "scripted", seed=3))
+    assert report["unfinished"] == 0
+    assert event_log._pending == {}
+
+
+def test_index_cache_keeps_games_written_while_it_loads(tmp_path):
+    log = EventLog(directory=str(tmp_path))
+
+    def finish_games():
+        for i in range(300):
+            log._write({}, [{"game_id": f"{i:032x}", "room_id": 1, "started_at": i}])
+
+    def look_up():
+        # Кеш скидається й будується знову, поки інший потік дописує index.jsonl
+        for _ in range(300):
+            with log._index_lock:
+                log._index = None
+            log.room_games(1)
+
+    threads = [threading.Thread(target=finish_games), threading.Thread(target=look_up)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cached = log.room_games(1)
+    log._index = None
+    assert len(cached) == len(log.room_games(1)) == 300
@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.main import app
+from app.models import User
+
+
+def make_users(*names):
+    db = SessionLocal()
+    try:
+        users = [User(username=name, email=f"{name}@example.com", hashed_password="x") for name in names]
+        db.add_all(users)
+        db.commit()
+        return [(user.id, {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}) for user in users]
+    finally:
+        db.close()
+
+
+def test_friends_are_listed_with_usernames_both_ways():
+    (ann_id, ann), (bob_id, bob), (cid_id, cid) = make_users("fr_ann", "fr_bob", "fr_cid")
+    client = TestClient(app)
+
+    assert client.post("/api/friends", json={"friend_id": bob_id}, headers=ann).status_code == 200
+    assert client.post("/api/friends", json={"friend_id": cid_id}, headers=ann).status_code == 200
+    assert client.post("/api/friends", json={"friend_id": bob_id}, headers=cid).status_code == 200
+
+    assert client.post("/api/friends", json={"friend_id": bob_id}, headers=ann).status_code == 400
+    assert client.post("/api/friends", json={"friend_id": 10 ** 9}, headers=ann).status_code == 404
+
+    assert client.get("/api/friends", headers=ann).json() == [
+        {"id": bob_id, "username": "fr_bob"}, {"id": cid_id, "username": "fr_cid"},
+    ]
+    assert client.get("/api/friends/followers", headers=bob).json() == [
+        {"id": ann_id, "username": "fr_ann"}, {"id": cid_id, "username": "fr_cid"},
+    ]
+    assert sorted(client.get("/api/profile", headers=ann).json()["friends"]) == sorted([bob_id, cid_id])
+    assert client.get(f"/api/users/{cid_id}").json()["friends"] == [bob_id]
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from app.game_rooms.game_models import Player
+from app.game_rooms.game_rooms import handle_pong, leave_room
+from app.game_rooms.heartbeat import HeartbeatScheduler
+from app.schemas import PongPayload
+
+
+# Кімната з гравцями, від яких щойно щось було; повертає також словник кімнат для планувальника
+def make_rooms(make_room, clock, sockets, room_id=1):
+    room = make_room(room_id, sockets=sockets)
+    for player in room.players.values():
+        player.last_seen = clock()
+    return {room.id: room}, room
+
+
+def test_idle_players_are_pinged_and_silent_ones_evicted(make_room, fake_socket, fake_clock):
+    clock = fake_clock
+    rooms, room = make_rooms(make_room, clock, [fake_socket() for _ in range(3)])
+    scheduler = HeartbeatScheduler(rooms, idle=20, timeout=60, clock=clock)
+
+    clock.now += 30
+    room.players[1].last_seen = clock.now
+    room.players[3].last_seen = clock.now - 61
+    third = room.players[3]
+
+    assert asyncio.run(scheduler.tick()) == (1, 1)
+    assert [m["type"] for m in room.players[1].websocket.sent] == ["player_left"]
+    assert room.players[2].websocket.sent[0] == {"type": "ping", "ts": clock.now * 1000}
+    assert 3 not in room.players
+    assert third.websocket.closed == 1001
+    assert room.players[2].websocket.sent[-1]["type"] == "player_left"
+
+
+def test_hung_sockets_do_not_stall_the_tick(make_room, fake_socket, fake_clock):
+    clock = fake_clock
+    # Дві кімнати по одному гравцю: пінг зависає в першій, закриття — в другій
+    rooms, idle_room = make_rooms(make_room, clock, [fake_socket(hang=True)])
+    _, dead_room = make_rooms(make_room, clock, [fake_socket(hang=True)], room_id=2)
+    rooms[2] = dead_room
+    scheduler = HeartbeatScheduler(rooms, idle=20, timeout=60, send_timeout=0.05, clock=clock)
+    idle_room.players[1].last_seen -= 30
+    dead_room.players[1].last_seen -= 90
+
+    assert asyncio.run(asyncio.wait_for(scheduler.tick(), 1)) == (1, 1)
+    assert list(idle_room.players) == [1]
+    assert dead_room.players == {}
+
+
+def test_hung_survivor_does_not_stall_the_eviction(make_room, fake_socket, fake_clock):
+    clock = fake_clock
+    # Гравця 1 виселяють, а player_left зависає на сокеті гравця 2 в тій самій кімнаті
+    dead = fake_socket()
+    rooms, room = make_rooms(make_room, clock, [dead, fake_socket(hang=True)])
+    scheduler = HeartbeatScheduler(rooms, idle=20, timeout=60, send_timeout=0.05, clock=clock)
+    room.players[1].last_seen -= 90
+
+    assert asyncio.run(asyncio.wait_for(scheduler.tick(), 1)) == (0, 1)
+    assert list(room.players) == [2]
+    assert dead.closed == 1001
+
+
+def test_pong_records_rtt(fake_socket):
+    player = Player(id=1, name="p1", websocket=fake_socket())
+    sent_at = (time.monotonic() - 0.05) * 1000
+    asyncio.run(handle_pong(payload=PongPayload(ts=sent_at), player=player))
+    assert 0.05 <= player.rtt < 1
+
+
+def test_stale_disconnect_does_not_remove_reconnected_player(make_room, fake_socket):
+    room = make_room(players=2)
+    old = room.players[2]
+    room.add_player(Player(id=2, name="p2", websocket=fake_socket()))
+
+    asyncio.run(leave_room(room, old, old.websocket))
+    assert room.players[2] is not old
+
+
+def test_scheduler_runs_as_single_task():
+    async def scenario():
+        scheduler = HeartbeatScheduler({}, interval=0.01)
+        first = scheduler.start()
+        assert scheduler.start() is first
+        await asyncio.sleep(0.03)
+        assert scheduler.is_running
+        await scheduler.stop()
+        assert not scheduler.is_running
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+import json
+import logging
+
+from app.logger import (
+    JsonFormatter,
+    SamplingFilter,
+    disable_room_debug,
+    enable_room_debug,
+    room_logger,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_logger(name):
+    logger = logging.getLogger(name)
+    logger.handlers = []
+    handler = ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger, handler
+
+
+def test_room_logger_adds_room_id_and_skips_debug():
+    logger, handler = make_logger("test.room.info")
+    log = room_logger(logger, 41)
+
+    log.debug("hidden %s", 1)
+    log.info("visible %s", 2)
+
+    assert [r.getMessage() for r in handler.records] == ["visible 2"]
+    assert handler.records[0].room_id == 41
+
+
+def test_debug_can_be_enabled_per_room():
+    logger, handler = make_logger("test.room.debug")
+    noisy, quiet = room_logger(logger, 42), room_logger(logger, 43)
+
+    enable_room_debug(42)
+    try:
+        noisy.debug("from 42")
+        quiet.debug("from 43")
+    finally:
+        disable_room_debug(42)
+    noisy.debug("after disable")
+
+    assert [r.getMessage() for r in handler.records] == ["from 42"]
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, "player %s joined", (7,), None)
+    record.room_id = 5
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["msg"] == "player 7 joined"
+    assert entry["level"] == "INFO"
+    assert entry["room_id"] == 5
+
+
+def test_sampling_filter_only_drops_debug():
+    drop_all = SamplingFilter(0.0)
+    debug = logging.LogRecord("app", logging.DEBUG, __file__, 1, "d", (), None)
+    info = logging.LogRecord("app", logging.INFO, __file__, 1, "i", (), None)
+
+    assert not drop_all.filter(debug)
+    assert drop_all.filter(info)
+    assert SamplingFilter(1.0).filter(debug)
+
+
+def test_sampling_keeps_debug_of_watched_rooms():
+    drop_all = SamplingFilter(0.0)
+    watched = logging.LogRecord("app", logging.DEBUG, __file__, 1, "d", (), None)
+    watched.room_id = 77
+    other = logging.LogRecord("app", logging.DEBUG, __file__, 1, "d", (), None)
+    other.room_id = 78
+
+    enable_room_debug(77)
+    try:
+        assert drop_all.filter(watched)
+        assert not drop_all.filter(other)
+    finally:
+        disable_room_debug(77)
+    assert not drop_all.filter(watched)
+
+
+def test_log_thread_runs_only_while_the_app_is_up():
+    from fastapi.testclient import TestClient
+
+    from app import logger as app_logger
+    from app.main import create_app
+
+    app = create_app()
+    assert not app_logger._listening
+    with TestClient(app):
+        assert app_logger._listening
+    assert not app_logger._listening
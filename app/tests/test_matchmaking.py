@@ -0,0 +1,171 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.database import session_scope
+from app.game_rooms.game_models import GameRoom, Player
+from app.game_rooms.matchmaking import Matchmaker
+from app.main import app
+from app.metrics import MATCHMAKING_WAIT_SECONDS
+from app.models import User
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# Замість потоку запису: задача виконується одразу в короткій сесії
+class InlineWriter:
+    def __init__(self):
+        self.calls = 0
+
+    async def run(self, func, *args):
+        self.calls += 1
+        await asyncio.sleep(0)
+        with session_scope(expire_on_commit=False) as db:
+            return func(db, *args)
+
+
+def seat(room, *player_ids):
+    for player_id in player_ids:
+        room.add_player(Player(id=player_id, name=f"p{player_id}", websocket=None))
+
+
+def make_rooms(rooms, *specs):
+    for room_id, max_players, seated in specs:
+        room = GameRoom(id=room_id, name=f"r{room_id}", owner_id=None, min_players=6, max_players=max_players)
+        seat(room, *range(room_id * 100, room_id * 100 + seated))
+        rooms[room_id] = room
+    return [rooms[room_id] for room_id, _, _ in specs]
+
+
+def test_fullest_room_is_picked_first():
+    rooms = {}
+    matchmaker = Matchmaker(rooms=rooms)
+    for room in make_rooms(rooms, (1, 10, 2), (2, 10, 5), (3, 6, 4), (4, 6, 6)):
+        matchmaker.update(room)
+
+    # Повна кімната 4 в індекс не потрапляє; кімнаті 2 бракує одного гравця до старту
+    assert len(matchmaker) == 3
+    assert matchmaker.find(user_id=1).id == 2
+    # Зарезервоване місце враховано: тепер кімнаті 2 нікого не бракує, але вона все ще найкраща
+    assert matchmaker.find(user_id=2).id == 2
+    # Бажаний розмір обмежує вибір
+    assert matchmaker.find(user_id=3, size=6).id == 3
+
+
+def test_reservations_fill_a_room_and_expire():
+    rooms, clock = {}, Clock()
+    matchmaker = Matchmaker(rooms=rooms, reserve_timeout=10, clock=clock)
+    room, = make_rooms(rooms, (1, 6, 4))
+    matchmaker.update(room)
+
+    assert matchmaker.find(user_id=1) is room
+    assert matchmaker.find(user_id=2) is room
+    # Два резерви заповнили кімнату: третьому місця немає
+    assert matchmaker.find(user_id=3) is None
+
+    # Один гравець сів, другий так і не прийшов — після тайм-ауту його місце знову вільне
+    seat(room, 1)
+    matchmaker.seated(room, 1)
+    clock.now += 11
+    matchmaker.update(room)
+    assert matchmaker.find(user_id=3) is room
+
+
+def test_rooms_leave_the_index_when_the_game_starts():
+    rooms, clock = {}, Clock()
+    matchmaker = Matchmaker(rooms=rooms, clock=clock)
+    waiting, playing = make_rooms(rooms, (1, 6, 5), (2, 6, 3))
+    matchmaker.update(waiting)
+    matchmaker.update(playing)
+    matchmaker._waiting_since[200] = clock.now - 42
+
+    playing.phase = "night"
+    waits = MATCHMAKING_WAIT_SECONDS.labels()
+    before = waits.count
+    matchmaker.game_started(playing)
+
+    assert 200 not in matchmaker._waiting_since
+    assert matchmaker.find(user_id=1) is waiting
+    del rooms[waiting.id]
+    assert matchmaker.find(user_id=2) is None
+    assert len(matchmaker) == 0
+    # Час до старту записаний лише для гравця, що прийшов через швидку гру
+    assert waits.count == before + 1
+
+
+def test_stale_heap_entries_are_compacted():
+    rooms = {}
+    matchmaker = Matchmaker(rooms=rooms)
+    room, = make_rooms(rooms, (1, 12, 0))
+    for player_id in range(11):
+        seat(room, player_id)
+        matchmaker.update(room)
+        room.remove_player(player_id)
+        matchmaker.update(room)
+    for _ in range(100):
+        seat(room, 99)
+        matchmaker.update(room)
+        room.remove_player(99)
+        matchmaker.update(room)
+
+    assert matchmaker._entries <= 2 * len(matchmaker) + 64
+    assert matchmaker.find(user_id=1) is room
+
+
+def test_concurrent_requests_share_one_new_room():
+    rooms, writer = {}, InlineWriter()
+    matchmaker = Matchmaker(rooms=rooms, writer=writer)
+
+    async def scenario():
+        return await asyncio.gather(*(matchmaker.quick_join(user_id, size=8) for user_id in range(1, 5)))
+
+    placed = asyncio.run(scenario())
+
+    assert writer.calls == 1
+    assert {room.id for room, _ in placed} == set(rooms)
+    assert [created for _, created in placed].count(True) == 1
+    room = placed[0][0]
+    assert room.max_players == 8 and room.name == f"Quick play #{room.id}"
+    assert len(matchmaker._reserved[room.id]) == 4
+
+
+def make_user(name):
+    with session_scope(expire_on_commit=False) as db:
+        user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+        db.add(user)
+    return user.id, create_access_token({"sub": f"{name}@example.com"})
+
+
+def test_quick_join_over_rest_and_user_socket():
+    _, ann_token = make_user("mm_ann")
+    _, bob_token = make_user("mm_bob")
+    with TestClient(app) as client:
+        response = client.post("/api/matchmaking/quick_join?size=11", headers={"Authorization": f"Bearer {ann_token}"})
+        assert response.status_code == 200
+        placement = response.json()
+        assert placement["created"] and placement["max_players"] == 11
+
+        with client.websocket_connect(f"/api/ws/room/{placement['room_id']}?token={ann_token}"):
+            with client.websocket_connect(f"/api/ws/user?token={bob_token}") as bob:
+                bob.send_json({"type": "subscribe", "channel": "lobby"})
+                bob.send_json({"channel": "lobby", "type": "quick_join", "payload": {"size": 11}})
+                while True:
+                    message = bob.receive_json()
+                    if message["type"] == "matched":
+                        break
+                assert message == {
+                    "channel": "lobby", "type": "matched", "room_id": placement["room_id"], "created": False,
+                }
+                room = f"room:{placement['room_id']}"
+                while True:
+                    message = bob.receive_json()
+                    if message.get("channel") == room and message["type"] == "room_state":
+                        break
+                assert len(message["room"]["players"]) == 2
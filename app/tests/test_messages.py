@@ -0,0 +1,46 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.game_rooms.game_rooms import handle_chat, parse_message, vote
+from app.schemas import ChatPayload, EmptyPayload, TargetPayload
+
+
+def frame(message_type, payload=None):
+    return json.dumps({"type": message_type, "payload": payload or {}})
+
+
+def test_known_messages_are_parsed_into_models():
+    msg_type, handler, payload = parse_message(frame("vote", {"target_id": "4"}))
+    assert msg_type == "vote"
+    assert handler is vote
+    assert payload == TargetPayload(target_id=4)
+
+    _, handler, payload = parse_message(frame("chat", {"message": "привіт"}))
+    assert handler is handle_chat
+    assert isinstance(payload, ChatPayload)
+    assert payload.message == "привіт"
+
+    _, _, payload = parse_message(frame("toggle_ready"))
+    assert isinstance(payload, EmptyPayload)
+
+
+def test_unknown_type_has_no_handler():
+    msg_type, handler, _ = parse_message(frame("dance"))
+    assert msg_type == "dance"
+    assert handler is None
+
+
+@pytest.mark.parametrize("raw", [
+    "{not json",
+    json.dumps(["vote", 4]),
+    json.dumps({"payload": {}}),
+    json.dumps({"type": "vote", "payload": None}),
+    frame("vote", {"target_id": "abc"}),
+    frame("night_action"),
+    frame("chat", {"message": "x" * 1001}),
+])
+def test_malformed_frames_are_rejected(raw):
+    with pytest.raises(ValidationError):
+        parse_message(raw)
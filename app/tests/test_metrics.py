@@ -0,0 +1,65 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.game_rooms.game_models import GameRoom
+from app.game_rooms.game_rooms import dispatch, message_handlers
+from app.game_rooms.room_storage import active_rooms
+from app.metrics import HANDLER_SECONDS, Counter, Gauge, Histogram, router
+
+
+def test_histogram_renders_cumulative_buckets():
+    latency = Histogram("test_latency_seconds", "Test latency", buckets=(0.1, 1.0))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    text = latency.render()
+
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_latency_seconds_count 3" in text
+
+
+def test_labels_and_collectors():
+    results = Counter("test_results_total", "Test results", ["result"])
+    results.labels("ok").inc()
+    results.labels("ok").inc()
+    results.labels("fail").inc()
+    rooms = Gauge("test_rooms", "Test rooms", ["phase"])
+    rooms.set_collector(lambda: {"night": 2, "day": 1})
+
+    assert 'test_results_total{result="ok"} 2' in results.render()
+    assert 'test_rooms{phase="night"} 2' in rooms.render()
+
+
+def test_handler_dispatch_is_timed(make_room):
+    room = make_room(900, players=1)
+    player = room.players[1]
+    timing = HANDLER_SECONDS.labels("toggle_ready")
+    before = timing.count
+
+    asyncio.run(dispatch(
+        "toggle_ready", message_handlers["toggle_ready"],
+        websocket=player.websocket, payload={}, room_id=room.id, db=None, player=player, room=room
+    ))
+
+    assert timing.count == before + 1
+
+
+def test_metrics_endpoint_reports_rooms_by_phase():
+    app = FastAPI()
+    app.include_router(router)
+    room = GameRoom(id=901, name="metrics", owner_id=1)
+    room.phase = "day"
+    active_rooms[room.id] = room
+    try:
+        response = TestClient(app).get("/metrics")
+    finally:
+        del active_rooms[room.id]
+
+    assert response.status_code == 200
+    assert 'mafia_active_rooms{phase="day"} 1' in response.text
+    assert "# TYPE mafia_handler_seconds histogram" in response.text
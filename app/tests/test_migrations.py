@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base
+from app.migrations import current_version, discover, upgrade
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def fresh_engine():
+    path = os.path.join(tempfile.mkdtemp(prefix="mafia-migrations-"), "schema.db")
+    return create_engine(f"sqlite:///{path}")
+
+
+def test_migrations_build_the_model_schema():
+    db_engine = fresh_engine()
+    latest = discover()[-1][0]
+
+    assert upgrade(db_engine) == [version for version, _ in discover()]
+    assert current_version(db_engine) == latest
+    # Повторний запуск нічого не робить
+    assert upgrade(db_engine) == []
+
+    inspector = inspect(db_engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert columns == {column.name for column in table.columns}, table.name
+
+
+def test_database_created_by_create_all_is_stamped():
+    db_engine = fresh_engine()
+    Base.metadata.create_all(bind=db_engine)
+
+    upgrade(db_engine, target=1)
+
+    assert current_version(db_engine) == 1
+
+
+def test_importing_the_app_has_no_side_effects():
+    workdir = tempfile.mkdtemp(prefix="mafia-import-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/import.db")
+    subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.path.insert(0, {PACKAGE_ROOT!r}); import app.main"],
+        cwd=workdir, env=env, check=True,
+    )
+
+    # Ні файлу бази, ні каталогу static: усе створюється лише під час старту застосунку
+    assert os.listdir(workdir) == []
+
+
+def test_friend_lists_move_to_friendship_table():
+    db_engine = fresh_engine()
+    upgrade(db_engine, target=1)
+    with db_engine.begin() as conn:
+        for user_id, friends in ((1, "[2, 3, 2]"), (2, "[1, 99]"), (3, None)):
+            conn.execute(
+                text(
+                    'INSERT INTO "user" (id, username, email, hashed_password, friends) '
+                    "VALUES (:id, :name, :email, 'x', :friends)"
+                ),
+                {"id": user_id, "name": f"u{user_id}", "email": f"u{user_id}@example.com", "friends": friends},
+            )
+
+    upgrade(db_engine, target=2)
+
+    with db_engine.connect() as conn:
+        pairs = set(conn.execute(text("SELECT user_id, friend_id FROM friendship")).all())
+    # Повтори й неіснуючий користувач 99 відкинуті, стовпця JSON більше немає
+    assert pairs == {(1, 2), (1, 3), (2, 1)}
+    assert "friends" not in {column["name"] for column in inspect(db_engine).get_columns("user")}
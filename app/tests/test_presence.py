@@ -0,0 +1,146 @@
+import asyncio
+import random
+
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.game_rooms.presence import PresenceRegistry, presence
+from app.main import app
+from app.models import Friendship, Room, User
+
+
+class FakeSink:
+    def __init__(self, hang=False):
+        self.sent = []
+        self.hang = hang
+
+    async def send(self, message):
+        if self.hang:
+            await asyncio.sleep(3600)
+        self.sent.append(message)
+
+
+def test_friends_get_pushed_status_changes():
+    registry = PresenceRegistry()
+    ann, bob = FakeSink(), FakeSink()
+
+    async def scenario():
+        await registry.connect(1, [2, 3], ann)
+        await registry.connect(2, [1], bob, room_id=7)
+        await registry.disconnect(2, bob)
+        await registry.disconnect(1, ann)
+
+    asyncio.run(scenario())
+
+    assert ann.sent == [
+        {"type": "friends_presence", "friends": [
+            {"user_id": 2, "status": "offline", "room_id": None},
+            {"user_id": 3, "status": "offline", "room_id": None},
+        ]},
+        {"type": "presence", "user_id": 2, "status": "in_room", "room_id": 7},
+        {"type": "presence", "user_id": 2, "status": "offline", "room_id": None},
+    ]
+    assert bob.sent[0]["friends"] == [{"user_id": 1, "status": "online", "room_id": None}]
+    # Після відключення від користувачів не лишається ні з'єднань, ні підписок
+    assert len(registry) == 0 and registry.watch_count == 0
+    assert registry._watchers == {}
+
+
+def test_second_connection_keeps_user_online():
+    registry = PresenceRegistry()
+    watcher, first, second = FakeSink(), FakeSink(), FakeSink()
+
+    async def scenario():
+        await registry.connect(1, [2], watcher)
+        await registry.connect(2, [], first, room_id=5)
+        await registry.connect(2, [], second, room_id=5)
+        await registry.disconnect(2, first)
+
+    asyncio.run(scenario())
+
+    # Друге з'єднання в тій самій кімнаті та закриття першого стан не змінюють
+    assert [m["status"] for m in watcher.sent[1:]] == ["in_room"]
+    assert registry.status(2) == {"user_id": 2, "status": "in_room", "room_id": 5}
+
+
+def test_hung_friend_socket_does_not_block_updates():
+    registry = PresenceRegistry(send_timeout=0.05)
+    hung, fine, friend = FakeSink(hang=True), FakeSink(), FakeSink()
+
+    async def scenario():
+        await registry.connect(1, [3], hung)
+        await registry.connect(2, [3], fine)
+        await asyncio.wait_for(registry.connect(3, [], friend, room_id=9), 1)
+
+    asyncio.run(scenario())
+
+    assert fine.sent[-1] == {"type": "presence", "user_id": 3, "status": "in_room", "room_id": 9}
+    # Сокет, що не прийняв оновлення, прибраний разом з підписками
+    assert not registry.is_online(1)
+    assert registry.watch_count == 1
+
+
+def test_unsubscribe_keeps_follower_index_consistent():
+    registry = PresenceRegistry()
+    sinks = {user_id: FakeSink() for user_id in range(1, 41)}
+
+    async def scenario():
+        # Усі стежать за популярним користувачем 100 і за парою сусідів
+        for user_id, sink in sinks.items():
+            await registry.connect(user_id, [100, user_id % 40 + 1, (user_id + 1) % 40 + 1], sink)
+        for user_id in random.Random(3).sample(list(sinks), 30):
+            await registry.disconnect(user_id, sinks[user_id])
+
+    asyncio.run(scenario())
+
+    online = {user_id for user_id in sinks if registry.is_online(user_id)}
+    assert sorted(registry._watchers[100]) == sorted(online)
+    # Кожна збережена позиція вказує на свій запис у масиві підписників друга
+    for user_id in online:
+        for friend_id, slot in zip(registry._watching[user_id], registry._slots[user_id]):
+            assert registry._watchers[friend_id][slot] == user_id
+    assert registry.watch_count == sum(len(watchers) for watchers in registry._watchers.values())
+
+
+def make_friends():
+    db = SessionLocal()
+    try:
+        ann = User(username="pr_ann", email="pr_ann@example.com", hashed_password="x")
+        bob = User(username="pr_bob", email="pr_bob@example.com", hashed_password="x")
+        db.add_all([ann, bob])
+        db.flush()
+        room = Room(name="presence", owner=ann.id, min_players_number=4, max_players_number=6)
+        db.add(room)
+        db.add_all([Friendship(user_id=ann.id, friend_id=bob.id), Friendship(user_id=bob.id, friend_id=ann.id)])
+        db.commit()
+        return ann.id, ann.email, bob.id, bob.email, room.id
+    finally:
+        db.close()
+
+
+def receive_until(ws, message_type):
+    while True:
+        message = ws.receive_json()
+        if message["type"] == message_type:
+            return message
+
+
+def test_room_sockets_feed_presence():
+    ann_id, ann_email, bob_id, bob_email, room_id = make_friends()
+    ann_token = create_access_token({"sub": ann_email})
+    bob_token = create_access_token({"sub": bob_email})
+    with TestClient(app) as client, client.websocket_connect(f"/api/ws/room/{room_id}?token={ann_token}") as ann:
+        assert receive_until(ann, "friends_presence")["friends"] == [
+            {"user_id": bob_id, "status": "offline", "room_id": None},
+        ]
+        with client.websocket_connect(f"/api/ws/room/{room_id}?token={bob_token}") as bob:
+            receive_until(bob, "friends_presence")
+            assert receive_until(ann, "presence") == {
+                "type": "presence", "user_id": bob_id, "status": "in_room", "room_id": room_id,
+            }
+            online = client.get("/api/friends/online", headers={"Authorization": f"Bearer {ann_token}"}).json()
+            assert online == [{"user_id": bob_id, "status": "in_room", "room_id": room_id, "username": "pr_bob"}]
+        assert receive_until(ann, "presence")["status"] == "offline"
+
+    assert not presence.is_online(ann_id)
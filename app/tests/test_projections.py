@@ -0,0 +1,64 @@
+import asyncio
+
+from app.game_rooms.projections import ADMIN, MAFIA, PUBLIC
+from app.game_rooms.spectators import Spectator
+
+ROLES = {1: "mafia", 2: "mafia", 3: "doctor", 4: "civilian", 5: "civilian"}
+
+
+def make_game(make_room, codec=None):
+    return make_room(roles=list(ROLES.values()), phase="night", codec=codec, min_players=4, max_players=6)
+
+
+def roles(players):
+    return {player["id"]: player.get("role") for player in players}
+
+
+def test_each_viewer_sees_only_allowed_roles(make_room):
+    room = make_game(make_room)
+    projections = room.projections
+
+    assert roles(room.to_dict()["players"]) == dict.fromkeys(ROLES)
+    assert projections.view_for(room.players[2]) == MAFIA
+    assert roles(projections.players(MAFIA)) == {1: "mafia", 2: "mafia", 3: None, 4: None, 5: None}
+    # Мирний гравець бачить лише власну роль
+    doctor = projections.view_for(room.players[3])
+    assert roles(projections.players(doctor)) == {1: None, 2: None, 3: "doctor", 4: None, 5: None}
+    assert projections.spectator_view() == PUBLIC
+
+    # Після гри ролі відкриті всім
+    room.phase = "ended"
+    assert projections.view_for(room.players[4]) == ADMIN == projections.spectator_view()
+    assert roles(projections.players(ADMIN)) == ROLES
+
+
+def test_views_are_cached_until_the_room_changes(make_room):
+    room = make_game(make_room)
+    public = room.projections.players(PUBLIC)
+    assert room.projections.players(PUBLIC) is public
+    assert room.to_dict()["players"] is public
+
+    room.kill_player(4)
+    fresh = room.projections.players(PUBLIC)
+    assert fresh is not public
+    assert [player["is_alive"] for player in fresh] == [True, True, True, False, True]
+
+
+def test_broadcast_encodes_once_per_view(make_room, fake_socket, counting_codec):
+    codec = counting_codec
+    room = make_game(make_room, codec)
+    spectator = Spectator(id=10, name="fan", websocket=fake_socket())
+
+    async def scenario():
+        room.add_spectator(spectator)
+        await room.broadcast({"type": "game_started"}, with_players=True)
+        await room.fanout.join()
+
+    asyncio.run(scenario())
+
+    # Мафія (1 кадр на двох), лікар і два мирних — кожен зі своєю роллю
+    assert codec.encoded == 4
+    sent = {player_id: player.websocket.sent[0] for player_id, player in room.players.items()}
+    assert roles(sent[1]["players"]) == roles(sent[2]["players"])
+    assert roles(sent[5]["players"])[5] == "civilian" and roles(sent[5]["players"])[4] is None
+    assert all(role is None for role in roles(spectator.websocket.sent[0]["players"]).values())
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.game_rooms.game_rooms import throttle
+from app.game_rooms.rate_limit import ALL_FRAMES, ConnectionLimiter, TokenBucket
+
+
+def test_bucket_refills_up_to_burst(fake_clock):
+    clock = fake_clock
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.allow() for _ in range(4)] == [True, True, True, False]
+
+    clock.now = 0.5
+    assert bucket.allow()
+    assert not bucket.allow()
+
+    clock.now = 100
+    assert [bucket.allow() for _ in range(4)] == [True, True, True, False]
+
+
+def test_limits_are_per_message_type(fake_clock):
+    clock = fake_clock
+    limiter = ConnectionLimiter(limits={"chat": (1, 2), "vote": (1, 1)}, clock=clock)
+    assert [limiter.allow("chat") for _ in range(3)] == [True, True, False]
+    assert limiter.allow("vote")
+    assert not limiter.allow("vote")
+    # Типи без ліміту не обмежуються і не створюють відер
+    assert all(limiter.allow("toggle_ready") for _ in range(100))
+    assert set(limiter._buckets) == {"chat", "vote"}
+
+
+def test_frame_size_limit():
+    limiter = ConnectionLimiter(max_frame_bytes=10)
+    assert not limiter.frame_too_large(b"x" * 10)
+    assert limiter.frame_too_large("x" * 11)
+
+
+def test_violations_lead_to_disconnect(fake_clock):
+    clock = fake_clock
+    limiter = ConnectionLimiter(limits={}, max_violations=3, violation_window=30, clock=clock)
+    assert [limiter.violation() for _ in range(4)] == [False, False, False, True]
+
+    # Порушення "забуваються" з часом
+    clock.now = 10
+    assert not limiter.violation()
+
+
+def test_throttle_warns_then_closes(make_room, fake_clock):
+    room = make_room(players=1)
+    player = room.players[1]
+    limiter = ConnectionLimiter(limits={}, max_violations=2, violation_window=60, clock=fake_clock)
+
+    async def scenario():
+        await throttle(room, player, limiter, "chat")
+        await throttle(room, player, limiter, ALL_FRAMES)
+        with pytest.raises(WebSocketDisconnect):
+            await throttle(room, player, limiter, "chat")
+
+    asyncio.run(scenario())
+
+    assert [m["code"] for m in player.websocket.sent] == ["rate_limited", "rate_limited"]
+    assert player.websocket.closed == 1008
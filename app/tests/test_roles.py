@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.game_rooms.game_models import GameRoom, Player
+from app.game_rooms.roles import (
+    MAX_PLAYERS,
+    MIN_PLAYERS,
+    ROLE_PRESETS,
+    get_role_distribution,
+)
+
+SIZES = range(MIN_PLAYERS, MAX_PLAYERS + 1)
+
+
+@pytest.mark.parametrize("preset", sorted(ROLE_PRESETS))
+@pytest.mark.parametrize("size", SIZES)
+def test_distribution_is_balanced(preset, size):
+    roles = get_role_distribution(size, preset)
+    mafia = roles.count("mafia")
+
+    assert len(roles) == size
+    assert mafia >= 1
+    assert mafia < size - mafia
+
+
+def test_classic_six_players_matches_original_mix():
+    roles = get_role_distribution(6, "classic")
+    assert sorted(roles) == sorted(["mafia", "mafia", "doctor", "detective", "civilian", "civilian"])
+
+
+def test_distribution_is_cached():
+    assert get_role_distribution(9, "classic") is get_role_distribution(9, "classic")
+
+
+def test_invalid_sizes_and_presets_are_rejected():
+    with pytest.raises(ValueError):
+        get_role_distribution(MAX_PLAYERS + 1, "classic")
+    with pytest.raises(ValueError):
+        get_role_distribution(6, "unknown")
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_every_player_gets_a_role(size):
+    room = GameRoom(id=1, name="room", owner_id=1, min_players=MIN_PLAYERS, max_players=MAX_PLAYERS)
+    for i in range(1, size + 1):
+        player = Player(id=i, name=f"p{i}", websocket=None)
+        player.is_ready = True
+        room.add_player(player)
+
+    room.start_game()
+
+    assert all(p.role is not None for p in room.players.values())
+    assert room.check_victory() is None
+
+
+def test_failed_start_leaves_the_room_waiting():
+    room = GameRoom(id=1, name="room", owner_id=1, min_players=MIN_PLAYERS, max_players=MAX_PLAYERS, role_preset="bad")
+    for i in range(1, MIN_PLAYERS + 1):
+        player = Player(id=i, name=f"p{i}", websocket=None)
+        player.is_ready = True
+        room.add_player(player)
+
+    with pytest.raises(ValueError):
+        room.start_game()
+
+    assert (room.phase, room.round) == ("waiting", 0)
+    assert all(p.role is None and p.is_ready for p in room.players.values())
+
+
+def test_unknown_preset_in_config_stops_startup():
+    env = {**os.environ, "ROLE_PRESET": "unknown"}
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run([sys.executable, "-c", "import app.main"], cwd=root, env=env, capture_output=True, text=True)
+    assert result.returncode != 0 and "Unknown ROLE_PRESET" in result.stderr
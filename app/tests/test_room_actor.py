@@ -0,0 +1,125 @@
+import asyncio
+
+from app.game_rooms.game_rooms import night_action, vote
+from app.schemas import TargetPayload
+
+ROLES = ["mafia", "mafia", "doctor", "detective", "civilian", "civilian"]
+
+
+def make_game(make_room, room_id=1, phase="night"):
+    return make_room(room_id, roles=ROLES, phase=phase, round=1, min_players=6, max_players=6)
+
+
+def sent_types(room, player_id, message_type):
+    return [m for m in room.players[player_id].websocket.sent if m.get("type") == message_type]
+
+
+async def fire(room, handler, player_id, target_id):
+    player = room.players[player_id]
+    await room.actor.call(
+        handler,
+        websocket=player.websocket,
+        payload=TargetPayload(target_id=target_id),
+        room_id=room.id,
+        db=None,
+        player=player,
+        room=room,
+    )
+
+
+def night_burst(room):
+    # Мафія стріляє в 5, лікар рятує 6, комісар перевіряє 1; мафія 1 дублює свою дію
+    return [
+        fire(room, night_action, 1, 5),
+        fire(room, night_action, 2, 5),
+        fire(room, night_action, 3, 6),
+        fire(room, night_action, 4, 1),
+        fire(room, night_action, 1, 5),
+        fire(room, night_action, 2, 5),
+    ]
+
+
+def test_concurrent_night_actions_resolve_once(make_room):
+    room = make_game(make_room)
+
+    async def scenario():
+        await asyncio.gather(*night_burst(room))
+
+    asyncio.run(scenario())
+
+    assert room.phase == "day"
+    assert not room.players[5].is_alive
+    assert len(sent_types(room, 6, "player_killed")) == 1
+    day_changes = [m for m in sent_types(room, 6, "phase_change") if m["phase"] == "day"]
+    assert len(day_changes) == 1
+
+
+def test_concurrent_votes_advance_one_round(make_room):
+    room = make_game(make_room, phase="day")
+
+    async def scenario():
+        await asyncio.gather(*[
+            fire(room, vote, player_id, 1)
+            for player_id in list(room.players) * 3
+        ])
+
+    asyncio.run(scenario())
+
+    assert not room.players[1].is_alive
+    assert room.round == 2
+    assert room.phase == "night"
+    assert len(sent_types(room, 2, "player_killed_vote")) == 1
+
+
+def test_many_rooms_progress_in_parallel(make_room):
+    rooms = [make_game(make_room, room_id=i) for i in range(1, 201)]
+
+    async def scenario():
+        await asyncio.gather(*[call for room in rooms for call in night_burst(room)])
+
+    asyncio.run(scenario())
+
+    for room in rooms:
+        assert room.phase == "day"
+        assert not room.actor.is_running
+        day_changes = [m for m in sent_types(room, 6, "phase_change") if m["phase"] == "day"]
+        assert len(day_changes) == 1
+
+
+def test_actor_propagates_handler_errors(make_room):
+    room = make_game(make_room)
+
+    async def broken(**kwargs):
+        raise ValueError("boom")
+
+    async def scenario():
+        try:
+            await room.actor.call(broken)
+        except ValueError as e:
+            return str(e)
+
+    assert asyncio.run(scenario()) == "boom"
+
+
+def test_cancelled_actor_releases_every_caller(make_room):
+    room = make_game(make_room)
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(3600)
+
+    async def fast():
+        return "never"
+
+    async def scenario():
+        calls = [asyncio.ensure_future(room.actor.call(slow)), asyncio.ensure_future(room.actor.call(fast))]
+        await started.wait()
+        room.actor._task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+        return results, room.actor.inbox.empty()
+
+    results, drained = asyncio.run(scenario())
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert drained and not room.actor.is_running
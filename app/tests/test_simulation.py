@@ -0,0 +1,17 @@
+import asyncio
+
+import pytest
+
+from app.benchmarks.simulation import run_simulation
+
+
+@pytest.mark.parametrize("policy", ["random", "scripted"])
+@pytest.mark.parametrize("players", [4, 6, 12])
+def test_simulated_games_finish(policy, players):
+    report = asyncio.run(run_simulation(20, players, policy, seed=7, concurrency=5))
+
+    assert report["unfinished"] == 0
+    assert sum(report["winners"].values()) == 20
+    assert set(report["winners"]) <= {"mafia", "civilians"}
+    assert report["phases"]["setup"]["count"] == 20
+    assert report["games_per_sec"] > 0
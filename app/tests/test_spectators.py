@@ -0,0 +1,145 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.database import session_scope
+from app.game_rooms import game_rooms
+from app.game_rooms.room_storage import active_rooms
+from app.game_rooms.spectators import Spectator
+from app.main import app
+from app.models import Room, User
+
+
+def make_full_room(make_room):
+    return make_room(players=2, min_players=2, max_players=2)
+
+
+def test_spectators_do_not_take_seats_or_see_roles(make_room, fake_socket):
+    room = make_full_room(make_room)
+    room.players[1].role = room.players[2].role = "mafia"
+    spectator = Spectator(id=10, name="fan", websocket=fake_socket())
+
+    async def scenario():
+        assert room.add_spectator(spectator)
+        await room.broadcast({"type": "player_joined"}, with_players=True)
+        await room.fanout.join()
+
+    asyncio.run(scenario())
+
+    # Кімната повна для гравців, але глядач поза players і бачить список без ролей
+    assert len(room.players) == room.max_players and 10 not in room.players
+    assert room.players[2].websocket.sent[0]["players"][0]["role"] == "mafia"
+    assert [set(p) for p in spectator.websocket.sent[0]["players"]] == [
+        set(p) - {"role"} for p in room.players[2].websocket.sent[0]["players"]
+    ]
+
+
+def test_slow_spectators_do_not_delay_players(make_room, fake_socket):
+    room = make_full_room(make_room)
+    room.fanout.send_timeout = 0.05
+    slow = [Spectator(id=100 + i, name="slow", websocket=fake_socket(delay=3600)) for i in range(50)]
+    fine = Spectator(id=99, name="fine", websocket=fake_socket())
+    for spectator in [fine, *slow]:
+        room.add_spectator(spectator)
+
+    async def scenario():
+        await asyncio.wait_for(room.broadcast({"type": "chat", "message": "hi"}), 0.01)
+        # Гравці вже отримали повідомлення, глядачам воно ще тільки йде
+        assert room.players[1].websocket.sent == [{"type": "chat", "message": "hi"}]
+        await room.fanout.join()
+
+    asyncio.run(scenario())
+
+    assert fine.websocket.sent == [{"type": "chat", "message": "hi"}]
+    # Глядачі, що не прийняли кадр вчасно, відключені
+    assert room.spectators == {fine}
+    assert all(spectator.websocket.closed == 1001 for spectator in slow)
+
+
+def test_spectator_frames_are_encoded_once_per_format(make_room, fake_socket, counting_codec):
+    room = make_full_room(make_room)
+    codec = counting_codec
+    for i in range(500):
+        room.add_spectator(Spectator(id=100 + i, name="fan", websocket=fake_socket(), codec=codec))
+
+    async def scenario():
+        await room.broadcast({"type": "phase_change", "phase": "day"})
+        await room.fanout.join()
+
+    asyncio.run(scenario())
+
+    assert codec.encoded == 1
+    assert all(s.websocket.sent == [{"type": "phase_change", "phase": "day"}] for s in room.spectators)
+
+
+def test_spectator_limit_and_backlog(make_room, fake_socket):
+    room = make_full_room(make_room)
+    room.max_spectators = 1
+    room.fanout.backlog = 2
+    spectator = Spectator(id=10, name="fan", websocket=fake_socket())
+    assert room.add_spectator(spectator)
+    assert not room.add_spectator(Spectator(id=11, name="late", websocket=fake_socket()))
+
+    async def scenario():
+        # Задача розсилки стартує лише після повернення в цикл подій: з трьох подій у черзі лишаються дві
+        for round_number in (1, 2, 3):
+            room.fanout.publish({"type": "phase_change", "round": round_number})
+        await room.fanout.join()
+
+    asyncio.run(scenario())
+
+    assert [message["round"] for message in spectator.websocket.sent] == [2, 3]
+
+
+def test_stalled_spectator_does_not_hold_the_room(monkeypatch, make_room, fake_socket):
+    monkeypatch.setattr(game_rooms, "HEARTBEAT_SEND_TIMEOUT", 0.05)
+    room = make_full_room(make_room)
+    stalled = Spectator(id=10, name="slow", websocket=fake_socket(delay=3600))
+
+    async def scenario():
+        return await asyncio.wait_for(room.actor.call(game_rooms.watch_room, room, stalled), 1)
+
+    assert asyncio.run(scenario()) is False
+    assert room.spectators == set()
+
+
+def make_watchers():
+    with session_scope(expire_on_commit=False) as db:
+        owner = User(username="sp_owner", email="sp_owner@example.com", hashed_password="x")
+        fan = User(username="sp_fan", email="sp_fan@example.com", hashed_password="x")
+        db.add_all([owner, fan])
+        db.flush()
+        room = Room(name="spectated", owner=owner.id, min_players_number=4, max_players_number=6)
+        db.add(room)
+    return (
+        create_access_token({"sub": "sp_owner@example.com"}), create_access_token({"sub": "sp_fan@example.com"}), room.id
+    )
+
+
+def test_watch_endpoint_and_channel():
+    owner_token, fan_token, room_id = make_watchers()
+    with TestClient(app) as client:
+        with client.websocket_connect(f"/api/ws/room/{room_id}?token={owner_token}") as owner:
+            owner.receive_json()
+            with client.websocket_connect(f"/api/ws/room/{room_id}/watch?token={fan_token}") as fan:
+                state = fan.receive_json()
+                assert state["type"] == "room_state" and state["spectating"]
+                assert "role" not in state["room"]["players"][0]
+
+                with client.websocket_connect(f"/api/ws/user?token={fan_token}") as mux:
+                    mux.send_json({"type": "subscribe", "channel": f"watch:{room_id}"})
+                    assert mux.receive_json()["type"] == "room_state"
+                    assert mux.receive_json() == {"channel": f"watch:{room_id}", "type": "subscribed"}
+
+                    owner.send_json({"type": "chat", "payload": {"message": "hello"}})
+                    expected = {"type": "chat", "username": "sp_owner", "message": "hello"}
+                    assert fan.receive_json() == expected
+                    assert mux.receive_json() == {"channel": f"watch:{room_id}", **expected}
+
+                    # Глядач на спільному сокеті нічого не може надіслати в кімнату
+                    mux.send_json({"channel": f"watch:{room_id}", "type": "chat", "payload": {"message": "x"}})
+                    assert mux.receive_json()["type"] == "error"
+
+    # Без гравців кімната зникла, глядачі кімнати закриті
+    assert room_id not in active_rooms
@@ -0,0 +1,154 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.database import SessionLocal
+from app.game_rooms import user_socket
+from app.game_rooms.notifications import NotificationHub
+from app.game_rooms.rate_limit import ConnectionLimiter
+from app.game_rooms.room_storage import active_rooms
+from app.main import app
+from app.models import Friendship, Room, User
+
+
+def make_users(prefix, friends=True):
+    db = SessionLocal()
+    try:
+        ann = User(username=f"{prefix}_ann", email=f"{prefix}_ann@example.com", hashed_password="x")
+        bob = User(username=f"{prefix}_bob", email=f"{prefix}_bob@example.com", hashed_password="x")
+        db.add_all([ann, bob])
+        db.flush()
+        room = Room(name=prefix, owner=ann.id, min_players_number=4, max_players_number=6)
+        db.add(room)
+        if friends:
+            db.add_all([Friendship(user_id=ann.id, friend_id=bob.id), Friendship(user_id=bob.id, friend_id=ann.id)])
+        db.commit()
+        return (
+            (ann.id, create_access_token({"sub": ann.email})),
+            (bob.id, create_access_token({"sub": bob.email})),
+            room.id,
+        )
+    finally:
+        db.close()
+
+
+def receive_until(ws, channel, message_type):
+    while True:
+        message = ws.receive_json()
+        if message.get("channel") == channel and message["type"] == message_type:
+            return message
+
+
+def subscribe(ws, channel):
+    ws.send_json({"type": "subscribe", "channel": channel})
+    return receive_until(ws, channel, "subscribed")
+
+
+def test_room_and_presence_share_one_socket():
+    (ann_id, ann_token), (bob_id, bob_token), room_id = make_users("mux")
+    room = f"room:{room_id}"
+    with TestClient(app) as client, client.websocket_connect(f"/api/ws/user?token={ann_token}") as ann:
+        assert subscribe(ann, "presence") is not None
+        subscribe(ann, room)
+        with client.websocket_connect(f"/api/ws/user?token={bob_token}") as bob:
+            subscribe(bob, room)
+            # Одне з'єднання Ann отримує і події кімнати, і присутність друга, кожне зі своїм каналом
+            assert receive_until(ann, room, "player_joined")["username"] == "mux_bob"
+            assert receive_until(ann, "presence", "presence") == {
+                "channel": "presence", "type": "presence", "user_id": bob_id, "status": "in_room", "room_id": room_id,
+            }
+
+            bob.send_json({"channel": room, "type": "chat", "payload": {"message": "hi"}})
+            assert receive_until(ann, room, "chat") == {
+                "channel": room, "type": "chat", "username": "mux_bob", "message": "hi",
+            }
+
+            # Вихід з кімнати не закриває сокет: Bob лишається онлайн, але вже не в кімнаті
+            bob.send_json({"type": "unsubscribe", "channel": room})
+            assert receive_until(bob, room, "unsubscribed")["code"] == 1000
+            assert receive_until(ann, room, "player_left")["username"] == "mux_bob"
+            assert receive_until(ann, "presence", "presence")["status"] == "online"
+        assert receive_until(ann, "presence", "presence")["status"] == "offline"
+
+    assert room_id not in active_rooms
+
+
+def test_messages_need_a_subscription():
+    (_, ann_token), _, room_id = make_users("mux_unsub", friends=False)
+    with TestClient(app) as client, client.websocket_connect(f"/api/ws/user?token={ann_token}") as ann:
+        ann.send_json({"channel": f"room:{room_id}", "type": "chat", "payload": {"message": "hi"}})
+        assert ann.receive_json()["type"] == "error"
+
+        ann.send_json({"type": "subscribe", "channel": "nowhere"})
+        assert ann.receive_json() == {"channel": "nowhere", "type": "error", "message": "Невідомий канал: nowhere"}
+
+        ann.send_json({"type": "subscribe", "channel": "room:999999"})
+        assert receive_until(ann, "room:999999", "unsubscribed")["code"] == 4000
+
+
+def test_flooding_a_room_closes_only_that_channel(monkeypatch):
+    (_, ann_token), _, room_id = make_users("mux_flood", friends=False)
+    room = f"room:{room_id}"
+    monkeypatch.setattr(
+        user_socket, "ConnectionLimiter",
+        lambda: ConnectionLimiter(limits={"chat": (0.01, 1)}, max_violations=2, violation_window=30),
+    )
+    with TestClient(app) as client, client.websocket_connect(f"/api/ws/user?token={ann_token}") as ann:
+        subscribe(ann, "lobby")
+        subscribe(ann, room)
+        for _ in range(4):
+            ann.send_json({"channel": room, "type": "chat", "payload": {"message": "spam"}})
+        assert receive_until(ann, room, "unsubscribed")["code"] == 1008
+
+        # Лобі на тому самому сокеті працює далі
+        ann.send_json({"channel": "lobby", "type": "list"})
+        assert receive_until(ann, "lobby", "rooms")["type"] == "rooms"
+
+    assert room_id not in active_rooms
+
+
+def test_lobby_lists_joinable_rooms():
+    (_, ann_token), (_, bob_token), room_id = make_users("mux_lobby", friends=False)
+    with TestClient(app) as client, client.websocket_connect(f"/api/ws/user?token={ann_token}") as ann:
+        subscribe(ann, f"room:{room_id}")
+        with client.websocket_connect(f"/api/ws/user?token={bob_token}") as bob:
+            bob.send_json({"type": "subscribe", "channel": "lobby"})
+            rooms = receive_until(bob, "lobby", "rooms")["rooms"]
+            assert {"id": room_id, "name": "mux_lobby", "players": 1, "min_players": 4, "max_players": 6} in rooms
+
+
+def test_new_friend_is_notified():
+    (ann_id, ann_token), (bob_id, bob_token), _ = make_users("mux_notify", friends=False)
+    with TestClient(app) as client, client.websocket_connect(f"/api/ws/user?token={bob_token}") as bob:
+        subscribe(bob, "notifications")
+        response = client.post(
+            "/api/friends", json={"friend_id": bob_id}, headers={"Authorization": f"Bearer {ann_token}"}
+        )
+        assert response.status_code == 200
+        assert receive_until(bob, "notifications", "friend_added") == {
+            "channel": "notifications", "type": "friend_added", "user_id": ann_id, "username": "mux_notify_ann",
+        }
+
+
+def test_hung_socket_does_not_block_notifications():
+    class Sink:
+        def __init__(self, hang=False):
+            self.hang = hang
+            self.sent = []
+
+        async def send(self, message):
+            if self.hang:
+                await asyncio.sleep(3600)
+            self.sent.append(message)
+
+    hub = NotificationHub(send_timeout=0.05)
+    hung, fine = Sink(hang=True), Sink()
+    hub.subscribe(1, hung)
+    hub.subscribe(1, fine)
+
+    assert asyncio.run(hub.notify(1, {"type": "friend_added"})) == 1
+    assert fine.sent == [{"type": "friend_added"}]
+    hub.unsubscribe(1, hung)
+    hub.unsubscribe(1, fine)
+    assert len(hub) == 0